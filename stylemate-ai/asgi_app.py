@@ -0,0 +1,517 @@
+# stylemate-ai/asgi_app.py
+#
+# Async serving mode: the same POST /recommend contract as flask_app.py, on
+# FastAPI + uvicorn. The event loop only reads uploads in and runs the
+# (fast) faiss search; image decode + CLIP inference run in a pool of worker
+# processes that each hold their own copy of the model, so a slow forward
+# pass never blocks other connections and inference scales past the GIL.
+#
+#   python asgi_app.py --port 8000 --workers 2 --max-inflight 16
+#   uvicorn asgi_app:app --port 8000          # settings from STYLEMATE_ASGI_*
+
+import os
+import time
+import asyncio
+import multiprocessing
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import FastAPI, HTTPException, Query, Request, UploadFile, File
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+
+import config
+import clip_model
+import metrics
+from metrics import STAGE_SECONDS
+from attributes import parse_search_options, query_flag
+from catalog_registry import CatalogRegistry
+from embedding_cache import EmbeddingCache, content_key
+from image_io import ImageRejected, check_upload_size, open_image, make_preprocess, input_size
+from styles import style_response
+from text_search import TextQueryCache, load_popular_queries, normalize_query, warm_popular
+from startup import Startup, load_backend, load_catalog, load_styles, warm_up
+
+
+# ─── WORKER PROCESSES: each one holds its own model ──────────────────────────
+_worker_backend = None
+_worker_preprocess = None
+
+
+def _init_worker(num_threads: int):
+    """ProcessPoolExecutor initializer: load (and warm) the backend once per worker."""
+    global _worker_backend, _worker_preprocess
+    import torch
+    _worker_backend = load_backend()
+    _worker_preprocess = make_preprocess(_worker_backend.preprocess)
+    torch.set_num_threads(num_threads)
+    warm_up(_worker_backend)
+
+
+def _worker_embed(data: bytes):
+    """
+    Decode + preprocess + encode one upload. Runs inside a worker process.
+    Returns (embedding, {stage: seconds}) so the server can record the stages.
+    """
+    t0 = time.perf_counter()
+    img = open_image(data, min_size=input_size(_worker_preprocess))
+    t1 = time.perf_counter()
+    x = _worker_preprocess(img).unsqueeze(0)
+    t2 = time.perf_counter()
+    vec = _worker_backend.encode_images(x)[0].numpy().astype("float32")
+    return vec, {"decode": t1 - t0, "preprocess": t2 - t1, "encode": time.perf_counter() - t2}
+
+
+def _worker_embed_many(blobs: list):
+    """
+    Decode + preprocess several uploads and encode them in one forward pass.
+    Returns (one embedding or exception per upload, {stage: seconds}).
+    """
+    import torch
+    out, tensors, positions = [None] * len(blobs), [], []
+    t0 = time.perf_counter()
+    for i, data in enumerate(blobs):
+        try:
+            tensors.append(_worker_preprocess(open_image(data, min_size=input_size(_worker_preprocess))))
+            positions.append(i)
+        except Exception as e:
+            out[i] = e
+    timings = {"decode+preprocess": time.perf_counter() - t0}
+    if tensors:
+        t0 = time.perf_counter()
+        encoded = _worker_backend.encode_images(torch.stack(tensors)).numpy().astype("float32")
+        timings["encode"] = time.perf_counter() - t0
+        for row, i in enumerate(positions):
+            out[i] = encoded[row]
+    return out, timings
+
+
+def _worker_encode_texts(texts: list):
+    """CLIP text embeddings (n × D float32) of several queries. Runs inside a worker process."""
+    return _worker_backend.encode_texts(texts).numpy().astype("float32")
+
+
+def _worker_ping() -> int:
+    return os.getpid()
+
+
+# ─── SERVER STATE ─────────────────────────────────────────────────────────────
+pool = None
+# the live catalog is catalog_registry.current; a request reads it once, so a
+# reload swapping in a new version never changes it mid-request
+catalog_registry = CatalogRegistry()
+style_scorer = None
+inflight = None   # asyncio.Semaphore, created on the running loop
+
+embedding_cache = None
+if config.EMBED_CACHE_ENABLED:
+    # exact (content-hash) tier only: the perceptual tier would need a decode
+    # on the event loop
+    embedding_cache = EmbeddingCache(
+        max_entries=config.EMBED_CACHE_MAX_ENTRIES,
+        max_bytes=int(config.EMBED_CACHE_MAX_MB * 1024 * 1024),
+        # one folder per CLIP model: a cached vector is only valid for the model that made it
+        persist_dir=os.path.join(config.EMBED_CACHE_DIR, clip_model.model_tag().replace("/", "__"))
+        if config.EMBED_CACHE_DIR else None,
+    )
+
+text_cache = TextQueryCache(max_entries=config.TEXT_CACHE_MAX_ENTRIES)
+metrics.register_cache_gauges(embedding_cache, text_cache)
+metrics.register_catalog_gauges(lambda: catalog_registry.current, catalog_registry)
+
+
+def _record_worker_stages(timings: dict, batch_size: int):
+    """Stage histograms for work done in a pool process (timed there, observed here)."""
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    if "encode" in timings:
+        metrics.BATCH_SIZE.observe(batch_size)
+        metrics.BATCH_SECONDS.observe(timings["encode"])
+
+
+def _start_workers():
+    global pool
+    workers = max(1, config.ASGI_INFERENCE_WORKERS)
+    threads = max(1, config.TORCH_NUM_THREADS // workers)
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        # spawn: never fork a process that may already have torch / OpenMP threads
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(threads,),
+    )
+    # ProcessPoolExecutor starts workers lazily; one ping each brings them all
+    # up (model loaded + warm) before we report ready
+    pids = set(f.result() for f in [pool.submit(_worker_ping) for _ in range(workers)])
+    print(f"   • {workers} inference worker(s) × {threads} thread(s): pids {sorted(pids)}")
+
+
+def _load_catalog():
+    load_catalog(catalog_registry)
+
+
+def _warm_text():
+    queries = load_popular_queries(config.TEXT_POPULAR_QUERIES)
+    encode = lambda chunk: pool.submit(_worker_encode_texts, chunk).result()
+    warm_popular(text_cache, queries, encode, batch_size=config.TEXT_WARM_BATCH_SIZE)
+    print(f"   • {len(queries)} popular text queries pre-encoded")
+
+
+def _load_styles():
+    global style_scorer
+    style_scorer = load_styles()
+
+
+startup = Startup("asgi")
+metrics.register_startup_gauge(startup)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global inflight
+    inflight = asyncio.Semaphore(max(1, config.ASGI_MAX_INFLIGHT))
+    startup.run_in_background([
+        ("workers", _start_workers),
+        ("catalog", _load_catalog),
+        ("styles", _load_styles),
+        ("text", _warm_text),
+    ])
+    yield
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class BodySizeLimit:
+    """
+    413 for request bodies above the route's cap, before the multipart parser
+    spools them to memory / disk: up front from Content-Length, or — for a
+    chunked body without one — as soon as the bytes received pass the cap.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def limit_mb(path: str) -> float:
+        return config.BATCH_MAX_UPLOAD_MB if path == "/recommend/batch" else config.MAX_UPLOAD_MB
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        limit_mb = self.limit_mb(scope["path"])
+        # + room for the multipart boundaries and part headers
+        limit = int(limit_mb * 1024 * 1024) + 64 * 1024
+        detail = f"Request body larger than {limit_mb:g} MB."
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            return await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(413, detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app = FastAPI(title="stylemate", lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:5173"], allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(BodySizeLimit)
+
+
+@app.middleware("http")
+async def record_request(request: Request, call_next):
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    endpoint = route.path if route is not None else "unmatched"
+    metrics.REQUESTS.inc(endpoint=endpoint, status=str(response.status_code))
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - t0, endpoint=endpoint)
+    return response
+
+
+async def read_upload(file: UploadFile) -> bytes:
+    """
+    The bytes of one upload; ImageRejected above MAX_UPLOAD_MB (what
+    image_io.open_image says on the Flask server). Starlette has already
+    spooled it by now; the request body as a whole was capped by
+    BodySizeLimit before it was parsed.
+    """
+    limit = int(config.MAX_UPLOAD_MB * 1024 * 1024)
+    data = await file.read(limit + 1)
+    check_upload_size(file.size if file.size is not None else len(data), limit)
+    return data
+
+
+async def embed_image_bytes(data: bytes):
+    """
+    (1 × D) float32 embedding of an upload. Cache hits are answered on the
+    loop; misses go to the worker pool, at most `ASGI_MAX_INFLIGHT` at a time.
+    """
+    key = None
+    if embedding_cache is not None:
+        key = content_key(data)
+        vec = embedding_cache.get(key)
+        if vec is not None:
+            return vec[None, :]
+        embedding_cache.record_miss()
+
+    try:
+        with STAGE_SECONDS.time("queue"):
+            await asyncio.wait_for(inflight.acquire(), timeout=config.ASGI_QUEUE_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise HTTPException(503, "Too many concurrent requests; retry shortly.")
+    try:
+        vec, timings = await asyncio.get_running_loop().run_in_executor(pool, _worker_embed, data)
+    finally:
+        inflight.release()
+    _record_worker_stages(timings, 1)
+
+    if embedding_cache is not None:
+        embedding_cache.put(key, vec)
+    return vec[None, :]   # shape: (1, D)
+
+
+@app.post("/recommend")
+async def recommend_api(request: Request, file: UploadFile = File(None)):
+    """
+    POST /recommend?k=5&brand=galore,drmers — same contract as flask_app.py:
+    multipart image under key="file", returns the top-k products across brands.
+    Accepts the same min_price / max_price / tag / size filters, styles=1 and expand_variants=1.
+    """
+    if not startup.ready.is_set():
+        raise HTTPException(503, "Recommendation service is still starting up; retry shortly.")
+    if file is None:
+        raise HTTPException(400, "No file part named 'file'. Please upload an image using key='file'.")
+
+    try:
+        opts = parse_search_options(request.query_params)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    try:
+        raw = await read_upload(file)
+    except ImageRejected as e:
+        raise HTTPException(413, str(e))
+    try:
+        q_vec = await embed_image_bytes(raw)
+    except HTTPException:
+        raise
+    except ImageRejected as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(400, f"Invalid image or embedding error: {e}")
+
+    # One search over every brand; results come back already ranked
+    catalog = catalog_registry.current
+    try:
+        with STAGE_SECONDS.time("search"):
+            distances, indices = catalog.search(q_vec, opts.k, brands=opts.brands, filters=opts.filters)
+    except KeyError as e:
+        raise HTTPException(400, str(e.args[0]))
+
+    if opts.styles:
+        if style_scorer is None:
+            raise HTTPException(400, "Style labels are not available on this server.")
+        with STAGE_SECONDS.time("serialize"):
+            return JSONResponse(style_response(style_scorer, catalog, q_vec, distances[0], indices[0],
+                                               top_k=config.STYLE_TOP_K, expand_variants=opts.expand_variants))
+    with STAGE_SECONDS.time("serialize"):
+        return Response(catalog.results_json(distances[0], indices[0], opts.expand_variants),
+                        media_type="application/json")
+
+
+async def embed_many_image_bytes(blobs: list) -> list:
+    """
+    One (D,) embedding (or exception) per upload; an upload that already is
+    an exception (rejected by read_upload) is passed through. Cache misses go
+    to a single worker together, so they share one forward pass.
+    """
+    vecs = [None] * len(blobs)
+    keys = [None] * len(blobs)
+    missing = []
+    for i, data in enumerate(blobs):
+        if isinstance(data, Exception):
+            vecs[i] = data
+            continue
+        if embedding_cache is not None:
+            keys[i] = content_key(data)
+            vecs[i] = embedding_cache.get(keys[i])
+            if vecs[i] is not None:
+                continue
+            embedding_cache.record_miss()
+        missing.append(i)
+    if not missing:
+        return vecs
+
+    try:
+        with STAGE_SECONDS.time("queue"):
+            await asyncio.wait_for(inflight.acquire(), timeout=config.ASGI_QUEUE_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise HTTPException(503, "Too many concurrent requests; retry shortly.")
+    try:
+        encoded, timings = await asyncio.get_running_loop().run_in_executor(
+            pool, _worker_embed_many, [blobs[i] for i in missing]
+        )
+    finally:
+        inflight.release()
+    _record_worker_stages(timings, sum(1 for vec in encoded if not isinstance(vec, Exception)))
+
+    for i, vec in zip(missing, encoded):
+        vecs[i] = vec
+        if embedding_cache is not None and not isinstance(vec, Exception):
+            embedding_cache.put(keys[i], vec)
+    return vecs
+
+
+@app.post("/recommend/batch")
+async def recommend_batch_api(request: Request, files: list[UploadFile] = File(None)):
+    """
+    POST /recommend/batch?k=5&aggregate=1 — same contract as flask_app.py:
+    several uploads under key="files", per-image top-k + optional "aggregate".
+    """
+    if not startup.ready.is_set():
+        raise HTTPException(503, "Recommendation service is still starting up; retry shortly.")
+    if not files:
+        raise HTTPException(400, "No file parts named 'files'. Upload the images using key='files'.")
+    if len(files) > config.BATCH_MAX_FILES:
+        raise HTTPException(400, f"At most {config.BATCH_MAX_FILES} images per batch request.")
+
+    try:
+        opts = parse_search_options(request.query_params)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    blobs = []
+    for f in files:
+        try:
+            blobs.append(await read_upload(f))
+        except ImageRejected as e:
+            blobs.append(e)   # reported as that file's error, like flask_app.py
+    vecs = await embed_many_image_bytes(blobs)
+    catalog = catalog_registry.current
+    try:
+        with STAGE_SECONDS.time("search"):
+            # the product lists are joined from pre-serialized fragments inside
+            body = catalog.batch_results_json(
+                [f.filename for f in files], vecs, opts.k, brands=opts.brands, filters=opts.filters,
+                aggregate=opts.aggregate, expand_variants=opts.expand_variants,
+            )
+    except KeyError as e:
+        raise HTTPException(400, str(e.args[0]))
+    return Response(body, media_type="application/json")
+
+
+async def embed_text(query: str):
+    """(1 × D) embedding of a text query: `text_cache` first, a worker process otherwise."""
+    key = normalize_query(query)
+    vec = text_cache.get(key)
+    if vec is None:
+        try:
+            with STAGE_SECONDS.time("queue"):
+                await asyncio.wait_for(inflight.acquire(), timeout=config.ASGI_QUEUE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            raise HTTPException(503, "Too many concurrent requests; retry shortly.")
+        try:
+            with STAGE_SECONDS.time("encode_text"):
+                encoded = await asyncio.get_running_loop().run_in_executor(pool, _worker_encode_texts, [key])
+        finally:
+            inflight.release()
+        vec = encoded[0]
+        text_cache.put(key, vec)
+    return vec[None, :]
+
+
+@app.get("/search/text")
+async def search_text_api(request: Request, q: str = Query("")):
+    """
+    GET /search/text?q=boxy+black+hoodie&k=5 — same contract as flask_app.py:
+    CLIP text query against the product index, with the /recommend filters.
+    """
+    if not startup.ready.is_set():
+        raise HTTPException(503, "Recommendation service is still starting up; retry shortly.")
+    if not normalize_query(q):
+        raise HTTPException(400, "Query parameter 'q' must be a non-empty search text.")
+    if len(q) > config.TEXT_MAX_QUERY_CHARS:
+        raise HTTPException(400, f"Query parameter 'q' is limited to {config.TEXT_MAX_QUERY_CHARS} characters.")
+
+    try:
+        opts = parse_search_options(request.query_params)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    q_vec = await embed_text(q)
+    catalog = catalog_registry.current
+    try:
+        with STAGE_SECONDS.time("search"):
+            distances, indices = catalog.search(q_vec, opts.k, brands=opts.brands, filters=opts.filters)
+    except KeyError as e:
+        raise HTTPException(400, str(e.args[0]))
+    with STAGE_SECONDS.time("serialize"):
+        body = catalog.results_json(distances[0], indices[0], opts.expand_variants)
+        return Response(body, media_type="application/json")
+
+
+@app.get("/healthz")
+async def healthz_api():
+    """Liveness: the event loop is up."""
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readyz_api():
+    """Readiness: 200 once every worker holds a warm model and the catalog is loaded."""
+    status = startup.status()
+    return JSONResponse(status, status_code=200 if status["status"] == "ready" else 503)
+
+
+@app.get("/catalog")
+async def catalog_api():
+    """Version, size, brands, source and CLIP model of the catalog being served."""
+    return catalog_registry.info()
+
+
+@app.post("/catalog/reload")
+async def catalog_reload_api(request: Request):
+    """Reload the catalog in a background thread if its files changed (or force=1); 202 while it runs."""
+    if not startup.ready.is_set():
+        raise HTTPException(503, "Recommendation service is still starting up; retry shortly.")
+    started = catalog_registry.reload_in_background(force=query_flag(request.query_params, "force"))
+    return JSONResponse(dict(catalog_registry.info(), reloading=started), status_code=202)
+
+
+@app.get("/metrics")
+async def metrics_api():
+    """Prometheus text format: stage latencies, request counts, batch sizes, caches, catalog."""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/stats/cache")
+async def cache_stats_api():
+    if embedding_cache is None:
+        return {"enabled": False, "text": text_cache.stats()}
+    return dict(embedding_cache.stats(), enabled=True, text=text_cache.stats())
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve /recommend with uvicorn + a process pool.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.ASGI_INFERENCE_WORKERS,
+                        help="Inference worker processes (each loads the model)")
+    parser.add_argument("--max-inflight", type=int, default=config.ASGI_MAX_INFLIGHT,
+                        help="Uploads being decoded / encoded at once; the rest queue")
+    args = parser.parse_args()
+
+    config.ASGI_INFERENCE_WORKERS = args.workers
+    config.ASGI_MAX_INFLIGHT = args.max_inflight
+    uvicorn.run(app, host=args.host, port=args.port)
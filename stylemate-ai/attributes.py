@@ -0,0 +1,186 @@
+# stylemate-ai/attributes.py
+#
+# Precomputed per-product attribute indexes for filtered search:
+#
+#   price   – float32 per row (NaN = unknown) + the rows sorted by price, so a
+#             price range is two `searchsorted` calls
+#   tags    – posting lists: tag → sorted int32 rows carrying that tag
+#   sizes   – posting lists: size → sorted int32 rows with that size IN STOCK
+#
+# `CatalogAttributes.mask(filters)` turns a query's filters into one boolean
+# row mask; Catalog feeds it to faiss as an ID selector, so filtering happens
+# inside the vector search instead of on a top-k afterwards.
+
+import os
+import re
+import math
+import numpy as np
+from collections import namedtuple
+
+ATTRS_NAME = "catalog_attrs.npz"
+
+# min_price / max_price: inclusive bounds (None = open);
+# tags: every tag must be present; sizes: at least one must be in stock.
+AttributeFilter = namedtuple("AttributeFilter", ["min_price", "max_price", "tags", "sizes"])
+
+# Query options shared by /recommend, /recommend/batch and /search/text on
+# both servers (see parse_search_options)
+SearchOptions = namedtuple("SearchOptions", ["k", "brands", "filters", "expand_variants", "styles", "aggregate"])
+
+_PRICE_RE = re.compile(r"(\d[\d,]*(?:\.\d+)?)")
+
+
+def parse_price(price) -> float:
+    """'$125.00 CAD' → 125.0; None / unparseable → NaN. Currency is ignored."""
+    if isinstance(price, (int, float)):
+        return float(price)
+    match = _PRICE_RE.search(price or "")
+    return float(match.group(1).replace(",", "")) if match else float("nan")
+
+
+def normalize_tag(tag: str) -> str:
+    return tag.strip().lower()
+
+
+def normalize_size(size: str) -> str:
+    return size.strip().upper()
+
+
+def parse_filters(args) -> AttributeFilter:
+    """
+    Read min_price / max_price / tag / size from request query args (any
+    mapping with .get). Returns None when no filter is set; raises ValueError
+    with a client-facing message on bad input.
+    """
+    bounds = {}
+    for name in ("min_price", "max_price"):
+        raw = (args.get(name) or "").strip()
+        if not raw:
+            bounds[name] = None
+            continue
+        try:
+            bounds[name] = float(raw)
+        except ValueError:
+            raise ValueError(f"Query parameter '{name}' must be a number.")
+        if not math.isfinite(bounds[name]):
+            raise ValueError(f"Query parameter '{name}' must be a finite number.")
+    tags = tuple(normalize_tag(t) for t in (args.get("tag") or "").split(",") if t.strip())
+    sizes = tuple(normalize_size(s) for s in (args.get("size") or "").split(",") if s.strip())
+
+    if bounds["min_price"] is None and bounds["max_price"] is None and not tags and not sizes:
+        return None
+    return AttributeFilter(bounds["min_price"], bounds["max_price"], tags, sizes)
+
+
+def query_flag(args, name: str) -> bool:
+    """?name=1 / true / yes."""
+    return (args.get(name) or "").strip().lower() in ("1", "true", "yes")
+
+
+def parse_search_options(args) -> SearchOptions:
+    """
+    k (default 5) / brand / the parse_filters() filters / expand_variants /
+    styles / aggregate from request query args (any mapping with .get).
+    Raises ValueError with a client-facing (400) message on bad input.
+    """
+    try:
+        k = int(args.get("k") or 5)
+        if k <= 0:
+            raise ValueError()
+    except ValueError:
+        raise ValueError("Query parameter 'k' must be a positive integer.")
+    brands = [b.strip() for b in (args.get("brand") or "").split(",") if b.strip()]
+    return SearchOptions(k, brands, parse_filters(args), query_flag(args, "expand_variants"),
+                         query_flag(args, "styles"), query_flag(args, "aggregate"))
+
+
+def _postings(rows_by_key: dict) -> dict:
+    return {key: np.asarray(sorted(rows), dtype=np.int32) for key, rows in rows_by_key.items()}
+
+
+class CatalogAttributes:
+    def __init__(self, prices: np.ndarray, tags: dict, sizes: dict):
+        self.prices = np.asarray(prices, dtype=np.float32)
+        known = np.flatnonzero(~np.isnan(self.prices))
+        self.price_order = known[np.argsort(self.prices[known], kind="stable")].astype(np.int32)
+        self.sorted_prices = self.prices[self.price_order]
+        self.tags = tags
+        self.sizes = sizes
+
+    def __len__(self):
+        return len(self.prices)
+
+    @classmethod
+    def from_metas(cls, metas):
+        """Index price / tags / in-stock sizes of every product meta, in row order."""
+        prices = np.empty(len(metas), dtype=np.float32)
+        tags, sizes = {}, {}
+        for row, meta in enumerate(metas):
+            prices[row] = parse_price(meta.get("price"))
+            for tag in meta.get("tags") or ():
+                tags.setdefault(normalize_tag(tag), []).append(row)
+            for variant in meta.get("sizes") or ():
+                if variant.get("in_stock") and variant.get("size"):
+                    sizes.setdefault(normalize_size(variant["size"]), []).append(row)
+        return cls(prices, _postings(tags), _postings(sizes))
+
+    # ─── PERSISTENCE (CSR layout: keys + offsets + concatenated rows) ─────────
+    @staticmethod
+    def _pack(postings: dict) -> tuple:
+        keys = sorted(postings)
+        lengths = [len(postings[key]) for key in keys]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        rows = np.concatenate([postings[key] for key in keys]) if keys else np.empty(0, dtype=np.int32)
+        return np.asarray(keys, dtype=str), offsets, rows.astype(np.int32)
+
+    @staticmethod
+    def _unpack(keys, offsets, rows) -> dict:
+        return {str(key): rows[offsets[i]:offsets[i + 1]] for i, key in enumerate(keys)}
+
+    def save(self, path: str):
+        tag_keys, tag_offsets, tag_rows = self._pack(self.tags)
+        size_keys, size_offsets, size_rows = self._pack(self.sizes)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(
+                f, prices=self.prices,
+                tag_keys=tag_keys, tag_offsets=tag_offsets, tag_rows=tag_rows,
+                size_keys=size_keys, size_offsets=size_offsets, size_rows=size_rows,
+            )
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            return cls(
+                data["prices"],
+                cls._unpack(data["tag_keys"], data["tag_offsets"], data["tag_rows"]),
+                cls._unpack(data["size_keys"], data["size_offsets"], data["size_rows"]),
+            )
+
+    # ─── QUERYING ─────────────────────────────────────────────────────────────
+    def price_rows(self, min_price: float = None, max_price: float = None) -> np.ndarray:
+        lo = 0 if min_price is None else np.searchsorted(self.sorted_prices, min_price, side="left")
+        hi = len(self.sorted_prices) if max_price is None else np.searchsorted(self.sorted_prices, max_price, side="right")
+        return self.price_order[lo:hi]
+
+    def mask(self, f: AttributeFilter) -> np.ndarray:
+        """Boolean row mask of the products matching every part of `f`."""
+        mask = np.ones(len(self), dtype=bool)
+        if f.min_price is not None or f.max_price is not None:
+            mask = np.zeros(len(self), dtype=bool)
+            mask[self.price_rows(f.min_price, f.max_price)] = True
+        for tag in f.tags:
+            rows = self.tags.get(tag)
+            if rows is None:
+                return np.zeros(len(self), dtype=bool)
+            tag_mask = np.zeros(len(self), dtype=bool)
+            tag_mask[rows] = True
+            mask &= tag_mask
+        if f.sizes:
+            size_mask = np.zeros(len(self), dtype=bool)
+            for size in f.sizes:
+                rows = self.sizes.get(size)
+                if rows is not None:
+                    size_mask[rows] = True
+            mask &= size_mask
+        return mask
@@ -0,0 +1,128 @@
+# stylemate-ai/batching.py
+#
+# Micro-batching engine that sits in front of the CLIP image encoder.
+# Concurrent requests each submit one preprocessed image tensor; a single
+# worker thread collects up to `max_batch_size` of them (or whatever arrived
+# within `max_wait_ms` of the first one), runs ONE `encode_image` call on the
+# stacked batch and hands every caller its own row back.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+
+
+class MicroBatcher:
+    """
+    Collects single-image tensors from many threads and encodes them together.
+
+    `encode_fn` receives a (B × 3 × H × W) tensor and must return a (B × D)
+    array-like (numpy array or tensor) of embeddings, row i belonging to the
+    i-th submitted image.
+    """
+
+    def __init__(self, encode_fn, max_batch_size: int = 16, max_wait_ms: float = 10.0):
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be a positive integer")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must be >= 0")
+
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="clip-microbatcher", daemon=True)
+        self._worker.start()
+
+        # running totals, handy for logging / metrics
+        self.batches_run = 0
+        self.images_encoded = 0
+
+    # ─── PUBLIC API ───────────────────────────────────────────────────────────
+    def submit(self, x: torch.Tensor) -> Future:
+        """
+        Queue one preprocessed image (3 × H × W, or 1 × 3 × H × W) for encoding.
+        Returns a Future resolving to that image's (D,) embedding row.
+        """
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        if x.dim() == 4:
+            if x.shape[0] != 1:
+                raise ValueError("submit() takes a single image; got a batch of %d" % x.shape[0])
+            x = x[0]
+
+        fut = Future()
+        self._queue.put((x, fut))
+        return fut
+
+    def encode(self, x: torch.Tensor, timeout: float = None):
+        """Blocking helper: submit one image and wait for its embedding row."""
+        return self.submit(x).result(timeout=timeout)
+
+    def encode_many(self, xs: list, timeout: float = None) -> list:
+        """
+        Blocking helper for one request carrying several images: they are
+        queued back to back, so they share forward passes (with each other and
+        with any concurrent requests). Returns their embedding rows in order.
+        """
+        futures = [self.submit(x) for x in xs]
+        return [fut.result(timeout=timeout) for fut in futures]
+
+    def close(self):
+        """Stop the worker after it drains whatever is already queued."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    # ─── WORKER LOOP ──────────────────────────────────────────────────────────
+    def _collect(self):
+        """Block for the first item, then gather more until full or timed out."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # re-post the shutdown marker so the outer loop sees it next
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            # Skip callers that gave up (cancelled) before we got to them
+            batch = [(x, fut) for x, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                stacked = torch.stack([x for x, _ in batch])
+                out = self.encode_fn(stacked)
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+
+            for row, (_, fut) in enumerate(batch):
+                fut.set_result(out[row])
+
+            self.batches_run += 1
+            self.images_encoded += len(batch)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# stylemate-ai/benchmarks/bench_backends.py
+#
+# Embedding drift (cosine vs. eager fp32) and per-image latency for every
+# inference backend in inference.py, so each deployment can pick its own
+# speed ↔ accuracy point.
+#
+#   python benchmarks/bench_backends.py --images style_images/*/*.jpg
+#   python benchmarks/bench_backends.py --backends eager int8 --batch-sizes 1 16
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import json
+import argparse
+import torch
+from PIL import Image
+
+import config
+from inference import BACKENDS, create_backend, embedding_drift, latency_per_image
+
+
+def sample_batch(preprocess, paths: list, n: int) -> torch.Tensor:
+    """Preprocess the given images; pad with flipped / cropped variants up to n."""
+    images = [Image.open(p).convert("RGB") for p in paths]
+    variants = []
+    for i in range(n):
+        img = images[i % len(images)]
+        if i >= len(images):
+            w, h = img.size
+            shift = (i // len(images)) * 7 % max(min(w, h) // 4, 1)
+            img = img.crop((shift, shift, w - shift, h - shift))
+            if (i // len(images)) % 2:
+                img = img.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+        variants.append(preprocess(img))
+    return torch.stack(variants)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drift + latency of CLIP inference backends.")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--images", nargs="+", default=[os.path.join(root_dir, "test.jpg")])
+    parser.add_argument("--samples", type=int, default=32, help="Images in the drift/latency sample set")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--threads", type=int, default=config.TORCH_NUM_THREADS)
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    reference = create_backend("eager")
+    batch = sample_batch(reference.preprocess, args.images, args.samples)
+
+    rows = []
+    print(f"{'backend':<8} {'min cos':>8} {'mean cos':>9} " + " ".join(f"{'ms@b' + str(b):>9}" for b in args.batch_sizes))
+    for name in args.backends:
+        backend = reference if name == "eager" else create_backend(name)
+        row = {"backend": name, **embedding_drift(backend, reference, batch)}
+        for b in args.batch_sizes:
+            row[f"ms_per_image@{b}"] = latency_per_image(backend, batch, batch_size=b)["ms_per_image"]
+        rows.append(row)
+        print(f"{name:<8} {row['min_cosine']:>8.4f} {row['mean_cosine']:>9.4f} "
+              + " ".join(f"{row[f'ms_per_image@{b}']:>9.1f}" for b in args.batch_sizes))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
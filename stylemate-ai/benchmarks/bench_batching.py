@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# stylemate-ai/benchmarks/bench_batching.py
+#
+# Compare the old per-request inference path (every request thread calls
+# `encode_image` on its own 1-image batch with torch.set_num_threads(1)) with
+# the micro-batching engine, at a few concurrency levels.
+#
+#   python benchmarks/bench_batching.py --concurrency 1 4 8 16 --requests 128
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import argparse
+import threading
+import time
+import numpy as np
+import torch
+from PIL import Image
+
+import config
+from batching import MicroBatcher
+from clip_model import model, preprocess
+
+
+def percentile(latencies, p):
+    return float(np.percentile(np.asarray(latencies) * 1000.0, p))
+
+
+def run_clients(call, x, concurrency: int, total: int):
+    """Fire `total` calls from `concurrency` threads; return (wall_s, latencies_s)."""
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def client():
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            t0 = time.perf_counter()
+            call(x)
+            dt = time.perf_counter() - t0
+            with lock:
+                latencies.append(dt)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0, latencies
+
+
+def encode_single(x):
+    with torch.no_grad():
+        q = model.encode_image(x.unsqueeze(0))
+        q = q / q.norm(dim=-1, keepdim=True)
+    return q.numpy()
+
+
+def encode_batch(x):
+    with torch.no_grad():
+        q = model.encode_image(x)
+        q = q / q.norm(dim=-1, keepdim=True)
+    return q.numpy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request vs. micro-batched CLIP inference.")
+    parser.add_argument("--image", default=os.path.join(root_dir, "test.jpg"))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per run")
+    parser.add_argument("--batch-size", type=int, default=config.BATCH_MAX_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=config.BATCH_MAX_WAIT_MS)
+    parser.add_argument("--threads", type=int, default=config.TORCH_NUM_THREADS,
+                        help="torch threads for the batched path")
+    args = parser.parse_args()
+
+    model.eval()
+    x = preprocess(Image.open(args.image).convert("RGB"))
+
+    print(f"{'mode':<10} {'conc':>5} {'img/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for conc in args.concurrency:
+        # ── baseline: what flask_app used to do ───────────────────────────────
+        torch.set_num_threads(1)
+        encode_single(x)  # warm-up
+        wall, lat = run_clients(encode_single, x, conc, args.requests)
+        base_tput, base_p99 = args.requests / wall, percentile(lat, 99)
+        print(f"{'single':<10} {conc:>5} {base_tput:>8.1f} {percentile(lat, 50):>8.1f} {base_p99:>8.1f}")
+
+        # ── micro-batched ─────────────────────────────────────────────────────
+        torch.set_num_threads(args.threads)
+        batcher = MicroBatcher(encode_batch, args.batch_size, args.max_wait_ms)
+        batcher.encode(x)  # warm-up
+        wall, lat = run_clients(batcher.encode, x, conc, args.requests)
+        tput, p99 = args.requests / wall, percentile(lat, 99)
+        avg_batch = batcher.images_encoded / max(batcher.batches_run, 1)
+        batcher.close()
+        print(f"{'batched':<10} {conc:>5} {tput:>8.1f} {percentile(lat, 50):>8.1f} {p99:>8.1f}"
+              f"   (x{tput / base_tput:.2f} throughput, p99 {p99 - base_p99:+.1f} ms,"
+              f" avg batch {avg_batch:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# stylemate-ai/benchmarks/bench_crawler.py
+#
+# Crawls a local fixture shop (a Shopify-like “Shop All” collection split over
+# pages, plus <product>.js detail documents, with ETag / Last-Modified and an
+# artificial per-request latency) with galore_scraper.scrape():
+#
+#   serial  — one blocking GET per page and product, no revalidation (the old scraper)
+#   cold    — the crawler with an empty cache: pooled + concurrent
+#   warm    — the same crawl again: every page revalidated with a 304
+#
+# and checks the crawler finds every product with its tags and sizes.
+#
+#   python benchmarks/bench_crawler.py
+#   python benchmarks/bench_crawler.py --products 400 --latency-ms 80 --max-per-host 8
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import json
+import time
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import requests
+
+from scrapers import galore_scraper
+from scrapers.crawler import Crawler
+
+SIZES = ("S", "M", "L", "XL")
+
+
+# ─── FIXTURE SHOP ─────────────────────────────────────────────────────────────
+def build_site(products: int, per_page: int) -> dict:
+    """path (with query) → (body bytes, content type) for the whole fixture shop."""
+    site = {}
+    pages = max(1, -(-products // per_page))
+    for page in range(1, pages + 1):
+        cards = []
+        for i in range((page - 1) * per_page, min(products, page * per_page)):
+            cards.append(
+                f'<div class="card"><img src="/cdn/p{i}.jpg"><div class="card__content">'
+                f'<h3 class="card__heading"><a class="full-unstyled-link" href="/products/p{i}">Product {i}</a></h3>'
+                f'<span class="price-item price-item--regular">${20 + i % 50}.00</span></div></div>')
+            site[f"/products/p{i}.js"] = (json.dumps({
+                "tags": [f"tag{i % 7}", "fixture"],
+                "options": [{"name": "Size"}],
+                "variants": [{"option1": s, "available": (i + k) % 3 != 0} for k, s in enumerate(SIZES)],
+            }).encode(), "application/json")
+        nxt = f'<link rel="next" href="/collections/shop-all?page={page + 1}">' if page < pages else ""
+        body = f"<html><head>{nxt}</head><body>{''.join(cards)}</body></html>".encode()
+        site["/collections/shop-all" + ("" if page == 1 else f"?page={page}")] = (body, "text/html; charset=utf-8")
+    return site
+
+
+def make_handler(site: dict, latency_s: float, counts: dict, lock: threading.Lock):
+    last_modified = formatdate(time.time() - 3600, usegmt=True)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency_s)   # stands in for the shop's round trip + render time
+            parts = urlsplit(self.path)
+            page = parse_qs(parts.query).get("page", ["1"])[0]
+            key = parts.path + ("" if page == "1" else f"?page={page}")
+            if key not in site:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body, content_type = site[key]
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            with lock:
+                counts["requests"] += 1
+            if self.headers.get("If-None-Match") == etag:
+                with lock:
+                    counts["304"] += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            with lock:
+                counts["bytes"] += len(body)
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+# ─── THE OLD WAY ──────────────────────────────────────────────────────────────
+def serial_crawl(collection_url: str) -> int:
+    """One blocking requests.get per page and product, as the scrapers did before the crawler."""
+    products, url = [], collection_url
+    while url:
+        resp = requests.get(url, timeout=30)
+        resp.raise_for_status()
+        items, url = galore_scraper.parse_collection(resp.text, url)
+        products += items
+    for product in products:
+        requests.get(product["url"] + ".js", timeout=30).raise_for_status()
+    return len(products)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs. concurrent vs. revalidated crawl of a fixture shop.")
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--per-page", type=int, default=24)
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="Artificial server latency per request")
+    parser.add_argument("--max-per-host", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--out", help="Write the results as JSON here")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    counts, lock = {"requests": 0, "304": 0, "bytes": 0}, threading.Lock()
+    site = build_site(args.products, args.per_page)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(site, args.latency_ms / 1000.0, counts, lock))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    collection_url = f"http://127.0.0.1:{server.server_address[1]}/collections/shop-all"
+    print(f"🚀 Fixture shop: {args.products} products on {-(-args.products // args.per_page)} pages, "
+          f"{args.latency_ms:.0f} ms per request")
+
+    report = {"products": args.products, "latency_ms": args.latency_ms, "max_per_host": args.max_per_host}
+
+    def measure(label, fn):
+        before = dict(counts)
+        t0 = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - t0
+        report[label] = {
+            "seconds": seconds,
+            "requests": counts["requests"] - before["requests"],
+            "not_modified": counts["304"] - before["304"],
+            "bytes": counts["bytes"] - before["bytes"],
+        }
+        return result
+
+    measure("serial", lambda: serial_crawl(collection_url))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for label in ("cold", "warm"):
+            with Crawler(max_per_host=args.max_per_host, max_workers=args.workers, cache_dir=cache_dir) as crawler:
+                products = measure(label, lambda: galore_scraper.scrape(crawler, collection_url))
+            complete = sum(1 for p in products if p["tags"] and len(p["sizes"]) == len(SIZES))
+            report[label].update(found=len(products), complete=complete, parsed=crawler.stats["parsed"])
+
+    server.shutdown()
+
+    print(f"\n{'crawl':<8} {'seconds':>9} {'requests':>9} {'304s':>6} {'KiB':>8} {'parsed':>7} {'found':>6}")
+    for label in ("serial", "cold", "warm"):
+        r = report[label]
+        print(f"{label:<8} {r['seconds']:>9.2f} {r['requests']:>9} {r['not_modified']:>6} "
+              f"{r['bytes'] / 1024:>8.1f} {str(r.get('parsed', '-')):>7} {str(r.get('found', '-')):>6}")
+    ok = all(report[label]["found"] == report[label]["complete"] == args.products for label in ("cold", "warm"))
+    print(("✅" if ok else "❌") + f" crawler found {report['warm']['found']}/{args.products} products with tags and sizes")
+    print(f"⏱️ cold crawl {report['serial']['seconds'] / report['cold']['seconds']:.1f}× faster than serial; "
+          f"warm crawl downloaded {report['warm']['bytes']} bytes")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
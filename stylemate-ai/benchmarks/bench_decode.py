@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# stylemate-ai/benchmarks/bench_decode.py
+#
+# Upload decode + preprocess: the stock path (full decode, .convert("RGB"),
+# open_clip `preprocess`) vs. image_io (draft-mode JPEG decode + FastPreprocess).
+# Reports time per image and the cosine between the embeddings both paths
+# produce, and exits non-zero if any image drifts below --min-cosine.
+#
+#   python benchmarks/bench_decode.py --images photos/*.jpg
+#   python benchmarks/bench_decode.py --sizes 1024 3000 4032 --min-cosine 0.99
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import io
+import json
+import time
+import argparse
+import torch
+from PIL import Image
+
+from inference import get_backend
+from image_io import FastPreprocess, open_image
+
+
+def phone_photos(source: Image.Image, sizes: list) -> list:
+    """JPEG bytes of `source` re-rendered at each long-side size (4:3, like phone cameras)."""
+    payloads = []
+    for long_side in sizes:
+        img = source.convert("RGB").resize((long_side, long_side * 3 // 4), Image.Resampling.BICUBIC)
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=92)
+        payloads.append((f"{img.width}×{img.height}", buf.getvalue()))
+    return payloads
+
+
+def stock_path(data: bytes, preprocess):
+    return preprocess(Image.open(io.BytesIO(data)).convert("RGB"))
+
+
+def fast_path(data: bytes, fast):
+    return fast(open_image(data, min_size=fast.size))
+
+
+def time_per_image(fn, data: bytes, repeats: int) -> float:
+    fn(data)
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fn(data)
+    return (time.perf_counter() - t0) / repeats * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stock vs. fast upload decode: speed and embedding drift.")
+    parser.add_argument("--images", nargs="*", help="Real uploads to test (default: test.jpg at several sizes)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[640, 1600, 3000, 4032],
+                        help="Long-side sizes to re-render test.jpg at when --images isn't given")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--min-cosine", type=float, default=0.99,
+                        help="Fail if the fast path's embedding drifts below this cosine")
+    parser.add_argument("--out", help="Write the results as JSON here")
+    args = parser.parse_args()
+
+    if args.images:
+        payloads = [(os.path.basename(p), open(p, "rb").read()) for p in args.images]
+    else:
+        payloads = phone_photos(Image.open(os.path.join(root_dir, "test.jpg")), args.sizes)
+
+    backend = get_backend()
+    preprocess = backend.preprocess
+    fast = FastPreprocess.from_preprocess(preprocess)
+    if fast is None:
+        print("❌ The backend's preprocess isn't a transform FastPreprocess can reproduce")
+        sys.exit(1)
+
+    rows = []
+    for name, data in payloads:
+        with torch.no_grad():
+            a = backend.encode_images(stock_path(data, preprocess).unsqueeze(0))[0]
+            b = backend.encode_images(fast_path(data, fast).unsqueeze(0))[0]
+        rows.append({
+            "image": name,
+            "bytes": len(data),
+            "stock_ms": time_per_image(lambda d: stock_path(d, preprocess), data, args.repeats),
+            "fast_ms": time_per_image(lambda d: fast_path(d, fast), data, args.repeats),
+            "cosine": float((a * b).sum()),
+        })
+
+    print(f"{'image':<20} {'stock ms':>9} {'fast ms':>8} {'speed-up':>9} {'cosine':>8}")
+    for r in rows:
+        print(f"{r['image']:<20} {r['stock_ms']:>9.1f} {r['fast_ms']:>8.1f} "
+              f"{r['stock_ms'] / r['fast_ms']:>8.1f}× {r['cosine']:>8.4f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"💾 Results → {args.out}")
+
+    worst = min(r["cosine"] for r in rows)
+    if worst < args.min_cosine:
+        print(f"❌ Embedding drift too large: min cosine {worst:.4f} < {args.min_cosine}")
+        sys.exit(1)
+    print(f"✅ All embeddings within tolerance (min cosine {worst:.4f} ≥ {args.min_cosine})")
+
+
+if __name__ == "__main__":
+    main()
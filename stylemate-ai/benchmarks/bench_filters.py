@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# stylemate-ai/benchmarks/bench_filters.py
+#
+# Filtered search latency + recall as the filter gets more selective, for
+# in-search filtering (Catalog.search(..., filters=...)) vs. what clients did
+# before: fetch a fixed top-N and drop the non-matching products.
+#
+# A synthetic catalog gets uniformly spread prices, so a price range selects
+# an exact fraction of the products.
+#
+#   python benchmarks/bench_filters.py --products 100000 --kinds flat hnsw
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import json
+import time
+import argparse
+import numpy as np
+import faiss
+
+from catalog import Catalog
+from attributes import AttributeFilter
+from index_factory import INDEX_KINDS
+
+SELECTIVITIES = (1.0, 0.1, 0.01, 0.001)
+
+
+def synthetic(n: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype("float32")
+    prices = np.linspace(0.0, 1000.0, n, dtype=np.float32)
+    rng.shuffle(prices)
+    metas = [{"title": f"product {i}", "price": f"${p:.2f}"} for i, p in enumerate(prices)]
+    return vectors, metas
+
+
+def exact_filtered(vectors: np.ndarray, mask: np.ndarray, q: np.ndarray, k: int) -> list:
+    rows = np.flatnonzero(mask)
+    scores = q @ vectors[rows].T
+    return [set(rows[np.argsort(-s)[:k]].tolist()) for s in scores]
+
+
+def recall(found: np.ndarray, truth: list) -> float:
+    hits = sum(len(set(f[f >= 0].tolist()) & t) for f, t in zip(found, truth))
+    return hits / max(sum(len(t) for t in truth), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filtered search latency / recall vs. selectivity.")
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--kinds", nargs="+", choices=INDEX_KINDS, default=["flat", "hnsw"])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--post-filter-fetch", type=int, default=100,
+                        help="Top-N a client fetched before filtering itself (the old approach)")
+    parser.add_argument("--out", help="Write the results as JSON here")
+    args = parser.parse_args()
+
+    vectors, metas = synthetic(args.products, args.dim)
+    faiss.normalize_L2(vectors)
+    rng = np.random.default_rng(1)
+    queries = rng.standard_normal((args.queries, args.dim)).astype("float32")
+    faiss.normalize_L2(queries)
+
+    rows = []
+    for kind in args.kinds:
+        print(f"🔨 Building {kind} catalog over {args.products} products …")
+        catalog = Catalog.from_vectors([("synthetic", vectors, metas)], kind=kind)
+        for fraction in SELECTIVITIES:
+            f = AttributeFilter(0.0, 1000.0 * fraction, (), ())
+            mask = catalog.attributes.mask(f)
+            truth = exact_filtered(vectors, mask, queries, args.k)
+
+            latencies, found = [], []
+            for q in queries:
+                t0 = time.perf_counter()
+                _, ids = catalog.search(q[None, :], args.k, filters=f)
+                latencies.append(time.perf_counter() - t0)
+                found.append(ids[0])
+
+            _, top = catalog.search(queries, args.post_filter_fetch)
+            post = [row[(row >= 0) & mask[np.maximum(row, 0)]][:args.k] for row in top]
+
+            rows.append({
+                "kind": kind,
+                "selectivity": fraction,
+                "matching": int(mask.sum()),
+                "p50_ms": float(np.percentile(np.asarray(latencies) * 1000.0, 50)),
+                "recall": recall(np.asarray(found), truth),
+                "post_filter_recall": recall(post, truth),
+            })
+
+    print(f"\n{'index':<6} {'select':>7} {'matching':>9} {'p50 ms':>8} {'recall':>7} {'top-' + str(args.post_filter_fetch) + '+filter':>16}")
+    for r in rows:
+        print(f"{r['kind']:<6} {r['selectivity']:>7.3f} {r['matching']:>9} {r['p50_ms']:>8.2f} "
+              f"{r['recall']:>7.3f} {r['post_filter_recall']:>16.3f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"💾 Results → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
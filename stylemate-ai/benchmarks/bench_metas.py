@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# stylemate-ai/benchmarks/bench_metas.py
+#
+# Product metadata: memory held and per-request serialization cost of
+#
+#   dicts   – a list of Python dicts (json.load of catalog_metas.json);
+#             results() copies k of them + adds the score, jsonify re-encodes
+#   packed  – PackedMetas: one bytes blob + offsets on the heap;
+#             results_json() concatenates the stored fragments with the scores
+#   mapped  – MappedMetas: the same layout mmap'd (page cache, shared by workers)
+#
+# on a synthetic catalog shaped like the scraped ones (title, price, url,
+# tags, per-size stock, brand, id), and checks all three give the same JSON.
+#
+#   python benchmarks/bench_metas.py
+#   python benchmarks/bench_metas.py --products 500000 --k 50
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import gc
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import faiss
+
+from catalog import Catalog
+from mapped_metas import MappedMetas, PackedMetas, write_mapped_metas
+
+SIZES = ("XS", "S", "M", "L", "XL", "XXL")
+TAGS = ("hoodies", "tops", "bottoms", "denim", "knitwear", "outerwear", "new", "sale", "boxy", "oversized")
+
+
+def synthetic_metas(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [{
+        "id": int(rng.integers(1 << 62)),
+        "title": f"VINTAGE BOXY HOODIE {i} - WASHED COLOUR {i % 13}",
+        "price": f"${40 + i % 160}.00 CAD",
+        "url": f"https://brand{i % 4}.example.com/products/vintage-boxy-hoodie-{i}",
+        "tags": [TAGS[j] for j in rng.choice(len(TAGS), 4, replace=False)],
+        "sizes": [{"size": s, "in_stock": bool(rng.random() < 0.7)} for s in SIZES],
+        "brand": f"brand{i % 4}",
+    } for i in range(n)]
+
+
+def heap_bytes(load) -> tuple:
+    """(object, bytes still allocated by Python after `load()` returned it)."""
+    gc.collect()
+    tracemalloc.start()
+    obj = load()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def per_request_us(fn, queries: list) -> float:
+    t0 = time.perf_counter()
+    for scores, ids in queries:
+        fn(scores, ids)
+    return (time.perf_counter() - t0) / len(queries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dict metas vs. packed / mmap'd JSON fragments.")
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--k", type=int, default=10, help="Products per response")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--out", help="Write the results as JSON here")
+    args = parser.parse_args()
+
+    metas = synthetic_metas(args.products)
+    index = faiss.IndexFlatIP(4)
+    index.add(np.zeros((args.products, 4), dtype="float32"))
+    brand_ids = np.zeros(args.products, dtype=np.int16)
+
+    rng = np.random.default_rng(1)
+    queries = [(np.sort(rng.random(args.k).astype("float32"))[::-1],
+                rng.integers(0, args.products, args.k).astype("int64")) for _ in range(args.requests)]
+
+    report = {"products": args.products, "k": args.k}
+    with tempfile.TemporaryDirectory() as folder:
+        json_path = os.path.join(folder, "metas.json")
+        jsonl_path = os.path.join(folder, "metas.jsonl")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(metas, f, ensure_ascii=False)
+        write_mapped_metas(jsonl_path, metas)
+        del metas
+
+        def load_dicts():
+            with open(json_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        stores = {
+            "dicts": heap_bytes(load_dicts),
+            "packed": heap_bytes(lambda: PackedMetas.load(jsonl_path)),
+            "mapped": heap_bytes(lambda: MappedMetas(jsonl_path)),
+        }
+
+        outputs = {}
+        for name, (store, heap) in stores.items():
+            if name == "dicts":
+                # what jsonify(catalog.results(...)) did: copy each dict, add the score, encode
+                serialize = lambda scores, ids, metas=store: json.dumps(
+                    [dict(metas[i], score=s) for s, i in zip(scores.tolist(), ids.tolist())]).encode()
+            else:
+                serialize = Catalog(index, store, brand_ids, ["brand0"]).results_json
+            per_request_us(serialize, queries[:50])   # warm
+            report[name] = {"heap_mb": heap / 1e6, "serialize_us": per_request_us(serialize, queries)}
+            outputs[name] = [json.loads(serialize(*q)) for q in queries[:20]]
+
+    same = outputs["dicts"] == outputs["packed"] == outputs["mapped"]
+    report["identical_json"] = same
+
+    print(f"\n{args.products} products, k={args.k}, {args.requests} responses")
+    print(f"{'store':<8} {'heap MB':>9} {'µs/response':>12}")
+    for name in ("dicts", "packed", "mapped"):
+        r = report[name]
+        print(f"{name:<8} {r['heap_mb']:>9.1f} {r['serialize_us']:>12.1f}")
+    print(("✅" if same else "❌") + " all three produce the same JSON")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
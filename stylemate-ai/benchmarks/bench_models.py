@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# stylemate-ai/benchmarks/bench_models.py
+#
+# CLIP model tiers (clip_model.MODEL_TIERS) side by side on our own catalog:
+# per-image latency, load time and dimension against how well each tier's
+# retrieval agrees with a reference tier (default: base, the one in production)
+#
+#   image → image   leave-one-out top-k neighbours of every product image;
+#                   overlap@k = shared neighbours / k, top-1 = same best match
+#   text → image    top-k products for every popular query (popular_queries.txt)
+#
+# Images come from the scraped products (<brand>_products.json) through the
+# image cache — offline unless --download — so every tier sees the same pixels.
+#
+#   python benchmarks/bench_models.py
+#   python benchmarks/bench_models.py --models small base --max-images 500 --k 20
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import glob
+import json
+import time
+import argparse
+from io import BytesIO
+import numpy as np
+import torch
+from PIL import Image
+
+import config
+import clip_model
+from inference import BACKENDS, create_backend, latency_per_image
+from scrapers.image_cache import ImageCache
+from text_search import load_popular_queries
+
+
+def catalog_images(datadir: str, image_cache: ImageCache, max_images: int, download: bool) -> list:
+    """Decoded product images (RGB) from every <brand>_products.json, via the cache."""
+    urls = []
+    for path in sorted(glob.glob(os.path.join(datadir, "*_products.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            urls.extend(p["image_url"] for p in json.load(f) if p.get("image_url"))
+    images = []
+    for url in dict.fromkeys(urls):
+        if len(images) >= max_images:
+            break
+        try:
+            data = image_cache.fetch(url) if download else image_cache.get(url)
+        except Exception as e:
+            print(f"   ⚠️  {url}: {type(e).__name__}: {e}")
+            continue
+        if data is not None:
+            images.append(Image.open(BytesIO(data)).convert("RGB"))
+    return images
+
+
+def embed_all(backend, images: list, batch_size: int = 32) -> np.ndarray:
+    out = []
+    for start in range(0, len(images), batch_size):
+        batch = torch.stack([backend.preprocess(img) for img in images[start:start + batch_size]])
+        out.append(backend.encode_images(batch).numpy())
+    return np.concatenate(out)
+
+
+def top_k(queries: np.ndarray, items: np.ndarray, k: int, leave_one_out: bool = False) -> np.ndarray:
+    sims = queries @ items.T
+    if leave_one_out:
+        np.fill_diagonal(sims, -np.inf)
+    return np.argsort(-sims, axis=1)[:, :k]
+
+
+def agreement(ids: np.ndarray, reference: np.ndarray) -> dict:
+    k = ids.shape[1]
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(ids.tolist(), reference.tolist())]
+    return {"overlap": float(np.mean(overlap)), "top1": float(np.mean(ids[:, 0] == reference[:, 0]))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency vs. retrieval agreement of the CLIP model tiers.")
+    parser.add_argument("--models", nargs="+", default=list(clip_model.MODEL_TIERS),
+                        help="Tiers or '<architecture>/<pretrained>' pairs (default: every tier)")
+    parser.add_argument("--reference", default="base", help="Tier the others are compared to (default: base)")
+    parser.add_argument("--datadir", default=config.model_data_dir("base"),
+                        help="Folder holding the <brand>_products.json scrapes (default: <project>/data)")
+    parser.add_argument("--cache-dir", default=config.IMAGE_CACHE_DIR,
+                        help="Image cache to read from (default: STYLEMATE_IMAGE_CACHE_DIR)")
+    parser.add_argument("--download", action="store_true", help="Fetch (and cache) images that aren't cached yet")
+    parser.add_argument("--max-images", type=int, default=256, help="Catalog images to embed per model")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours compared per query")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--latency-samples", type=int, default=32, help="Images timed per batch size")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="eager")
+    parser.add_argument("--threads", type=int, default=config.TORCH_NUM_THREADS)
+    parser.add_argument("--out", help="Write the results as JSON here")
+    args = parser.parse_args()
+
+    if not args.cache_dir or not os.path.isdir(args.cache_dir):
+        print(f"❌ No image cache at {args.cache_dir!r}; run pipeline.py with STYLEMATE_IMAGE_CACHE_DIR set first")
+        sys.exit(1)
+    torch.set_num_threads(args.threads)
+    images = catalog_images(args.datadir, ImageCache(args.cache_dir), args.max_images, args.download)
+    if len(images) <= args.k:
+        print(f"❌ Only {len(images)} catalog images found in the cache; need more than k={args.k}")
+        sys.exit(1)
+    queries = load_popular_queries(config.TEXT_POPULAR_QUERIES)
+    models = list(dict.fromkeys([args.reference] + args.models))
+
+    results = {}
+    for model in models:
+        tag = clip_model.model_tag(model)
+        print(f"🧠 {model} ({tag}) …")
+        t0 = time.perf_counter()
+        backend = create_backend(args.backend, clip=model)
+        load_s = time.perf_counter() - t0
+        vectors = embed_all(backend, images)
+        sample = torch.stack([backend.preprocess(img) for img in images[:args.latency_samples]])
+        result = {
+            "tag": tag, "dim": int(vectors.shape[1]), "input_size": int(sample.shape[-1]), "load_s": load_s,
+            "image_ids": top_k(vectors, vectors, args.k, leave_one_out=True),
+            "text_ids": top_k(backend.encode_texts(queries).numpy(), vectors, args.k) if queries else None,
+        }
+        for b in args.batch_sizes:
+            result[f"ms_per_image@{b}"] = latency_per_image(backend, sample, batch_size=b)["ms_per_image"]
+        results[model] = result
+
+    reference = results[args.reference]
+    report = {"images": len(images), "queries": len(queries), "k": args.k, "reference": args.reference,
+              "backend": args.backend, "models": {}}
+    for model in args.models:
+        r = results[model]
+        row = {key: value for key, value in r.items() if not key.endswith("_ids")}
+        image = agreement(r["image_ids"], reference["image_ids"])
+        row["image_overlap"], row["image_top1"] = image["overlap"], image["top1"]
+        row["text_overlap"] = agreement(r["text_ids"], reference["text_ids"])["overlap"] if queries else None
+        report["models"][model] = row
+
+    print(f"\n{len(images)} catalog images, {len(queries)} text queries, overlap@{args.k} vs. {args.reference}")
+    print(f"{'model':<8} {'dim':>4} {'load s':>7} " + " ".join(f"{'ms@b' + str(b):>8}" for b in args.batch_sizes)
+          + f" {'img ovl':>8} {'img top1':>9} {'txt ovl':>8}")
+    for model, row in report["models"].items():
+        text = f"{row['text_overlap']:>8.3f}" if row["text_overlap"] is not None else f"{'-':>8}"
+        print(f"{model:<8} {row['dim']:>4} {row['load_s']:>7.1f} "
+              + " ".join(f"{row[f'ms_per_image@{b}']:>8.1f}" for b in args.batch_sizes)
+              + f" {row['image_overlap']:>8.3f} {row['image_top1']:>9.3f} {text}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# stylemate-ai/benchmarks/bench_reload.py
+#
+# Catalog hot reload under load: searcher threads query a CatalogRegistry
+# (snapshot per request, as the servers do) while the catalog on disk is
+# rebuilt and the watcher swaps it in. Reports search latency before, around
+# and after the swap, and checks that no request ever mixed two versions.
+#
+#   python benchmarks/bench_reload.py
+#   python benchmarks/bench_reload.py --products 200000 --threads 4 --no-mmap
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import json
+import time
+import argparse
+import tempfile
+import threading
+import numpy as np
+
+import config
+from catalog import Catalog
+from catalog_registry import CatalogRegistry
+
+
+def write_catalog(folder: str, products: int, dim: int, version: int, seed: int):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((products, dim)).astype("float32")
+    half = products // 2
+    brands = [
+        (name, vectors[lo:hi], [{"title": f"v{version} #{i}", "price": "$10.00", "url": f"https://{name}/{i}",
+                                 "tags": [], "sizes": []} for i in range(lo, hi)])
+        for name, lo, hi in (("drmers", 0, half), ("galore", half, products))
+    ]
+    Catalog.from_vectors(brands).save(folder)
+
+
+def percentiles(samples: list) -> dict:
+    if not samples:
+        return {"n": 0}
+    ms = np.asarray(samples) * 1000.0
+    return {"n": len(ms), "p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search latency across a catalog hot reload.")
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--threads", type=int, default=2, help="Concurrent searcher threads")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Steady-state time before and after")
+    parser.add_argument("--no-mmap", action="store_true", help="Load onto the heap instead of mmap")
+    parser.add_argument("--out", help="Write the results as JSON here")
+    args = parser.parse_args()
+    config.MMAP_CATALOG = not args.no_mmap
+
+    with tempfile.TemporaryDirectory() as folder:
+        write_catalog(folder, args.products, args.dim, version=1, seed=0)
+        registry = CatalogRegistry(catalog_dir=folder, datadir=folder)
+        registry.load()
+
+        samples, mixed, stop = [], [0], threading.Event()
+        lock = threading.Lock()
+
+        def searcher(seed):
+            rng = np.random.default_rng(seed)
+            while not stop.is_set():
+                q = rng.standard_normal((1, args.dim)).astype("float32")
+                q /= np.linalg.norm(q)
+                t0 = time.perf_counter()
+                catalog = registry.current
+                scores, ids = catalog.search(q, 10)
+                results = catalog.results(scores[0], ids[0])
+                elapsed = time.perf_counter() - t0
+                with lock:
+                    samples.append((time.perf_counter(), elapsed))
+                    mixed[0] += len({r["title"].split(" ")[0] for r in results}) != 1
+
+        threads = [threading.Thread(target=searcher, args=(i,), daemon=True) for i in range(args.threads)]
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+
+        t_build = time.perf_counter()
+        write_catalog(folder, args.products, args.dim, version=2, seed=1)
+        t_swap = time.perf_counter()
+        registry.check()                  # sees the change …
+        swapped = registry.check()        # … and loads once it held still
+        t_done = time.perf_counter()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+
+    phase = lambda lo, hi: [s for t, s in samples if lo <= t < hi]
+    report = {
+        "products": args.products, "threads": args.threads, "mmap": not args.no_mmap,
+        "swapped": swapped, "version": registry.version, "load_seconds": registry.load_seconds,
+        "mixed_version_responses": mixed[0],
+        "steady": percentiles(phase(0, t_build)),
+        "rebuild": percentiles(phase(t_build, t_swap)),
+        "reload": percentiles(phase(t_swap, t_done)),
+        "after": percentiles(phase(t_done, float("inf"))),
+    }
+
+    print(f"\n{args.products} products, {args.threads} searcher thread(s), "
+          f"{'mmap' if not args.no_mmap else 'heap'}; reload took {registry.load_seconds:.3f}s")
+    print(f"{'phase':<10} {'searches':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name in ("steady", "rebuild", "reload", "after"):
+        r = report[name]
+        if r["n"]:
+            print(f"{name:<10} {r['n']:>9} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['max_ms']:>8.2f}")
+    print(("✅" if swapped and not mixed[0] else "❌") +
+          f" swapped to v{registry.version}; {mixed[0]} responses mixed two versions")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# stylemate-ai/benchmarks/bench_styles.py
+#
+# Style scoring: a Python loop of utils.cosine_similarity over every
+# (query, style) pair vs. one StyleScorer matrix multiply, for a single query
+# (the /recommend?styles=1 case) and a batch. Checks both rank styles the same.
+#
+#   python benchmarks/bench_styles.py
+#   python benchmarks/bench_styles.py --vectors reference_vectors.json --queries 1000
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import json
+import time
+import argparse
+import numpy as np
+
+from styles import StyleScorer
+from utils import cosine_similarity
+
+
+def loop_labels(reference: dict, queries: np.ndarray) -> list:
+    labels = []
+    for q in queries:
+        q = q.tolist()
+        labels.append(max(reference, key=lambda name: cosine_similarity(q, reference[name])))
+    return labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-pair vs. matrix style scoring.")
+    parser.add_argument("--vectors", default=os.path.join(root_dir, "reference_vectors.json"))
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--out", help="Write the results as JSON here")
+    args = parser.parse_args()
+
+    with open(args.vectors, "r", encoding="utf-8") as f:
+        reference = json.load(f)
+    scorer = StyleScorer.load(args.vectors)
+
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((args.queries, scorer.dim)).astype("float32")
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    report = {"styles": len(scorer), "queries": args.queries}
+    for label, batch in (("single", queries[:1]), ("batch", queries)):
+        t0 = time.perf_counter()
+        expected = loop_labels(reference, batch)
+        loop_ms = (time.perf_counter() - t0) * 1000.0
+        t0 = time.perf_counter()
+        got = scorer.labels(batch)
+        matrix_ms = (time.perf_counter() - t0) * 1000.0
+        report[label] = {"loop_ms": loop_ms, "matrix_ms": matrix_ms, "agree": got == expected}
+
+    print(f"\n{len(scorer)} styles × {scorer.dim}-d")
+    print(f"{'queries':<10} {'loop ms':>10} {'matrix ms':>10} {'speed-up':>9} {'agree':>6}")
+    for label, n in (("single", 1), ("batch", args.queries)):
+        r = report[label]
+        print(f"{n:<10} {r['loop_ms']:>10.3f} {r['matrix_ms']:>10.3f} "
+              f"{r['loop_ms'] / max(r['matrix_ms'], 1e-9):>8.0f}× {str(r['agree']):>6}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
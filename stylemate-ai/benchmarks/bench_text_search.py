@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# stylemate-ai/benchmarks/bench_text_search.py
+#
+# Query-embedding latency of a text search vs. an image search on the same
+# backend: a text query encoded cold (tokenize + text tower), a text query
+# answered from the cache, and an uploaded JPEG (decode + preprocess + visual
+# tower). The catalog search that follows is identical for all three.
+#
+#   python benchmarks/bench_text_search.py
+#   python benchmarks/bench_text_search.py --image test.jpg --repeats 50
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import io
+import json
+import time
+import argparse
+import numpy as np
+from PIL import Image
+
+import config
+from inference import get_backend
+from image_io import make_preprocess, open_image, input_size
+from text_search import TextQueryCache, load_popular_queries, normalize_query, warm_popular
+
+
+def median_ms(fn, repeats: int) -> float:
+    fn()
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return float(np.median(timings) * 1000.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text vs. image query embedding latency.")
+    parser.add_argument("--image", default=os.path.join(root_dir, "test.jpg"))
+    parser.add_argument("--query", default="boxy black hoodie")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--out", help="Write the results as JSON here")
+    args = parser.parse_args()
+
+    backend = get_backend()
+    preprocess = make_preprocess(backend.preprocess)
+    img = Image.open(args.image).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=92)
+    data = buf.getvalue()
+
+    def image_query():
+        x = preprocess(open_image(data, min_size=input_size(preprocess))).unsqueeze(0)
+        return backend.encode_images(x)
+
+    cache = TextQueryCache()
+    popular = load_popular_queries(config.TEXT_POPULAR_QUERIES) or [args.query]
+    t0 = time.perf_counter()
+    warm_popular(cache, popular, lambda chunk: backend.encode_texts(chunk).numpy(),
+                 batch_size=config.TEXT_WARM_BATCH_SIZE)
+    warm_s = time.perf_counter() - t0
+    key = normalize_query(args.query)
+    cache.put(key, backend.encode_texts([key])[0].numpy())
+
+    report = {
+        "image_ms": median_ms(image_query, args.repeats),
+        "text_cold_ms": median_ms(lambda: backend.encode_texts([key]), args.repeats),
+        "text_cached_ms": median_ms(lambda: cache.get(key), args.repeats),
+        "popular_queries": len(popular),
+        "popular_warm_s": warm_s,
+    }
+
+    print(f"\n{'query':<22} {'ms':>10}")
+    print(f"{'image upload':<22} {report['image_ms']:>10.2f}")
+    print(f"{'text, not cached':<22} {report['text_cold_ms']:>10.2f}")
+    print(f"{'text, cached':<22} {report['text_cached_ms']:>10.4f}")
+    print(f"\n{report['popular_queries']} popular queries pre-encoded in {warm_s:.2f}s")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# stylemate-ai/benchmarks/bench_vector_store.py
+#
+# Load time + disk size of the legacy pretty-printed JSON vectors vs. the
+# binary vector store (float32 / float16, eager vs. memory-mapped).
+#
+#   python benchmarks/bench_vector_store.py --json data/drmers_product_vectors.json
+#   python benchmarks/bench_vector_store.py --synthetic 50000
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import json
+import time
+import tempfile
+import argparse
+import numpy as np
+
+from vector_store import read_legacy_json, write_vector_store, read_vector_store, store_paths
+
+
+def best_of(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def synthetic(n: int, dim: int):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    metas = [{"title": f"Product {i}", "price": "$10.00", "url": f"https://example.com/p/{i}"} for i in range(n)]
+    return vectors, metas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON vs. binary vector store: load time and file size.")
+    parser.add_argument("--json", help="Existing legacy *_product_vectors.json to measure")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate N random vectors instead")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.json:
+            json_path = args.json
+            vectors, metas = read_legacy_json(json_path)
+        else:
+            vectors, metas = synthetic(args.synthetic or 10_000, args.dim)
+            json_path = os.path.join(tmp, "vectors.json")
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump([{"meta": m, "vector": v} for m, v in zip(metas, vectors.tolist())], f, indent=2)
+
+        print(f"{len(metas)} vectors × {vectors.shape[1]} dims\n")
+        print(f"{'format':<22} {'size MiB':>9} {'load ms':>9}")
+
+        size = os.path.getsize(json_path) / 2**20
+        t = best_of(lambda: read_legacy_json(json_path), args.repeats)
+        print(f"{'json':<22} {size:>9.2f} {t * 1000:>9.1f}")
+
+        for dtype in ("float32", "float16"):
+            stem = os.path.join(tmp, f"vectors_{dtype}")
+            write_vector_store(stem, vectors, metas, dtype=dtype)
+            size = sum(os.path.getsize(p) for p in store_paths(stem)) / 2**20
+
+            def load_eager():
+                v, _ = read_vector_store(stem, mmap=False)
+                return v.astype(np.float32, copy=False)
+
+            def load_mmap():
+                return read_vector_store(stem, mmap=True)
+
+            t = best_of(load_eager, args.repeats)
+            print(f"{'npy ' + dtype:<22} {size:>9.2f} {t * 1000:>9.1f}")
+            t = best_of(load_mmap, args.repeats)
+            print(f"{'npy ' + dtype + ' (mmap)':<22} {size:>9.2f} {t * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
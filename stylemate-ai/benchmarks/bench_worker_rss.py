@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# stylemate-ai/benchmarks/bench_worker_rss.py
+#
+# Memory per server worker when N processes load the same catalog, with the
+# old heap copy (faiss.read_index + json.load) vs. the memory-mapped,
+# read-only load (Catalog.load(..., mmap=True)).
+#
+# RSS counts shared pages once per process, so the number that shows the
+# saving is PSS (shared pages divided between the processes that map them)
+# and the private (unshared) part.
+#
+#   python benchmarks/bench_worker_rss.py --products 200000 --workers 4
+#   python benchmarks/bench_worker_rss.py --catalog data/catalog --workers 4
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import json
+import argparse
+import tempfile
+import multiprocessing
+import numpy as np
+
+from catalog import Catalog
+from index_factory import INDEX_KINDS
+
+
+def memory_mb() -> dict:
+    """Rss / Pss / private MB of this process (Linux smaps_rollup)."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024.0
+    return {
+        "rss_mb": fields.get("Rss", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+        "private_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+def synthetic_catalog(folder: str, n: int, dim: int, kind: str, brands: int = 3):
+    rng = np.random.default_rng(0)
+    triples = []
+    for b in range(brands):
+        count = n // brands + (1 if b < n % brands else 0)
+        vectors = rng.standard_normal((count, dim)).astype("float32")
+        metas = [
+            {
+                "title": f"Synthetic product {b}-{i} with a reasonably long title",
+                "price": f"${10 + i % 190}.00",
+                "url": f"https://brand{b}.example.com/products/item-{i}",
+                "image_url": f"https://cdn.brand{b}.example.com/images/item-{i}.jpg",
+            }
+            for i in range(count)
+        ]
+        triples.append((f"brand{b}", vectors, metas))
+    Catalog.from_vectors(triples, kind=kind).save(folder)
+
+
+def worker(folder: str, mmap: bool, barrier, results, queries: int):
+    catalog = Catalog.load(folder, mmap=mmap)
+    rng = np.random.default_rng(os.getpid())
+    q = rng.standard_normal((queries, catalog.index.d)).astype("float32")
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    # serve some traffic: searches touch the vectors, results touch metas
+    scores, ids = catalog.search(q, 10)
+    for row in range(len(q)):
+        catalog.results(scores[row], ids[row])
+    for row in range(0, len(catalog.metas), 97):
+        catalog.metas[row]
+    barrier.wait()          # every worker is loaded → measure together
+    results.put(memory_mb())
+    barrier.wait()          # keep the mappings alive until all have measured
+
+
+def measure(folder: str, workers: int, mmap: bool, queries: int) -> list:
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(folder, mmap, barrier, results, queries)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker memory: heap-loaded vs mmap'd catalog.")
+    parser.add_argument("--catalog", help="Existing catalog folder (default: build a synthetic one)")
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--kind", choices=INDEX_KINDS, default="flat")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=32)
+    parser.add_argument("--out", help="Write the results as JSON here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.catalog
+        if folder is None:
+            folder = tmp
+            print(f"🔨 Building a synthetic {args.kind} catalog: {args.products} × {args.dim} …")
+            synthetic_catalog(folder, args.products, args.dim, args.kind)
+
+        report = {}
+        for mode, mmap in (("heap", False), ("mmap", True)):
+            rows = measure(folder, args.workers, mmap, args.queries)
+            report[mode] = {key: float(np.mean([r[key] for r in rows])) for key in rows[0]}
+
+    print(f"\n{args.workers} workers, per-worker average:")
+    print(f"{'load':<6} {'RSS MB':>9} {'PSS MB':>9} {'private MB':>11}")
+    for mode, r in report.items():
+        print(f"{mode:<6} {r['rss_mb']:>9.1f} {r['pss_mb']:>9.1f} {r['private_mb']:>11.1f}")
+    print(f"\nHost total (Σ PSS): heap {report['heap']['pss_mb'] * args.workers:.0f} MB → "
+          f"mmap {report['mmap']['pss_mb'] * args.workers:.0f} MB")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# stylemate-ai/benchmarks/load_test.py
+#
+# Load-test POST /recommend on the Flask server (flask_app.py, threaded) and
+# the async server (asgi_app.py, uvicorn + process pool) at several client
+# concurrency levels: throughput, p50 / p99 latency and error count.
+#
+# By default both servers are started here on free ports and stopped after;
+# pass --flask-url / --asgi-url to hit servers that are already running.
+# Every request uploads different bytes (same pixels) so the embedding cache
+# can't answer it (use --repeat-image to measure the cached path instead).
+#
+#   python benchmarks/load_test.py --concurrency 1 4 16 --requests 64
+#   python benchmarks/load_test.py --targets asgi --asgi-url http://127.0.0.1:8000
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import io
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+from PIL import Image
+
+SERVER_COMMANDS = {
+    "flask": lambda port: [sys.executable, "-c",
+                           f"import flask_app; flask_app.app.run(host='127.0.0.1', port={port}, threaded=True)"],
+    "asgi":  lambda port: [sys.executable, "asgi_app.py", "--port", str(port)],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(target: str, timeout: float = 600.0, env: dict = None):
+    """Launch `target` on a free port (extra environment `env`) and wait for /readyz → (process, base URL)."""
+    port = free_port()
+    proc = subprocess.Popen(SERVER_COMMANDS[target](port), cwd=root_dir,
+                            env=dict(os.environ, **(env or {})),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{target} server exited with code {proc.returncode}")
+        try:
+            if requests.get(f"{url}/readyz", timeout=1).status_code == 200:
+                return proc, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError(f"{target} server not ready after {timeout:.0f}s")
+
+
+def make_payloads(paths: list, n: int, unique: bool) -> list:
+    """JPEG bytes for n requests; with `unique`, each carries its own JPEG comment (new cache key, same pixels)."""
+    images = [Image.open(p).convert("RGB") for p in paths] if paths else [Image.new("RGB", (640, 640), "gray")]
+    payloads = []
+    for i in range(n if unique else len(images)):
+        buf = io.BytesIO()
+        images[i % len(images)].save(buf, "JPEG", quality=90, comment=f"load-test {i}" if unique else "")
+        payloads.append(buf.getvalue())
+    return payloads
+
+
+def run_level(url: str, payloads: list, concurrency: int, n_requests: int, k: int) -> dict:
+    local = threading.local()
+
+    def one(i: int):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        t0 = time.perf_counter()
+        try:
+            r = session.post(f"{url}/recommend", params={"k": k},
+                             files={"file": ("query.jpg", payloads[i % len(payloads)], "image/jpeg")}, timeout=300)
+            ok = r.status_code == 200
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - t0, ok
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        results = list(ex.map(one, range(n_requests)))
+    wall = time.perf_counter() - t0
+
+    lat_ms = np.asarray([dt for dt, ok in results if ok]) * 1000.0
+    return {
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "errors": sum(1 for _, ok in results if not ok),
+        "throughput_rps": n_requests / wall,
+        "p50_ms": float(np.percentile(lat_ms, 50)) if len(lat_ms) else None,
+        "p99_ms": float(np.percentile(lat_ms, 99)) if len(lat_ms) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /recommend on the Flask and ASGI servers.")
+    parser.add_argument("--targets", nargs="+", choices=sorted(SERVER_COMMANDS), default=["flask", "asgi"])
+    parser.add_argument("--flask-url", help="Use this running Flask server instead of starting one")
+    parser.add_argument("--asgi-url", help="Use this running ASGI server instead of starting one")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    parser.add_argument("--images", nargs="*", default=[os.path.join(root_dir, "test.jpg")])
+    parser.add_argument("--repeat-image", action="store_true", help="Same bytes every time (cache hits)")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--out", help="Write the results as JSON here")
+    args = parser.parse_args()
+
+    paths = [p for p in args.images if os.path.exists(p)]
+    payloads = make_payloads(paths, args.requests * len(args.concurrency), unique=not args.repeat_image)
+    urls = {"flask": args.flask_url, "asgi": args.asgi_url}
+
+    report = {}
+    for target in args.targets:
+        proc = None
+        url = urls[target]
+        if url is None:
+            print(f"🔨 Starting {target} server …")
+            proc, url = start_server(target)
+        try:
+            run_level(url, payloads, 1, 2, args.k)   # warm-up
+            rows = []
+            for level, concurrency in enumerate(args.concurrency):
+                # fresh slice of payloads per level so earlier levels don't warm the cache
+                level_payloads = payloads[level * args.requests:(level + 1) * args.requests] or payloads
+                rows.append(run_level(url, level_payloads, concurrency, args.requests, args.k))
+            report[target] = rows
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+
+    print(f"\n{'server':<7} {'conc':>5} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for target, rows in report.items():
+        for r in rows:
+            p50 = f"{r['p50_ms']:.1f}" if r["p50_ms"] is not None else "-"
+            p99 = f"{r['p99_ms']:.1f}" if r["p99_ms"] is not None else "-"
+            print(f"{target:<7} {r['concurrency']:>5} {r['throughput_rps']:>8.2f} {p50:>9} {p99:>9} {r['errors']:>7}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# stylemate-ai/benchmarks/suite.py
+#
+# Reproducible serving benchmark: one JSON report per run that can be diffed
+# between commits (--compare).
+#
+#   stages   – per-image decode (image_io.open_image), preprocess and encode
+#              (per image, at several batch sizes) on the configured backend
+#   search   – synthetic clustered catalogs of every --sizes × --kinds: build
+#              time, index memory, recall@k against exact search, and p50/p99
+#              of a plain search, a brand-filtered search, a price-filtered
+#              search, result assembly (ids → product dicts) and JSON encoding
+#   load     – the Flask and ASGI servers started on a saved synthetic catalog
+#              (STYLEMATE_CATALOG_DIR), driven by benchmarks/load_test.py at
+#              each --concurrency: throughput, latency percentiles, server RSS
+#
+# Everything is seeded, so two runs on the same machine see the same data.
+#
+#   python benchmarks/suite.py --sizes 1000 10000 100000 --out bench-$(git rev-parse --short HEAD).json
+#   python benchmarks/suite.py --sizes 1000000 --kinds ivfsq8 hnsw --skip-stages --skip-load
+#   python benchmarks/suite.py --compare bench-old.json bench-new.json
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import io
+import json
+import time
+import platform
+import resource
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+import config
+from attributes import AttributeFilter
+from index_factory import INDEX_KINDS, index_memory_bytes
+
+BRANDS = 3
+
+
+# ─── HELPERS ──────────────────────────────────────────────────────────────────
+def percentiles(seconds: list) -> dict:
+    ms = np.asarray(seconds) * 1000.0
+    return {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99)),
+            "mean_ms": float(ms.mean())}
+
+
+def timed(fn, repeats: int) -> list:
+    fn()   # warm-up
+    out = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def tree_rss_mb(pid: int) -> float:
+    """Resident MB of `pid` plus all its descendants (Linux /proc)."""
+    total, todo = 0.0, [pid]
+    while todo:
+        p = todo.pop()
+        try:
+            with open(f"/proc/{p}/status") as f:
+                total += next((int(line.split()[1]) for line in f if line.startswith("VmRSS:")), 0) / 1024.0
+            for task in os.listdir(f"/proc/{p}/task"):
+                with open(f"/proc/{p}/task/{task}/children") as f:
+                    todo.extend(int(c) for c in f.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root_dir,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    import faiss
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "faiss": faiss.__version__,
+        "cpus": os.cpu_count(),
+        "backend": config.INFERENCE_BACKEND,
+        "fast_decode": config.FAST_DECODE,
+        "torch_threads": config.TORCH_NUM_THREADS,
+    }
+
+
+# ─── SYNTHETIC CATALOGS ───────────────────────────────────────────────────────
+def synthetic_vectors(n: int, dim: int, seed: int = 0, chunk: int = 100_000) -> np.ndarray:
+    """
+    Clustered, normalized embeddings (products of a catalog bunch up by
+    category the way CLIP embeddings do), generated in chunks to bound the
+    temporaries at 1M+ rows.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(16, n // 1000), dim)).astype(np.float32)
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, chunk):
+        stop = min(n, start + chunk)
+        rows = centers[rng.integers(0, len(centers), stop - start)]
+        rows += 0.6 * rng.standard_normal(rows.shape, dtype=np.float32)
+        rows /= np.linalg.norm(rows, axis=1, keepdims=True)
+        out[start:stop] = rows
+    return out
+
+
+def synthetic_metas(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed + 1)
+    prices = rng.uniform(10.0, 500.0, n)
+    return [
+        {
+            "title": f"Synthetic product {i}",
+            "price": f"${prices[i]:.2f} CAD",
+            "url": f"https://shop.example.com/products/item-{i}",
+            "image_url": f"https://cdn.example.com/images/item-{i}.jpg",
+            "tags": ["hoodies" if i % 4 == 0 else "tees"],
+            "sizes": [{"size": s, "in_stock": (i + j) % 3 != 0} for j, s in enumerate(("S", "M", "L"))],
+        }
+        for i in range(n)
+    ]
+
+
+def synthetic_catalog(n: int, dim: int, kind: str, seed: int = 0):
+    """(Catalog over BRANDS synthetic brands, the normalized vectors in catalog row order)."""
+    from catalog import Catalog
+    vectors = synthetic_vectors(n, dim, seed)
+    metas = synthetic_metas(n, seed)
+    bounds = np.linspace(0, n, BRANDS + 1).astype(int)
+    triples = [(f"brand{b}", vectors[bounds[b]:bounds[b + 1]], metas[bounds[b]:bounds[b + 1]]) for b in range(BRANDS)]
+    return Catalog.from_vectors(triples, kind=kind), vectors
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int, chunk: int = 200_000) -> np.ndarray:
+    """Brute-force top-k ids, scanning the catalog in chunks."""
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+    for start in range(0, len(vectors), chunk):
+        scores = queries @ vectors[start:start + chunk].T
+        ids = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+        scores = np.hstack([best_scores, scores])
+        ids = np.hstack([best_ids, ids])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_ids = np.take_along_axis(ids, top, axis=1)
+    return best_ids
+
+
+# ─── STAGES ───────────────────────────────────────────────────────────────────
+def bench_stages(image_path: str, repeats: int, batch_sizes: list) -> dict:
+    import torch
+    from PIL import Image
+    from inference import get_backend
+    from image_io import open_image, make_preprocess, input_size
+
+    backend = get_backend()
+    preprocess = make_preprocess(backend.preprocess)
+    size = input_size(preprocess)
+    photo = Image.open(image_path).convert("RGB").resize((3000, 2250), Image.Resampling.BICUBIC)
+    buf = io.BytesIO()
+    photo.save(buf, "JPEG", quality=92)
+    data = buf.getvalue()
+
+    img = open_image(data, min_size=size)
+    report = {
+        "decode": percentiles(timed(lambda: open_image(data, min_size=size), repeats)),
+        "preprocess": percentiles(timed(lambda: preprocess(img), repeats)),
+        "encode": {},
+    }
+    x = preprocess(img)
+    for batch_size in batch_sizes:
+        batch = torch.stack([x] * batch_size)
+        stats = percentiles(timed(lambda: backend.encode_images(batch), max(2, repeats // batch_size)))
+        report["encode"][f"batch={batch_size}"] = dict(stats, per_image_ms=stats["p50_ms"] / batch_size)
+    return report
+
+
+# ─── SEARCH ───────────────────────────────────────────────────────────────────
+def bench_search(n: int, dim: int, kind: str, queries: int, k: int) -> dict:
+    t0 = time.perf_counter()
+    catalog, vectors = synthetic_catalog(n, dim, kind)
+    build_s = time.perf_counter() - t0
+    catalog.configure_search(nprobe=config.FAISS_NPROBE, ef_search=config.FAISS_EF_SEARCH,
+                             exact_filter_rows=config.FILTER_EXACT_MAX_ROWS)
+
+    rng = np.random.default_rng(7)
+    q = vectors[rng.choice(n, size=min(queries, n), replace=False)]
+    q = q + 0.05 * rng.standard_normal(q.shape, dtype=np.float32)
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    k = min(k, n)
+
+    truth = exact_top_k(vectors, q, k)
+    _, found = catalog.search(q, k)
+    hits = sum(len(set(t.tolist()) & set(f.tolist())) for t, f in zip(truth, found))
+
+    price = AttributeFilter(0.0, 59.0, (), ())   # ~10% of the uniform $10–$500 prices
+    row = {"n": n, "kind": kind, "build_s": build_s, "index_bytes": index_memory_bytes(catalog.index),
+           f"recall@{k}": hits / truth.size}
+    stages = {
+        "search": lambda i: catalog.search(q[i:i + 1], k),
+        "search_brand": lambda i: catalog.search(q[i:i + 1], k, brands=["brand0"]),
+        "search_price": lambda i: catalog.search(q[i:i + 1], k, filters=price),
+    }
+    for name, fn in stages.items():
+        fn(0)
+        lat = []
+        for i in range(len(q)):
+            t0 = time.perf_counter()
+            fn(i)
+            lat.append(time.perf_counter() - t0)
+        row[name] = percentiles(lat)
+
+    scores, ids = catalog.search(q, k)
+    results = [catalog.results(scores[i], ids[i]) for i in range(len(q))]
+    row["results"] = percentiles(timed(lambda: catalog.results(scores[0], ids[0]), len(q)))
+    row["json"] = percentiles(timed(lambda: json.dumps(results[0]), len(q)))
+    row["peak_rss_mb"] = peak_rss_mb()
+    return row
+
+
+# ─── LOAD ─────────────────────────────────────────────────────────────────────
+def bench_load(n: int, dim: int, kind: str, targets: list, concurrency: list, requests: int,
+               image_path: str, k: int) -> dict:
+    from benchmarks.load_test import make_payloads, run_level, start_server
+    report = {}
+    with tempfile.TemporaryDirectory() as folder:
+        catalog, _ = synthetic_catalog(n, dim, kind)
+        catalog.save(folder)
+        del catalog
+        payloads = make_payloads([image_path], requests * len(concurrency), unique=True)
+        for target in targets:
+            print(f"🔨 Starting {target} server on the {n}-product catalog …")
+            proc, url = start_server(target, env={"STYLEMATE_CATALOG_DIR": folder})
+            try:
+                run_level(url, payloads, 1, 2, k)   # warm-up
+                for level, conc in enumerate(concurrency):
+                    level_payloads = payloads[level * requests:(level + 1) * requests]
+                    row = run_level(url, level_payloads, conc, requests, k)
+                    row["server_rss_mb"] = tree_rss_mb(proc.pid)
+                    report[f"{target}/c={conc}"] = row
+            finally:
+                proc.terminate()
+                proc.wait()
+    return report
+
+
+# ─── COMPARE ──────────────────────────────────────────────────────────────────
+def flatten(obj, prefix: str = "") -> dict:
+    if isinstance(obj, dict):
+        out = {}
+        for key, value in obj.items():
+            out.update(flatten(value, f"{prefix}/{key}" if prefix else str(key)))
+        return out
+    if isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        return {prefix: float(obj)}
+    return {}
+
+
+def compare(old_path: str, new_path: str, threshold: float):
+    """Print every timing / throughput / memory metric that moved by more than `threshold`."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    a, b = flatten({key: old[key] for key in ("stages", "search", "load") if key in old}), \
+        flatten({key: new[key] for key in ("stages", "search", "load") if key in new})
+    print(f"{old.get('env', {}).get('commit', old_path)} → {new.get('env', {}).get('commit', new_path)}\n")
+    print(f"{'metric':<58} {'before':>11} {'after':>11} {'change':>8}")
+    for key in sorted(set(a) & set(b)):
+        if a[key] == 0:
+            continue
+        change = (b[key] - a[key]) / abs(a[key])
+        if abs(change) >= threshold:
+            print(f"{key:<58} {a[key]:>11.3f} {b[key]:>11.3f} {change:>+7.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serving benchmark suite (stages, search, load).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--kinds", nargs="+", choices=INDEX_KINDS, default=["flat", "ivf", "hnsw"])
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=20, help="Timed repeats per pipeline stage")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, config.BATCH_MAX_SIZE])
+    parser.add_argument("--image", default=os.path.join(root_dir, "test.jpg"))
+    parser.add_argument("--load-size", type=int, default=10_000, help="Catalog size served in the load test")
+    parser.add_argument("--load-kind", choices=INDEX_KINDS, default="flat")
+    parser.add_argument("--targets", nargs="+", choices=["flask", "asgi"], default=["flask", "asgi"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    parser.add_argument("--skip-stages", action="store_true")
+    parser.add_argument("--skip-search", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--out", help="Write the report as JSON here")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Diff two reports and exit")
+    parser.add_argument("--threshold", type=float, default=0.05, help="Smallest relative change --compare shows")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare, threshold=args.threshold)
+        return
+
+    report = {"env": environment(), "args": vars(args)}
+    if not args.skip_stages:
+        print("⏱️  Pipeline stages …")
+        report["stages"] = bench_stages(args.image, args.repeats, args.batch_sizes)
+    if not args.skip_search:
+        report["search"] = {}
+        for n in args.sizes:
+            for kind in args.kinds:
+                print(f"🔨 {kind} catalog, {n} products …")
+                report["search"][f"n={n}/{kind}"] = bench_search(n, args.dim, kind, args.queries, args.k)
+    if not args.skip_load:
+        report["load"] = bench_load(args.load_size, args.dim, args.load_kind, args.targets, args.concurrency,
+                                    args.requests, args.image, args.k)
+
+    if "stages" in report:
+        s = report["stages"]
+        print(f"\n{'stage':<16} {'p50 ms':>9} {'p99 ms':>9}")
+        for name in ("decode", "preprocess"):
+            print(f"{name:<16} {s[name]['p50_ms']:>9.2f} {s[name]['p99_ms']:>9.2f}")
+        for name, r in s["encode"].items():
+            print(f"{'encode ' + name:<16} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f}   ({r['per_image_ms']:.2f} ms/image)")
+    if "search" in report:
+        print(f"\n{'catalog':<18} {'build s':>8} {'recall':>7} {'search':>8} {'brand':>8} {'price':>8} "
+              f"{'results':>8} {'json':>7} {'index MB':>9}   (p50 ms)")
+        for name, r in report["search"].items():
+            recall = next(v for key, v in r.items() if key.startswith("recall@"))
+            print(f"{name:<18} {r['build_s']:>8.2f} {recall:>7.3f} {r['search']['p50_ms']:>8.3f} "
+                  f"{r['search_brand']['p50_ms']:>8.3f} {r['search_price']['p50_ms']:>8.3f} "
+                  f"{r['results']['p50_ms']:>8.3f} {r['json']['p50_ms']:>7.3f} {r['index_bytes'] / 2**20:>9.1f}")
+    if "load" in report:
+        print(f"\n{'server':<12} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'RSS MB':>8}")
+        for name, r in report["load"].items():
+            p50 = f"{r['p50_ms']:.1f}" if r["p50_ms"] is not None else "-"
+            p99 = f"{r['p99_ms']:.1f}" if r["p99_ms"] is not None else "-"
+            print(f"{name:<12} {r['throughput_rps']:>8.2f} {p50:>9} {p99:>9} {r['errors']:>7} {r['server_rss_mb']:>8.0f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
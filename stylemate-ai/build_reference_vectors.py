@@ -1,58 +1,222 @@
+# stylemate-ai/build_reference_vectors.py
+#
+# Builds reference_vectors.json (style name → normalized centroid) from
+# style_images/<style>/*.jpg|jpeg|png, incrementally:
+#
+#   • every image's embedding is cached in a vector store (reference_embeddings.npy
+#     + .meta.json, see vector_store.py) keyed by (path, size, mtime)
+#   • only new / changed images are embedded, in batches, spread over worker
+#     processes that each hold their own model
+#   • only styles whose images were added, changed or removed get a new
+#     centroid; the others keep the one already in reference_vectors.json
+#
+# The output is tagged with the CLIP model that embedded it
+# (reference_vectors.json.model.json, see model_tags.py); the server refuses
+# centroids from another model.
+#
+#   python build_reference_vectors.py                  # incremental
+#   python build_reference_vectors.py --full --workers 4
+#   python build_reference_vectors.py --model small    # → data/models/small/reference_vectors.json
+
 import os
 import json
-import torch
-from clip_model import get_image_embedding  # Make sure this works!
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+import config
+from model_tags import read_tag, write_tag
+from vector_store import write_vector_store, read_vector_store, read_sidecar, store_exists
 
 STYLE_FOLDER = "style_images"
 OUTPUT_FILE = "reference_vectors.json"
+CACHE_STEM = "reference_embeddings"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
 
-def build_vectors():
-    print("🚀 Starting reference vector generation...")
-    print(f"📁 Looking inside folder: {STYLE_FOLDER}")
 
-    reference_vectors = {}
+# ─── WORKER PROCESSES ─────────────────────────────────────────────────────────
+_backend = None
+_preprocess = None
 
-    if not os.path.isdir(STYLE_FOLDER):
-        print(f"❌ ERROR: Folder '{STYLE_FOLDER}' not found!")
-        return
 
-    for style_name in os.listdir(STYLE_FOLDER):
-        style_path = os.path.join(STYLE_FOLDER, style_name)
+def _init_worker(num_threads: int, model: str = None):
+    global _backend, _preprocess
+    import torch
+    from startup import load_backend
+    if model:
+        config.use_clip_model(model)   # spawned workers re-read config from the environment
+    from image_io import make_preprocess
+    _backend = load_backend()   # eager / int8 / traced, per STYLEMATE_INFERENCE_BACKEND
+    _preprocess = make_preprocess(_backend.preprocess)
+    torch.set_num_threads(num_threads)
+
+
+def _embed_batch(paths: list) -> list:
+    """Decode + preprocess `paths` and encode them in one forward pass → vector list or error str each."""
+    import torch
+    from PIL import Image
+    out, tensors, positions = [None] * len(paths), [], []
+    for i, path in enumerate(paths):
+        try:
+            with Image.open(path) as img:
+                tensors.append(_preprocess(img.convert("RGB")))
+            positions.append(i)
+        except Exception as e:
+            out[i] = f"{type(e).__name__}: {e}"
+    if tensors:
+        encoded = _backend.encode_images(torch.stack(tensors)).numpy().astype("float32")
+        for row, i in enumerate(positions):
+            out[i] = encoded[row]
+    return out
+
+
+def embed_files(paths: list, workers: int, batch_size: int) -> list:
+    """Embed `paths` in batches; in-process for a single batch, across `workers` processes otherwise."""
+    batches = [paths[start:start + batch_size] for start in range(0, len(paths), batch_size)]
+    workers = max(1, min(workers, len(batches)))
+    threads = max(1, config.TORCH_NUM_THREADS // workers)
+    if workers == 1:
+        _init_worker(threads, config.CLIP_MODEL)
+        return [vec for batch in batches for vec in _embed_batch(batch)]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        # spawn: never fork a process that may already have torch / OpenMP threads
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(threads, config.CLIP_MODEL),
+    ) as pool:
+        return [vec for batch_out in pool.map(_embed_batch, batches) for vec in batch_out]
+
+
+# ─── EMBEDDING CACHE ──────────────────────────────────────────────────────────
+def cache_tag() -> dict:
+    """What the cached embeddings depend on besides the files themselves."""
+    import clip_model
+    return {
+        "model": clip_model.model_tag(),
+        "backend": config.INFERENCE_BACKEND,
+        "fast_decode": config.FAST_DECODE,
+    }
+
+
+def load_cache(stem: str) -> dict:
+    """(path, size, mtime_ns) → cached vector; {} when there's no cache or it was built differently."""
+    if not store_exists(stem) or read_sidecar(stem).get("tag") != cache_tag():
+        return {}
+    vectors, metas = read_vector_store(stem, mmap=False)
+    return {(m["path"], m["size"], m["mtime_ns"]): vectors[row] for row, m in enumerate(metas)}
+
+
+def scan_styles(folder: str) -> dict:
+    """style → [(path relative to `folder`, size, mtime_ns), …] for every image file."""
+    styles = {}
+    for style in sorted(os.listdir(folder)):
+        style_path = os.path.join(folder, style)
         if not os.path.isdir(style_path):
             print(f"⏭️ Skipping non-folder: {style_path}")
             continue
+        files = []
+        for entry in sorted(os.scandir(style_path), key=lambda e: e.name):
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                st = entry.stat()
+                files.append((os.path.join(style, entry.name), st.st_size, st.st_mtime_ns))
+        styles[style] = files
+    return styles
+
+
+def centroid(vectors: list) -> list:
+    avg = np.mean(np.asarray(vectors, dtype=np.float32), axis=0)
+    return (avg / max(float(np.linalg.norm(avg)), 1e-12)).tolist()
+
+
+def build_vectors(folder: str = STYLE_FOLDER, output: str = OUTPUT_FILE, cache_stem: str = CACHE_STEM,
+                  workers: int = 1, batch_size: int = 32, full: bool = False):
+    import clip_model
+    model = clip_model.model_tag()
+    print(f"🚀 Starting reference vector generation ({model})...")
+    print(f"📁 Looking inside folder: {folder}")
+
+    if not os.path.isdir(folder):
+        print(f"❌ ERROR: Folder '{folder}' not found!")
+        return
 
-        print(f"\n🔍 Processing style: {style_name}")
-        embeddings = []
+    t0 = time.perf_counter()
+    styles = scan_styles(folder)
+    cache = {} if full else load_cache(cache_stem)
+    previous = {}
+    if not full and cache and os.path.exists(output) and read_tag(output) == model:
+        with open(output, "r", encoding="utf-8") as f:
+            previous = json.load(f)
 
-        for filename in os.listdir(style_path):
-            if filename.lower().endswith((".jpg", ".jpeg", ".png")):
-                image_path = os.path.join(style_path, filename)
-                print(f"🖼️ Found image: {image_path}")
+    # the (path, size, mtime) keys each style had when the cache was written
+    cached_keys = {}
+    for key in cache:
+        cached_keys.setdefault(key[0].split(os.sep, 1)[0], set()).add(key)
 
-                try:
-                    emb = get_image_embedding(image_path)
-                    print(f"✅ Embedded image: {filename} → [dim {len(emb)}]")
-                    embeddings.append(torch.tensor(emb))
-                except Exception as e:
-                    print(f"❌ Failed to embed {image_path}: {e}")
+    current = [key for files in styles.values() for key in files]
+    todo = [key for key in current if key not in cache]
+    print(f"🔍 {len(current)} images in {len(styles)} styles; {len(current) - len(todo)} cached, {len(todo)} to embed")
+
+    failed = set()
+    if todo:
+        vectors = embed_files([os.path.join(folder, path) for path, _, _ in todo], workers, batch_size)
+        for key, vec in zip(todo, vectors):
+            if isinstance(vec, str):
+                print(f"❌ Failed to embed {key[0]}: {vec}")
+                failed.add(key)
             else:
-                print(f"⚠️ Skipping non-image file: {filename}")
-
-        if embeddings:
-            stacked = torch.stack(embeddings)
-            avg_vector = stacked.mean(dim=0)
-            avg_vector /= avg_vector.norm()  # normalize
-            reference_vectors[style_name] = avg_vector.tolist()
-            print(f"📦 Stored averaged vector for: {style_name}")
+                cache[key] = vec
+
+    reference_vectors = {}
+    for style, files in styles.items():
+        good = [key for key in files if key not in failed]
+        if not good:
+            print(f"⚠️ No valid images found for style: {style}")
+            continue
+        # a style is affected when an image was added, changed (new size / mtime) or removed
+        if style in previous and cached_keys.get(style) == set(good):
+            reference_vectors[style] = previous[style]
         else:
-            print(f"⚠️ No valid images found for style: {style_name}")
+            reference_vectors[style] = centroid([cache[key] for key in good])
+            print(f"📦 Stored averaged vector for: {style} ({len(good)} images)")
+
+    # keep only entries for files that still exist, so the cache doesn't grow forever
+    live = [key for key in current if key in cache]
+    if live:
+        write_vector_store(
+            cache_stem, np.asarray([cache[key] for key in live], dtype=np.float32),
+            [{"path": p, "size": s, "mtime_ns": m} for p, s, m in live],
+            extra={"tag": cache_tag()},
+        )
 
-    print("\n💾 Writing vectors to:", OUTPUT_FILE)
-    with open(OUTPUT_FILE, "w") as f:
+    print("\n💾 Writing vectors to:", output)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output + ".tmp", "w") as f:
         json.dump(reference_vectors, f)
+    os.replace(output + ".tmp", output)
+    dims = {len(vec) for vec in reference_vectors.values()}
+    write_tag(output, model, dims.pop() if len(dims) == 1 else None)
+
+    print(f"✅ Done in {time.perf_counter() - t0:.1f}s! Reference vectors saved successfully.\n")
 
-    print("✅ Done! Reference vectors saved successfully.\n")
 
 if __name__ == "__main__":
-    build_vectors()
+    parser = argparse.ArgumentParser(description="Build per-style reference vectors (incremental).")
+    parser.add_argument("--folder", default=STYLE_FOLDER)
+    parser.add_argument("--output", help="Centroids JSON (default: STYLEMATE_STYLE_VECTORS for --model)")
+    parser.add_argument("--cache", default=CACHE_STEM, help="Embedding cache stem (.npy + .meta.json)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help="Processes embedding new images (each loads the model)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--full", action="store_true", help="Ignore the cache and re-embed everything")
+    parser.add_argument("--model", help="CLIP model tier or '<architecture>/<pretrained>' (default: STYLEMATE_CLIP_MODEL)")
+    args = parser.parse_args()
+    if args.model:
+        config.use_clip_model(args.model)
+    if not (args.output or config.STYLE_VECTORS):
+        parser.error("style scoring is off (STYLEMATE_STYLE_VECTORS=\"\"); pass --output")
+    build_vectors(args.folder, args.output or config.STYLE_VECTORS, args.cache, workers=args.workers,
+                  batch_size=args.batch_size, full=args.full)
@@ -0,0 +1,451 @@
+# stylemate-ai/catalog.py
+#
+# Unified multi-brand catalog: ONE faiss index holding every brand's product
+# vectors, the matching metas list, and a compact `brand_ids` array (one small
+# int per row) that says which brand each row belongs to.
+#
+# A query costs a single `search` call no matter how many brands are loaded;
+# optional brand and attribute (price / tag / size, see attributes.py) filtering
+# happens inside the search through an ID selector, so there is no per-brand
+# loop and no Python-side merge/sort.
+#
+# Built with a collapse threshold, near-duplicate products (colourways, see
+# near_duplicates.py) share one row: the representative's meta carries
+# "variant_count" and the variant metas sit in a side file that results()
+# only reads when asked to expand them.
+#
+# catalog_info.json records the CLIP model the vectors came from (see
+# model_tags.py); load(model=…) refuses a catalog built by another one.
+#
+# Metas are held as pre-serialized JSON lines (mapped_metas.PackedMetas on the
+# heap, MappedMetas when mmap'd) rather than a dict per product; results_json()
+# builds a response body by concatenating those fragments with the scores.
+
+import os
+import json
+import numpy as np
+import faiss
+from index_factory import (
+    build_index, read_index_shared, search_parameters, set_search_defaults, supports_search_params,
+)
+from mapped_metas import MappedMetas, PackedMetas, mapped_metas_exist, offsets_path, write_mapped_metas
+from attributes import ATTRS_NAME, CatalogAttributes
+from near_duplicates import group_near_duplicates, merged_attributes
+from model_tags import LEGACY_MODEL, check_model
+
+INDEX_NAME  = "catalog.index"
+METAS_NAME  = "catalog_metas.json"
+MAPPED_METAS_NAME = "catalog_metas.jsonl"
+BRANDS_NAME = "catalog_brands.npy"
+INFO_NAME   = "catalog_info.json"
+VARIANTS_NAME = "catalog_variants.jsonl"
+
+
+def catalog_files(folder: str) -> list:
+    """Every file a saved catalog consists of (optional ones included)."""
+    names = (INDEX_NAME, METAS_NAME, BRANDS_NAME, INFO_NAME, MAPPED_METAS_NAME, ATTRS_NAME, VARIANTS_NAME)
+    paths = [os.path.join(folder, name) for name in names]
+    return paths + [offsets_path(os.path.join(folder, name)) for name in (MAPPED_METAS_NAME, VARIANTS_NAME)]
+
+
+class Catalog:
+    def __init__(self, index, metas: list, brand_ids: np.ndarray, brand_names: list, variants=None,
+                 model: str = None):
+        if index.ntotal != len(metas) or len(metas) != len(brand_ids):
+            raise ValueError(
+                f"Catalog size mismatch: index={index.ntotal}, metas={len(metas)}, brand_ids={len(brand_ids)}"
+            )
+        if variants is not None and len(variants) != len(metas):
+            raise ValueError(f"Catalog size mismatch: metas={len(metas)}, variants={len(variants)}")
+        self.groups = None
+        self.index = index
+        # tag of the CLIP model that embedded the vectors (None = not recorded)
+        self.model = model
+        if not isinstance(metas, (MappedMetas, PackedMetas)):
+            metas = PackedMetas.from_metas(metas)
+        if variants is not None and not isinstance(variants, (MappedMetas, PackedMetas)):
+            variants = PackedMetas.from_metas(variants)
+        self.metas = metas
+        # row → list of variant metas (near-duplicates collapsed into this row), or None
+        self.variants = variants
+        self.brand_ids = np.ascontiguousarray(brand_ids, dtype=np.int16)
+        self.brand_names = list(brand_names)
+        self._brand_codes = {name: code for code, name in enumerate(self.brand_names)}
+        # frozenset(brand codes) → (SearchParameters, selector, bitmap, mask);
+        # selector + bitmap are kept alive here because faiss only holds pointers
+        self._selector_cache = {}
+        self.nprobe = None
+        self.ef_search = None
+        self._default_params = None
+        self._attributes = None
+        # filters matching at most this many rows are answered by exact search
+        # over just those rows, so latency drops (not rises) as filters narrow
+        self.exact_filter_rows = 4096
+
+    def __len__(self):
+        return self.index.ntotal
+
+    # ─── CONSTRUCTION ─────────────────────────────────────────────────────────
+    @classmethod
+    def from_brands(cls, brands: list, kind: str = "flat", **index_params):
+        """
+        Merge per-brand (name, faiss_index, metas) triples into one catalog.
+        The per-brand indexes must support `reconstruct_n` (e.g. IndexFlatIP),
+        optionally wrapped in an ID map; metas follow the storage order.
+        """
+        triples = []
+        for name, index, brand_metas in brands:
+            if index.ntotal != len(brand_metas):
+                raise ValueError(
+                    f"Brand {name!r}: index has {index.ntotal} vectors but metas has {len(brand_metas)}"
+                )
+            if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+                index = faiss.downcast_index(index.index)
+            triples.append((name, index.reconstruct_n(0, index.ntotal), brand_metas))
+        return cls.from_vectors(triples, kind=kind, **index_params)
+
+    @classmethod
+    def from_vectors(cls, brands: list, kind: str = "flat", collapse_threshold: float = None,
+                     collapse_same_family: bool = True, model: str = None, **index_params):
+        """
+        Build one catalog index of the given `kind` (see index_factory) from
+        per-brand (name, vectors, metas) triples, e.g. read from vector stores.
+        With `collapse_threshold`, near-duplicates are collapsed first (see
+        near_duplicates.py); `catalog.groups` then lists the input rows of each
+        catalog row, representative first.
+        """
+        if not brands:
+            raise ValueError("Catalog needs at least one brand")
+
+        vectors, metas, brand_ids, names = [], [], [], []
+        for code, (name, brand_vectors, brand_metas) in enumerate(brands):
+            if len(brand_vectors) != len(brand_metas):
+                raise ValueError(
+                    f"Brand {name!r}: {len(brand_vectors)} vectors but {len(brand_metas)} metas"
+                )
+            vectors.append(np.asarray(brand_vectors, dtype="float32"))
+            metas.extend(dict(m, brand=name) for m in brand_metas)
+            brand_ids.append(np.full(len(brand_metas), code, dtype=np.int16))
+            names.append(name)
+
+        vectors = np.array(np.vstack(vectors), dtype="float32")
+        faiss.normalize_L2(vectors)
+        brand_ids = np.concatenate(brand_ids)
+        if not collapse_threshold:
+            return cls(build_index(vectors, kind=kind, **index_params), metas, brand_ids, names, model=model)
+
+        groups = group_near_duplicates(vectors, metas, brand_ids, collapse_threshold, same_family=collapse_same_family)
+        keep = np.asarray([g[0] for g in groups], dtype=np.int64)
+        catalog = cls(
+            build_index(np.ascontiguousarray(vectors[keep]), kind=kind, **index_params),
+            [dict(metas[g[0]], variant_count=len(g) - 1) for g in groups],
+            brand_ids[keep], names,
+            variants=[[metas[row] for row in g[1:]] for g in groups],
+        )
+        # filters match a row when any of its colourways matches
+        catalog._attributes = CatalogAttributes.from_metas([merged_attributes(metas, g) for g in groups])
+        catalog.groups = groups
+        catalog.model = model
+        return catalog
+
+    # ─── PERSISTENCE ──────────────────────────────────────────────────────────
+    def save(self, folder: str):
+        """
+        Every file is written under a temporary name and renamed into place, so
+        a server that has the previous version mmap'd keeps reading intact
+        pages (the old inode) and a reload never sees a half-written file.
+        """
+        os.makedirs(folder, exist_ok=True)
+        path = lambda name: os.path.join(folder, name)
+        faiss.write_index(self.index, path(INDEX_NAME) + ".tmp")
+        with open(path(BRANDS_NAME) + ".tmp", "wb") as f:
+            np.save(f, self.brand_ids)
+        with open(path(METAS_NAME) + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(list(self.metas), f, indent=2, ensure_ascii=False)
+        for name in (INDEX_NAME, BRANDS_NAME, METAS_NAME):
+            os.replace(path(name) + ".tmp", path(name))
+        write_mapped_metas(path(MAPPED_METAS_NAME), self.metas)
+        if self.variants is not None:
+            write_mapped_metas(path(VARIANTS_NAME), self.variants)
+        else:
+            for stale in (path(VARIANTS_NAME), offsets_path(path(VARIANTS_NAME))):
+                if os.path.exists(stale):
+                    os.remove(stale)
+        self.attributes.save(path(ATTRS_NAME))
+        # last: catalog_info.json completing is what marks the new version as whole
+        with open(path(INFO_NAME) + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"brands": self.brand_names, "count": len(self), "model": self.model,
+                       "variants": sum(len(v) for v in self.variants) if self.variants is not None else 0},
+                      f, indent=2)
+        os.replace(path(INFO_NAME) + ".tmp", path(INFO_NAME))
+
+    @classmethod
+    def load(cls, folder: str, mmap: bool = False, model: str = None):
+        """
+        Load a saved catalog. With `mmap`, the index data, brand_ids and metas
+        are memory-mapped read-only instead of copied onto the heap, so every
+        worker process serving the same folder shares one physical copy.
+        With `model`, a catalog embedded by another model raises
+        model_tags.ModelMismatchError before anything else is read.
+        """
+        with open(os.path.join(folder, INFO_NAME), "r", encoding="utf-8") as f:
+            info = json.load(f)
+        check_model(info.get("model"), model, os.path.join(folder, INFO_NAME))
+
+        mapped_metas_path = os.path.join(folder, MAPPED_METAS_NAME)
+        if mmap:
+            index = read_index_shared(os.path.join(folder, INDEX_NAME))
+            brand_ids = np.load(os.path.join(folder, BRANDS_NAME), mmap_mode="r")
+        else:
+            index = faiss.read_index(os.path.join(folder, INDEX_NAME))
+            brand_ids = np.load(os.path.join(folder, BRANDS_NAME))
+
+        if mapped_metas_exist(mapped_metas_path):
+            metas = MappedMetas(mapped_metas_path) if mmap else PackedMetas.load(mapped_metas_path)
+        else:
+            with open(os.path.join(folder, METAS_NAME), "r", encoding="utf-8") as f:
+                metas = json.load(f)
+        variants = None
+        variants_path = os.path.join(folder, VARIANTS_NAME)
+        if mapped_metas_exist(variants_path):
+            variants = MappedMetas(variants_path) if mmap else PackedMetas.load(variants_path)
+        catalog = cls(index, metas, brand_ids, info["brands"], variants=variants,
+                      model=info.get("model") or LEGACY_MODEL)
+        attrs_path = os.path.join(folder, ATTRS_NAME)
+        if os.path.exists(attrs_path):
+            catalog._attributes = CatalogAttributes.load(attrs_path)
+        return catalog
+
+    @staticmethod
+    def exists(folder: str) -> bool:
+        return all(
+            os.path.exists(os.path.join(folder, name))
+            for name in (INDEX_NAME, METAS_NAME, BRANDS_NAME, INFO_NAME)
+        )
+
+    @property
+    def attributes(self) -> CatalogAttributes:
+        """Price / tag / size indexes; built from the metas on first use if not saved."""
+        if self._attributes is None:
+            self._attributes = CatalogAttributes.from_metas(self.metas)
+        return self._attributes
+
+    # ─── SEARCH ───────────────────────────────────────────────────────────────
+    def configure_search(self, nprobe: int = None, ef_search: int = None, exact_filter_rows: int = None):
+        """
+        Set IVF `nprobe` / HNSW `efSearch` for every subsequent search, and
+        the largest filtered subset that is scored exactly instead. Call it
+        before the catalog serves requests: it may build the IVF direct map.
+        """
+        if exact_filter_rows is not None:
+            self.exact_filter_rows = exact_filter_rows
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if self.exact_filter_rows and ivf is not None and ivf.direct_map.no():
+            ivf.make_direct_map()   # row → (list, offset) lookup, needed by vectors()
+        self.nprobe = nprobe or None
+        self.ef_search = ef_search or None
+        set_search_defaults(self.index, nprobe=self.nprobe, ef_search=self.ef_search)
+        self._default_params = search_parameters(self.index, nprobe=self.nprobe, ef_search=self.ef_search)
+        self._selector_cache.clear()
+
+    def _brand_filter(self, brands=None):
+        """
+        Build (and cache) the brand restriction for the given brand names:
+        (SearchParameters or None, row mask). Returns None when no filtering is needed.
+        """
+        if not brands:
+            return None
+        unknown = [b for b in brands if b not in self._brand_codes]
+        if unknown:
+            raise KeyError(f"Unknown brand(s): {', '.join(unknown)}")
+
+        codes = frozenset(self._brand_codes[b] for b in brands)
+        if len(codes) == len(self.brand_names):
+            return None
+
+        cached = self._selector_cache.get(codes)
+        if cached is None:
+            mask = np.isin(self.brand_ids, np.fromiter(codes, dtype=np.int16))
+            bitmap = np.packbits(mask, bitorder="little")
+            selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+            params = None
+            if supports_search_params(self.index):
+                params = search_parameters(self.index, sel=selector, nprobe=self.nprobe, ef_search=self.ef_search)
+            cached = (params, selector, bitmap, mask)
+            self._selector_cache[codes] = cached
+        return cached[0], cached[3]
+
+    def search(self, q: np.ndarray, k: int, brands=None, filters=None):
+        """
+        Search every brand at once. `q` is an (n × D) float32 array of
+        normalized queries; `filters` is an optional attributes.AttributeFilter.
+        Returns (scores, ids), each (n × k); ids are -1 where fewer than k
+        products matched.
+        """
+        k = min(k, len(self))
+        brand_filter = self._brand_filter(brands)
+        if filters is not None:
+            mask = self.attributes.mask(filters)
+            if brand_filter is not None:
+                mask &= brand_filter[1]
+            return self._search_mask(q, k, mask)
+
+        if brand_filter is None:
+            if self._default_params is None:
+                return self.index.search(q, k)
+            return self.index.search(q, k, params=self._default_params)
+
+        params, mask = brand_filter
+        if params is not None:
+            return self.index.search(q, k, params=params)
+        return self._search_post_filter(q, k, mask)
+
+    def _search_mask(self, q: np.ndarray, k: int, mask: np.ndarray):
+        """
+        Search only the rows set in `mask` (a one-off filter, not cached):
+        exact scoring of those rows when there are few of them, otherwise an
+        ID-selector search (or the post-filter fallback for plain PQ).
+        """
+        rows = np.flatnonzero(mask)
+        if len(rows) <= self.exact_filter_rows:
+            result = self._search_rows(q, k, rows)
+            if result is not None:
+                return result
+        if supports_search_params(self.index):
+            bitmap = np.packbits(mask, bitorder="little")
+            selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+            params = search_parameters(self.index, sel=selector, nprobe=self.nprobe, ef_search=self.ef_search)
+            return self.index.search(q, k, params=params)
+        return self._search_post_filter(q, k, mask)
+
+    def _search_rows(self, q: np.ndarray, k: int, rows: np.ndarray):
+        """Exact top-k over `rows` from their stored vectors; None if the index can't reconstruct."""
+        out_scores = np.full((len(q), k), -np.inf, dtype="float32")
+        out_ids = np.full((len(q), k), -1, dtype="int64")
+        if len(rows) == 0:
+            return out_scores, out_ids
+        vectors = self.vectors(rows)
+        if vectors is None:
+            return None
+        scores = q @ vectors.T                        # (n × len(rows)) inner products
+        top = min(k, len(rows))
+        best = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        out_ids[:, :top] = rows[np.take_along_axis(best, order, axis=1)]
+        out_scores[:, :top] = np.take_along_axis(best_scores, order, axis=1)
+        return out_scores, out_ids
+
+    def vectors(self, rows: np.ndarray):
+        """
+        (len(rows) × D) stored (normalized) vectors of `rows`; None if the index
+        can't reconstruct (an IVF index without the direct map configure_search builds).
+        """
+        try:
+            return self.index.reconstruct_batch(np.asarray(rows, dtype="int64"))
+        except RuntimeError:
+            return None
+
+    def _search_post_filter(self, q: np.ndarray, k: int, mask: np.ndarray):
+        """
+        Fallback for index types that reject ID selectors (plain PQ):
+        over-fetch, drop rows outside `mask`, widen until k survive.
+        """
+        fetch = min(len(self), k * 4)
+        while True:
+            scores, ids = self.index.search(q, fetch)
+            keep = (ids >= 0) & mask[np.maximum(ids, 0)]
+            if fetch >= len(self) or (keep.sum(axis=1) >= k).all():
+                break
+            fetch = min(len(self), fetch * 4)
+
+        out_scores = np.full((len(q), k), -np.inf, dtype="float32")
+        out_ids = np.full((len(q), k), -1, dtype="int64")
+        for row in range(len(q)):
+            row_ids, row_scores = ids[row][keep[row]][:k], scores[row][keep[row]][:k]
+            out_ids[row, :len(row_ids)] = row_ids
+            out_scores[row, :len(row_scores)] = row_scores
+        return out_scores, out_ids
+
+    def batch_results(self, names: list, vecs: list, k: int, brands=None, filters=None,
+                      aggregate: bool = False, expand_variants: bool = False) -> dict:
+        """
+        Per-image top-k for a set of query embeddings (one multi-row search).
+        `vecs[i]` is a (D,) embedding, or the exception raised for names[i],
+        which is reported as that image's error. With `aggregate`, the
+        normalized mean of the good embeddings is searched in the same call
+        and ranked as the best match for the whole set.
+        """
+        good, scores, ids = self._batch_search(vecs, k, brands, filters, aggregate)
+        out = {"results": [
+            {"file": name, "error": str(v)} if isinstance(v, Exception) else {"file": name}
+            for name, v in zip(names, vecs)
+        ]}
+        for row, i in enumerate(good):
+            out["results"][i]["products"] = self.results(scores[row], ids[row], expand_variants)
+        if aggregate:
+            out["aggregate"] = self.results(scores[-1], ids[-1], expand_variants) if good else []
+        return out
+
+    def batch_results_json(self, names: list, vecs: list, k: int, brands=None, filters=None,
+                           aggregate: bool = False, expand_variants: bool = False) -> bytes:
+        """batch_results() as a UTF-8 JSON body, with the products assembled by results_json()."""
+        good, scores, ids = self._batch_search(vecs, k, brands, filters, aggregate)
+        rows = dict(zip(good, range(len(good))))
+        entries = []
+        for i, (name, v) in enumerate(zip(names, vecs)):
+            if isinstance(v, Exception):
+                entries.append(json.dumps({"file": name, "error": str(v)}, ensure_ascii=False).encode("utf-8"))
+            else:
+                products = self.results_json(scores[rows[i]], ids[rows[i]], expand_variants)
+                entries.append(b'{"file":' + json.dumps(name, ensure_ascii=False).encode("utf-8")
+                               + b',"products":' + products + b"}")
+        body = b'{"results":[' + b",".join(entries) + b"]"
+        if aggregate:
+            body += b',"aggregate":' + (self.results_json(scores[-1], ids[-1], expand_variants) if good else b"[]")
+        return body + b"}"
+
+    def _batch_search(self, vecs: list, k: int, brands, filters, aggregate: bool):
+        """(positions of the good embeddings, scores, ids); one row per good embedding (+ the centroid)."""
+        good = [i for i, v in enumerate(vecs) if not isinstance(v, Exception)]
+        if not good:
+            return good, None, None
+        q = np.asarray([vecs[i] for i in good], dtype="float32")
+        if aggregate:
+            centroid = q.mean(axis=0, keepdims=True)
+            centroid /= max(float(np.linalg.norm(centroid)), 1e-12)
+            q = np.vstack([q, centroid])
+        scores, ids = self.search(np.ascontiguousarray(q), k, brands=brands, filters=filters)
+        return good, scores, ids
+
+    def results(self, scores: np.ndarray, ids: np.ndarray, expand_variants: bool = False) -> list:
+        """
+        Turn one row of (scores, ids) into the JSON-ready list of products;
+        with `expand_variants`, each also lists its collapsed "variants".
+        """
+        keep = ids >= 0
+        if expand_variants and self.variants is not None:
+            return [
+                dict(self.metas[i], score=s, variants=self.variants[i])
+                for s, i in zip(scores[keep].tolist(), ids[keep].tolist())
+            ]
+        return [
+            dict(self.metas[i], score=s)
+            for s, i in zip(scores[keep].tolist(), ids[keep].tolist())
+        ]
+
+    def results_json(self, scores: np.ndarray, ids: np.ndarray, expand_variants: bool = False) -> bytes:
+        """
+        results() as a UTF-8 JSON array, assembled from each row's stored JSON
+        fragment: no dict copies and nothing re-encoded but the scores.
+        """
+        keep = ids >= 0
+        expand = expand_variants and self.variants is not None
+        parts = []
+        for s, i in zip(scores[keep].tolist(), ids[keep].tolist()):
+            tail = b'"score":' + repr(s).encode()
+            if expand:
+                tail += b',"variants":' + self.variants.fragment(i)
+            meta = self.metas.fragment(i)
+            parts.append(meta[:-1] + (b"," if len(meta) > 2 else b"") + tail + b"}")
+        return b"[" + b",".join(parts) + b"]"
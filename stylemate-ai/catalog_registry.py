@@ -0,0 +1,282 @@
+# stylemate-ai/catalog_registry.py
+#
+# Hot-reloadable catalog: what to serve is described by a manifest built from
+# the pipeline outputs on disk, and a new catalog is loaded off the request
+# path and swapped in atomically.
+#
+#   manifest  – the prebuilt unified catalog in CATALOG_DIR when there is one,
+#               otherwise every brand found in DATA_DIR (a <brand>_vectors store
+#               or <brand>.index + <brand>_metas.json, as pipeline.py writes
+#               them), plus each source file's (size, mtime) as a fingerprint
+#   load      – build the Catalog, configure search and run a warm-up query so
+#               the first request after the swap doesn't pay for cold pages
+#   swap      – one reference assignment: requests take `registry.current`
+#               once and keep using that snapshot, so a request in flight
+#               finishes on the version it started with; the old catalog is
+#               freed when its last request lets go of it
+#   watch     – a daemon thread re-reads the manifest every
+#               CATALOG_RELOAD_INTERVAL_S and reloads when the fingerprint has
+#               changed and then held still for one interval (a build still
+#               writing its files is not picked up half-way)
+#
+# A failed reload keeps serving the previous catalog and is reported in info().
+# Every source is checked against the registry's CLIP model (model_tags.py):
+# vectors from another model are a load failure, never a mixed catalog.
+
+import os
+import json
+import time
+import threading
+
+import numpy as np
+
+import config
+from model_tags import check_model, read_tag
+from vector_store import read_vector_store, store_exists, store_paths
+
+# Brands served from files outside DATA_DIR before the pipeline wrote
+# everything there; used only when DATA_DIR has no source for that brand.
+LEGACY_SOURCES = {
+    "drmers": (os.path.join(config.BASE_DIR, "product.index"), os.path.join(config.BASE_DIR, "product_metas.json")),
+}
+
+
+# ─── BRAND SOURCES (shared with scrapers/build_catalog_index.py) ──────────────
+def discover_brands(datadir: str) -> list:
+    """
+    Every brand in `datadir` with a <brand>_vectors store, or a <brand>.index
+    with a matching <brand>_metas.json.
+    """
+    brands = set()
+    if not os.path.isdir(datadir):
+        return []
+    for filename in os.listdir(datadir):
+        if filename.endswith("_vectors.meta.json"):
+            brand = filename[: -len("_vectors.meta.json")]
+            if store_exists(os.path.join(datadir, f"{brand}_vectors")):
+                brands.add(brand)
+        elif filename.endswith(".index") and filename != "catalog.index":
+            brand = filename[: -len(".index")]
+            if os.path.exists(os.path.join(datadir, f"{brand}_metas.json")):
+                brands.add(brand)
+    return sorted(brands)
+
+
+def brand_files(datadir: str, brand: str) -> list:
+    """The files a brand is loaded from, in the order load_brand_vectors() prefers them."""
+    stem = os.path.join(datadir, f"{brand}_vectors")
+    if store_exists(stem):
+        return list(store_paths(stem))
+    if brand in LEGACY_SOURCES and not os.path.exists(os.path.join(datadir, f"{brand}.index")):
+        return list(LEGACY_SOURCES[brand])
+    return [os.path.join(datadir, f"{brand}.index"), os.path.join(datadir, f"{brand}_metas.json")]
+
+
+def load_brand_vectors(datadir: str, brand: str, model: str = None):
+    """
+    (vectors, metas) for one brand: from its <brand>_vectors store when there is
+    one, otherwise reconstructed from its flat <brand>.index. With `model`,
+    raises model_tags.ModelMismatchError for another model's vectors.
+    """
+    import faiss
+    stem = os.path.join(datadir, f"{brand}_vectors")
+    if store_exists(stem):
+        return read_vector_store(stem, model=model)
+
+    index_path, metas_path = brand_files(datadir, brand)
+    check_model(read_tag(index_path), model, index_path)
+    index = faiss.read_index(index_path)
+    with open(metas_path, "r", encoding="utf-8") as f:
+        metas = json.load(f)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        index = faiss.downcast_index(index.index)
+    return index.reconstruct_n(0, index.ntotal), metas
+
+
+def attach_attributes(datadir: str, brand: str, metas: list) -> list:
+    """
+    Fill in tags / sizes (the filter attributes) from <brand>_products.json for
+    metas written before the pipeline kept them. Matched by product URL.
+    """
+    products_path = os.path.join(datadir, f"{brand}_products.json")
+    if all("tags" in m and "sizes" in m for m in metas) or not os.path.exists(products_path):
+        return metas
+    with open(products_path, "r", encoding="utf-8") as f:
+        by_url = {p.get("url"): p for p in json.load(f)}
+    filled = []
+    for meta in metas:
+        prod = by_url.get(meta.get("url"), {})
+        filled.append(dict(meta, tags=meta.get("tags", prod.get("tags") or []),
+                           sizes=meta.get("sizes", prod.get("sizes") or [])))
+    return filled
+
+
+# ─── MANIFEST ─────────────────────────────────────────────────────────────────
+def _fingerprint(paths: list) -> dict:
+    out = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+            out[path] = [st.st_size, st.st_mtime_ns]
+        except OSError:
+            out[path] = None
+    return out
+
+
+def build_manifest(catalog_dir: str, datadir: str) -> dict:
+    """
+    What would be served right now: {"source": "catalog" | "brands", "brands",
+    "files": {path: [size, mtime_ns]}}. "source" is None when there is nothing.
+    """
+    from catalog import Catalog, catalog_files
+    if Catalog.exists(catalog_dir):
+        with open(os.path.join(catalog_dir, "catalog_info.json"), "r", encoding="utf-8") as f:
+            brands = json.load(f).get("brands", [])
+        return {"source": "catalog", "dir": catalog_dir, "brands": brands,
+                "files": _fingerprint(catalog_files(catalog_dir))}
+
+    brands = discover_brands(datadir)
+    for brand, paths in LEGACY_SOURCES.items():
+        if brand not in brands and all(os.path.exists(p) for p in paths):
+            brands.append(brand)
+    files = [path for brand in brands for path in brand_files(datadir, brand)]
+    files += [os.path.join(datadir, f"{brand}_products.json") for brand in brands]
+    return {"source": "brands" if brands else None, "dir": datadir, "brands": sorted(brands),
+            "files": _fingerprint(files)}
+
+
+def load_from_manifest(manifest: dict, model: str = None):
+    """Build the Catalog a manifest describes, configured for serving; every source must be `model`'s."""
+    from catalog import Catalog
+    if manifest["source"] is None:
+        raise RuntimeError(f"No prebuilt catalog and no brand indexes in {manifest['dir']}")
+    if manifest["source"] == "catalog":
+        # mmap'd: every worker process on the host shares the same pages
+        catalog = Catalog.load(manifest["dir"], mmap=config.MMAP_CATALOG, model=model)
+    else:
+        datadir = manifest["dir"]
+        triples = []
+        for brand in manifest["brands"]:
+            vectors, metas = load_brand_vectors(datadir, brand, model=model)
+            triples.append((brand, vectors, attach_attributes(datadir, brand, metas)))
+        catalog = Catalog.from_vectors(triples, kind=config.CATALOG_INDEX_KIND,
+                                       collapse_threshold=config.COLLAPSE_THRESHOLD or None,
+                                       collapse_same_family=config.COLLAPSE_SAME_FAMILY, model=model)
+    # IVF nprobe / HNSW efSearch (speed ↔ recall), see STYLEMATE_FAISS_* in config.py
+    catalog.configure_search(nprobe=config.FAISS_NPROBE, ef_search=config.FAISS_EF_SEARCH,
+                             exact_filter_rows=config.FILTER_EXACT_MAX_ROWS)
+    return catalog
+
+
+def warm_catalog(catalog):
+    """One search + result serialization + attribute index build, so the pages a request needs are resident."""
+    q = np.zeros((1, catalog.index.d), dtype="float32")
+    q[0, 0] = 1.0
+    scores, ids = catalog.search(q, 10)
+    catalog.results(scores[0], ids[0])
+    catalog.results_json(scores[0], ids[0], expand_variants=True)
+    catalog.attributes
+
+
+# ─── REGISTRY ─────────────────────────────────────────────────────────────────
+class CatalogRegistry:
+    def __init__(self, catalog_dir: str = None, datadir: str = None, model: str = None):
+        import clip_model
+        self.catalog_dir = catalog_dir or config.CATALOG_DIR
+        self.datadir = datadir or config.DATA_DIR
+        # tag every loaded source must carry: the model queries are embedded with
+        self.model = model or clip_model.model_tag()
+        self.current = None          # the live Catalog; read it once per request
+        self.version = 0
+        self.manifest = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self.last_error = None
+        self._reload_lock = threading.Lock()   # one load at a time
+        self._pending = None                   # fingerprint seen changed, waiting to settle
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load(self) -> bool:
+        """Load the catalog the manifest describes and swap it in. Raises if nothing can be loaded."""
+        with self._reload_lock:
+            manifest = build_manifest(self.catalog_dir, self.datadir)
+            t0 = time.perf_counter()
+            catalog = load_from_manifest(manifest, model=self.model)
+            warm_catalog(catalog)
+            self.load_seconds = round(time.perf_counter() - t0, 3)
+            # the swap: requests already holding the old catalog keep it
+            self.current = catalog
+            self.manifest = manifest
+            self.version += 1
+            self.loaded_at = time.time()
+            self.last_error = None
+            self._pending = None
+        print(f"📦 Catalog v{self.version}: {len(catalog)} products from {', '.join(manifest['brands'])} "
+              f"({manifest['source']}, {self.model}, {self.load_seconds:.2f}s)")
+        return True
+
+    def reload(self, force: bool = False) -> bool:
+        """Load again if anything changed (or `force`); on failure keep the current catalog. True when swapped."""
+        manifest = build_manifest(self.catalog_dir, self.datadir)
+        if not force and self.manifest is not None and manifest == self.manifest:
+            return False
+        try:
+            return self.load()
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"❌ Catalog reload failed, still serving v{self.version}: {self.last_error}")
+            return False
+
+    def reload_in_background(self, force: bool = False) -> bool:
+        """Start reload() in a thread; False when a load is already running."""
+        if self._reload_lock.locked():
+            return False
+        threading.Thread(target=self.reload, args=(force,), name="catalog-reload", daemon=True).start()
+        return True
+
+    def check(self) -> bool:
+        """One watcher tick: reload once a changed manifest has held still since the previous tick."""
+        manifest = build_manifest(self.catalog_dir, self.datadir)
+        if manifest == self.manifest:
+            self._pending = None
+            return False
+        if manifest != self._pending:
+            self._pending = manifest   # changed (or still changing): look again next tick
+            return False
+        return self.reload()
+
+    def watch(self, interval_s: float):
+        """Poll for changes every `interval_s` seconds in a daemon thread (no-op for ≤ 0)."""
+        if interval_s <= 0 or self._thread is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval_s):
+                try:
+                    self.check()
+                except Exception as e:
+                    self.last_error = f"{type(e).__name__}: {e}"
+
+        self._thread = threading.Thread(target=loop, name="catalog-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def info(self) -> dict:
+        """JSON-ready description of the live catalog."""
+        catalog = self.current
+        report = {
+            "version": self.version,
+            "loaded": catalog is not None,
+            "products": len(catalog) if catalog is not None else 0,
+            "brands": list(catalog.brand_names) if catalog is not None else [],
+            "source": self.manifest["source"] if self.manifest else None,
+            "model": self.model,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+        }
+        if self.last_error:
+            report["last_error"] = self.last_error
+        return report
@@ -1,17 +1,125 @@
 # clip_model.py
+#
+# The CLIP model is loaded lazily: `import clip_model` is cheap, and the first
+# access to `clip_model.model` / `.preprocess` / `.tokenizer` (or a call to
+# `load_model()`) does the work. The first load resolves the pretrained weights
+# through open_clip (which may hit the hub) and serializes the ready-to-use
+# model into MODEL_ARTIFACT_DIR; every later start just unpickles that file.
+#
+# Which model is chosen by STYLEMATE_CLIP_MODEL: one of the MODEL_TIERS or
+# any open_clip "<architecture>/<pretrained>" pair. `model` / `preprocess` /
+# `tokenizer` are the configured one; load_model("small") etc. load others
+# alongside it (one artifact and one cached copy per model).
+#
+#   python clip_model.py                  # pre-build the artifact (e.g. in a Docker build)
+#   python clip_model.py --model small
 
-import torch
-import open_clip
-from PIL import Image
+import os
+import threading
+
+import config
+
+# Speed / quality points, all embedding images and text into one space per model
+MODEL_TIERS = {
+    "small": ("MobileCLIP-S1", "datacompdr"),
+    "base": ("ViT-B-32", "laion2b_s34b_b79k"),
+    "large": ("ViT-B-16", "laion2b_s34b_b88k"),
+}
+
+_lock = threading.Lock()
+_loaded = {}       # model tag → (model, preprocess)
+_tokenizers = {}   # architecture → tokenizer
+
+
+def resolve(model: str = None) -> tuple:
+    """(architecture, pretrained) for a tier name or "<architecture>/<pretrained>" (default: STYLEMATE_CLIP_MODEL)."""
+    model = model or config.CLIP_MODEL
+    if model in MODEL_TIERS:
+        return MODEL_TIERS[model]
+    if "/" in model:
+        architecture, pretrained = model.split("/", 1)
+        return architecture, pretrained
+    raise ValueError(f"Unknown CLIP model {model!r}; use a tier ({', '.join(MODEL_TIERS)}) "
+                     f"or an open_clip '<architecture>/<pretrained>' pair")
+
+
+def model_tag(model: str = None) -> str:
+    """The tag recorded with every embedding this model produces (see model_tags.py)."""
+    return "/".join(resolve(model))
+
+
+def artifact_path(model: str = None) -> str:
+    """Serialized model + preprocess for this model / torch / open_clip combination."""
+    import torch
+    import open_clip
+    architecture, pretrained = resolve(model)
+    name = f"clip_{architecture}_{pretrained}-torch{torch.__version__}-openclip{open_clip.__version__}.pt"
+    return os.path.join(config.MODEL_ARTIFACT_DIR, name)
+
+
+def _load_from_hub(model: str = None):
+    import open_clip
+    architecture, pretrained = resolve(model)
+    clip, _, preprocess = open_clip.create_model_and_transforms(architecture, pretrained=pretrained)
+    return clip, preprocess
+
+
+def load_model(model: str = None):
+    """(model, preprocess) — from the local artifact when there is one, built once otherwise."""
+    tag = model_tag(model)
+    with _lock:
+        if tag not in _loaded:
+            import torch
+            path = artifact_path(model)
+            if os.path.exists(path):
+                bundle = torch.load(path, map_location="cpu", weights_only=False)
+                clip, preprocess = bundle["model"], bundle["preprocess"]
+            else:
+                clip, preprocess = _load_from_hub(model)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                torch.save({"model": clip, "preprocess": preprocess}, path + ".tmp")
+                os.replace(path + ".tmp", path)
+            _loaded[tag] = (clip.eval(), preprocess)
+    return _loaded[tag]
+
+
+def get_tokenizer(model: str = None):
+    architecture, _ = resolve(model)
+    with _lock:
+        if architecture not in _tokenizers:
+            import open_clip
+            _tokenizers[architecture] = open_clip.get_tokenizer(architecture)
+    return _tokenizers[architecture]
+
+
+def __getattr__(name):
+    if name in ("model", "preprocess"):
+        return load_model()[0 if name == "model" else 1]
+    if name == "tokenizer":
+        return get_tokenizer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-model, _, preprocess = open_clip.create_model_and_transforms(
-    'ViT-B-32', pretrained='laion2b_s34b_b79k'
-)
-tokenizer = open_clip.get_tokenizer('ViT-B-32')
 
 def get_image_embedding(image_path: str):
+    import torch
+    from PIL import Image
+    model, preprocess = load_model()
     image = preprocess(Image.open(image_path)).unsqueeze(0)
     with torch.no_grad():
         embedding = model.encode_image(image)
         embedding /= embedding.norm(dim=-1, keepdim=True)
     return embedding.squeeze().tolist()
+
+
+if __name__ == "__main__":
+    import time
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the serialized CLIP artifact.")
+    parser.add_argument("--model", default=config.CLIP_MODEL,
+                        help=f"Tier ({', '.join(MODEL_TIERS)}) or '<architecture>/<pretrained>' "
+                             f"(default: STYLEMATE_CLIP_MODEL, {config.CLIP_MODEL})")
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    load_model(args.model)
+    print(f"✅ CLIP artifact for {model_tag(args.model)} ready at {artifact_path(args.model)} "
+          f"({time.perf_counter() - t0:.1f}s)")
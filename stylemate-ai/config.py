@@ -0,0 +1,181 @@
+# stylemate-ai/config.py
+#
+# Central place for runtime knobs. Every setting can be overridden with an
+# environment variable of the same name, so deployments can tune the server
+# without touching code.
+
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_str(name: str, default: str) -> str:
+    value = os.environ.get(name)
+    return value if value not in (None, "") else default
+
+
+def _env_path(name: str, default: str) -> str:
+    """Like _env_str, but set to "" the setting is switched off ("" is returned)."""
+    value = os.environ.get(name)
+    return value.strip() if value is not None else default
+
+
+# ─── MICRO-BATCHING INFERENCE QUEUE ───────────────────────────────────────────
+# Max number of images stacked into a single `encode_image` call.
+BATCH_MAX_SIZE = _env_int("STYLEMATE_BATCH_MAX_SIZE", 16)
+# Max time (ms) the first request of a batch waits for company before running.
+BATCH_MAX_WAIT_MS = _env_float("STYLEMATE_BATCH_MAX_WAIT_MS", 10.0)
+# Max uploads in one POST /recommend/batch request
+BATCH_MAX_FILES = _env_int("STYLEMATE_BATCH_MAX_FILES", 32)
+# Torch intra-op threads. Only the batcher thread runs inference, so it can
+# use every core without the BLAS contention of per-request inference.
+TORCH_NUM_THREADS = _env_int("STYLEMATE_TORCH_NUM_THREADS", os.cpu_count() or 1)
+
+# ─── QUERY EMBEDDING CACHE ────────────────────────────────────────────────────
+EMBED_CACHE_ENABLED = _env_bool("STYLEMATE_EMBED_CACHE", True)
+EMBED_CACHE_MAX_ENTRIES = _env_int("STYLEMATE_EMBED_CACHE_MAX_ENTRIES", 10_000)
+EMBED_CACHE_MAX_MB = _env_float("STYLEMATE_EMBED_CACHE_MAX_MB", 64.0)
+# Directory for write-through persistence of the exact tier ("" = memory only)
+EMBED_CACHE_DIR = _env_str("STYLEMATE_EMBED_CACHE_DIR", "")
+# Perceptual (dHash) tier for re-encoded copies of the same picture
+EMBED_CACHE_PERCEPTUAL = _env_bool("STYLEMATE_EMBED_CACHE_PERCEPTUAL", False)
+EMBED_CACHE_PHASH_DISTANCE = _env_int("STYLEMATE_EMBED_CACHE_PHASH_DISTANCE", 4)
+
+# ─── CLIP MODEL (clip_model.py) ───────────────────────────────────────────────
+# Model tier: small / base / large (see clip_model.MODEL_TIERS) or any open_clip
+# "<architecture>/<pretrained>" pair. Vector stores, indexes and catalogs record
+# the model that embedded them and refuse to load under another (model_tags.py).
+CLIP_MODEL = _env_str("STYLEMATE_CLIP_MODEL", "base")
+
+
+def model_data_dir(model: str) -> str:
+    """
+    Where one model's pipeline outputs live, so tiers sit side by side: data/
+    for base (the layout from before tiers), data/models/<model>/ otherwise.
+    """
+    if model == "base":
+        return os.path.join(BASE_DIR, "data")
+    return os.path.join(BASE_DIR, "data", "models", model.replace("/", "__"))
+
+
+def _model_style_vectors(model: str) -> str:
+    return os.path.join(BASE_DIR if model == "base" else model_data_dir(model), "reference_vectors.json")
+
+
+def use_clip_model(model: str):
+    """
+    Switch this process to another CLIP model (the scripts' --model flag),
+    moving the per-model paths along unless their variables are set.
+    """
+    global CLIP_MODEL, DATA_DIR, CATALOG_DIR, STYLE_VECTORS
+    CLIP_MODEL = model
+    DATA_DIR = _env_str("STYLEMATE_DATA_DIR", model_data_dir(model))
+    CATALOG_DIR = _env_str("STYLEMATE_CATALOG_DIR", os.path.join(model_data_dir(model), "catalog"))
+    STYLE_VECTORS = _env_path("STYLEMATE_STYLE_VECTORS", _model_style_vectors(model))
+
+
+# ─── VECTOR INDEX ─────────────────────────────────────────────────────────────
+# Index kind used when the server merges brands at startup (see index_factory.py:
+# flat, ivf, hnsw, sq8, pq, ivfsq8, ivfpq). Prebuilt catalogs keep their own kind.
+CATALOG_INDEX_KIND = _env_str("STYLEMATE_CATALOG_INDEX_KIND", "flat")
+# Search-time knobs; 0 = keep whatever the index was built/saved with.
+FAISS_NPROBE = _env_int("STYLEMATE_FAISS_NPROBE", 0)
+FAISS_EF_SEARCH = _env_int("STYLEMATE_FAISS_EF_SEARCH", 0)
+# Filtered searches (price / tag / size) matching at most this many products
+# score those rows exactly instead of searching the ANN index with a selector.
+FILTER_EXACT_MAX_ROWS = _env_int("STYLEMATE_FILTER_EXACT_MAX_ROWS", 4096)
+# Pipeline outputs (<brand>_vectors store / <brand>.index + <brand>_metas.json)
+DATA_DIR = _env_str("STYLEMATE_DATA_DIR", model_data_dir(CLIP_MODEL))
+# Near-duplicate collapse at catalog build (see near_duplicates.py): products of
+# one brand and title family with cosine ≥ this share one row; 0 = off.
+COLLAPSE_THRESHOLD = _env_float("STYLEMATE_COLLAPSE_THRESHOLD", 0.85)
+# Only group products whose titles share a family ("HOODIE - BLACK" / "HOODIE - PINE")
+COLLAPSE_SAME_FAMILY = _env_bool("STYLEMATE_COLLAPSE_SAME_FAMILY", True)
+# Prebuilt unified catalog served when present (scrapers/build_catalog_index.py)
+CATALOG_DIR = _env_str("STYLEMATE_CATALOG_DIR", os.path.join(model_data_dir(CLIP_MODEL), "catalog"))
+# Memory-map the prebuilt catalog (index, brand ids, metas) read-only so N
+# worker processes on one host share one copy. Only applies to CATALOG_DIR.
+MMAP_CATALOG = _env_bool("STYLEMATE_MMAP_CATALOG", True)
+# Seconds between checks for a rebuilt catalog / new brand outputs, swapped in
+# without a restart (see catalog_registry.py); 0 = only on POST /catalog/reload.
+CATALOG_RELOAD_INTERVAL_S = _env_float("STYLEMATE_CATALOG_RELOAD_INTERVAL_S", 30.0)
+
+# ─── INFERENCE BACKEND ────────────────────────────────────────────────────────
+# eager (fp32 PyTorch), int8 (dynamic quantization) or traced (TorchScript);
+# see inference.py and benchmarks/bench_backends.py for the speed/drift trade-off.
+INFERENCE_BACKEND = _env_str("STYLEMATE_INFERENCE_BACKEND", "eager")
+# Where derived model artifacts (traced graphs, …) are cached
+MODEL_ARTIFACT_DIR = _env_str("STYLEMATE_MODEL_ARTIFACT_DIR", os.path.join(BASE_DIR, "artifacts"))
+
+# ─── STARTUP ──────────────────────────────────────────────────────────────────
+# Load model + catalog in a background thread so /healthz answers immediately
+# and /readyz flips to 200 once everything is warm. Off = load during import.
+BACKGROUND_STARTUP = _env_bool("STYLEMATE_BACKGROUND_STARTUP", True)
+# Largest dummy batch pushed through the encoder at startup (0 = no warm-up)
+WARMUP_BATCH_SIZE = _env_int("STYLEMATE_WARMUP_BATCH_SIZE", BATCH_MAX_SIZE)
+
+# ─── UPLOAD DECODING (image_io.py) ────────────────────────────────────────────
+# Reduced-scale JPEG decode + single-pass resize/crop/normalize instead of the
+# stock open_clip transform (see benchmarks/bench_decode.py for the drift).
+FAST_DECODE = _env_bool("STYLEMATE_FAST_DECODE", True)
+# Uploads above either limit are rejected with 400 / 413 before decoding
+MAX_UPLOAD_MB = _env_float("STYLEMATE_MAX_UPLOAD_MB", 20.0)
+MAX_IMAGE_PIXELS = _env_int("STYLEMATE_MAX_IMAGE_PIXELS", 40_000_000)
+# Total body size of one POST /recommend/batch request
+BATCH_MAX_UPLOAD_MB = _env_float("STYLEMATE_BATCH_MAX_UPLOAD_MB", 100.0)
+
+# ─── ASYNC SERVING (asgi_app.py) ──────────────────────────────────────────────
+# Worker processes doing decode + CLIP inference; each holds its own model and
+# gets TORCH_NUM_THREADS / workers intra-op threads.
+ASGI_INFERENCE_WORKERS = _env_int("STYLEMATE_ASGI_WORKERS", max(1, (os.cpu_count() or 1) // 2))
+# Uploads handed to the pool at once; more wait on the event loop ...
+ASGI_MAX_INFLIGHT = _env_int("STYLEMATE_ASGI_MAX_INFLIGHT", 16)
+# ... for at most this long before getting a 503
+ASGI_QUEUE_TIMEOUT_S = _env_float("STYLEMATE_ASGI_QUEUE_TIMEOUT_S", 30.0)
+
+# ─── TEXT SEARCH (text_search.py) ─────────────────────────────────────────────
+# Text query embeddings kept in the LRU cache (popular queries don't count)
+TEXT_CACHE_MAX_ENTRIES = _env_int("STYLEMATE_TEXT_CACHE_MAX_ENTRIES", 20_000)
+# Queries batch-encoded and pinned at startup, one per line ("" = none)
+TEXT_POPULAR_QUERIES = _env_path("STYLEMATE_TEXT_POPULAR_QUERIES", os.path.join(BASE_DIR, "popular_queries.txt"))
+TEXT_WARM_BATCH_SIZE = _env_int("STYLEMATE_TEXT_WARM_BATCH_SIZE", 64)
+# Longer queries are rejected with 400 (CLIP only reads 77 tokens anyway)
+TEXT_MAX_QUERY_CHARS = _env_int("STYLEMATE_TEXT_MAX_QUERY_CHARS", 200)
+
+# ─── STYLE SCORING (styles.py) ────────────────────────────────────────────────
+# Per-style centroids from build_reference_vectors.py ("" = style scoring off)
+STYLE_VECTORS = _env_path("STYLEMATE_STYLE_VECTORS", _model_style_vectors(CLIP_MODEL))
+# Styles returned for the query by /recommend?styles=1
+STYLE_TOP_K = _env_int("STYLEMATE_STYLE_TOP_K", 3)
+
+# ─── CRAWLER (scrapers/crawler.py) ────────────────────────────────────────────
+# Requests in flight per shop host / in total
+CRAWL_MAX_PER_HOST = _env_int("STYLEMATE_CRAWL_MAX_PER_HOST", 4)
+CRAWL_MAX_WORKERS = _env_int("STYLEMATE_CRAWL_MAX_WORKERS", 16)
+CRAWL_TIMEOUT_S = _env_float("STYLEMATE_CRAWL_TIMEOUT_S", 10.0)
+# Last response + ETag / Last-Modified per URL, for conditional GETs ("" = memory only)
+CRAWL_CACHE_DIR = _env_path("STYLEMATE_CRAWL_CACHE_DIR", os.path.join(BASE_DIR, "data", "http_cache"))
+# Collection pages followed per crawl
+CRAWL_MAX_PAGES = _env_int("STYLEMATE_CRAWL_MAX_PAGES", 100)
+
+# ─── IMAGE CACHE (scrapers/image_cache.py) ────────────────────────────────────
+# Product images as downloaded by the pipeline, content-addressed, for offline
+# re-embedding with scrapers/reembed.py ("" = don't keep them)
+IMAGE_CACHE_DIR = _env_path("STYLEMATE_IMAGE_CACHE_DIR", os.path.join(BASE_DIR, "data", "image_cache"))
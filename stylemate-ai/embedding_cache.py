@@ -0,0 +1,208 @@
+# stylemate-ai/embedding_cache.py
+#
+# Content-addressed cache of query embeddings, so the same uploaded photo is
+# never decoded + preprocessed + run through CLIP twice.
+#
+# Two tiers:
+#   • exact      – keyed by sha256 of the raw upload bytes (no decode needed)
+#   • perceptual – optional 64-bit dHash of the decoded picture, which catches
+#                  re-encoded / re-compressed / resized copies of the same image
+#
+# Entries are evicted LRU once either the entry count or the memory budget is
+# exceeded. An optional directory gives write-through on-disk persistence so
+# the exact tier survives restarts.
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+
+# rough per-entry bookkeeping cost (dict slots, key string, ndarray header)
+_ENTRY_OVERHEAD = 256
+
+
+def content_key(data: bytes) -> str:
+    """sha256 hex digest of the raw bytes — the exact-tier cache key."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def dhash(img: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash: shrink to (hash_size+1) × hash_size greyscale and record
+    whether each pixel is brighter than its right neighbour. Robust to JPEG
+    re-encoding, rescaling and small colour shifts.
+    """
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+    px = np.asarray(small, dtype=np.int16)
+    bits = (px[:, 1:] > px[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        persist_dir: str = None,
+        perceptual: bool = False,
+        phash_max_distance: int = 4,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.persist_dir = persist_dir
+        self.perceptual = perceptual
+        self.phash_max_distance = phash_max_distance
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key → (vector, phash or None)
+        self._by_phash = {}             # phash → key
+        self._phash_array = None        # lazily rebuilt uint64 array of phashes
+        self._phash_keys = None
+        self._bytes = 0
+
+        self.hits_exact = 0
+        self.hits_disk = 0
+        self.hits_perceptual = 0
+        self.misses = 0
+
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ─── LOOKUPS ──────────────────────────────────────────────────────────────
+    def get(self, key: str):
+        """Exact-tier lookup (memory, then disk). Returns the vector or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits_exact += 1
+                return entry[0]
+
+        vec, phash = self._load_from_disk(key)
+        if vec is not None:
+            with self._lock:
+                self.hits_disk += 1
+            self._insert(key, vec, phash)
+            return vec
+        return None
+
+    def get_perceptual(self, img: Image.Image):
+        """
+        Perceptual-tier lookup for an already-decoded image.
+        Returns (vector or None, phash) — pass the phash on to `put` on a miss.
+        """
+        phash = dhash(img)
+        with self._lock:
+            key = self._by_phash.get(phash)
+            if key is None and self.phash_max_distance > 0 and self._by_phash:
+                key = self._nearest_phash(phash)
+            if key is not None:
+                self._entries.move_to_end(key)
+                self.hits_perceptual += 1
+                return self._entries[key][0], phash
+        return None, phash
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def _nearest_phash(self, phash: int):
+        """Closest stored phash within `phash_max_distance` bits (lock held)."""
+        if self._phash_array is None:
+            self._phash_keys = list(self._by_phash.values())
+            self._phash_array = np.fromiter(self._by_phash.keys(), dtype=np.uint64, count=len(self._by_phash))
+        xor = self._phash_array ^ np.uint64(phash)
+        distances = np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+        best = int(distances.argmin())
+        if distances[best] <= self.phash_max_distance:
+            return self._phash_keys[best]
+        return None
+
+    # ─── INSERTS / EVICTION ───────────────────────────────────────────────────
+    def put(self, key: str, vec: np.ndarray, phash: int = None):
+        # copy: a row view would pin the whole batch output array in memory
+        vec = np.array(vec, dtype=np.float32).reshape(-1)
+        self._insert(key, vec, phash)
+        self._save_to_disk(key, vec, phash)
+
+    def _insert(self, key: str, vec: np.ndarray, phash):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._forget(key, old)
+            self._entries[key] = (vec, phash)
+            self._bytes += vec.nbytes + _ENTRY_OVERHEAD
+            if phash is not None and self.perceptual:
+                self._by_phash[phash] = key
+                self._phash_array = None
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                old_key, old_entry = self._entries.popitem(last=False)
+                self._forget(old_key, old_entry)
+
+    def _forget(self, key: str, entry):
+        vec, phash = entry
+        self._bytes -= vec.nbytes + _ENTRY_OVERHEAD
+        if phash is not None and self._by_phash.get(phash) == key:
+            del self._by_phash[phash]
+            self._phash_array = None
+
+    # ─── PERSISTENCE ──────────────────────────────────────────────────────────
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.persist_dir, key[:2], f"{key}.npz")
+
+    def _load_from_disk(self, key: str):
+        if not self.persist_dir:
+            return None, None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None, None
+        try:
+            with np.load(path) as data:
+                phash = int(data["phash"]) if "phash" in data.files else None
+                return data["vec"].astype(np.float32), phash
+        except Exception:
+            return None, None   # corrupt / partial file → treat as a miss
+
+    def _save_to_disk(self, key: str, vec: np.ndarray, phash):
+        if not self.persist_dir:
+            return
+        path = self._disk_path(key)
+        # unique per writer: two requests for the same new image may both save it
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        arrays = {"vec": vec}
+        if phash is not None:
+            arrays["phash"] = np.uint64(phash)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)   # atomic: readers never see a half-written file
+        except OSError:
+            # persistence is best-effort; the entry is still cached in memory
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    # ─── STATS ────────────────────────────────────────────────────────────────
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.hits_exact + self.hits_disk + self.hits_perceptual
+            total = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits_exact": self.hits_exact,
+                "hits_disk": self.hits_disk,
+                "hits_perceptual": self.hits_perceptual,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+            }
@@ -1,127 +1,409 @@
 # stylemate-ai/flask_app.py
 
 import os
-import io
-import json
-import torch
+import time
+import threading
 from flask_cors import CORS
-from flask import Flask, request, jsonify, abort
-import faiss
-from PIL import Image
-from clip_model import model, preprocess
+from flask import Flask, Response, g, request, jsonify, abort
+from embedding_cache import EmbeddingCache, content_key
+from attributes import parse_search_options, query_flag
+from catalog_registry import CatalogRegistry
+from image_io import ImageRejected, open_image, make_preprocess, input_size
+from styles import style_response
+from text_search import TextQueryCache, load_popular_queries, normalize_query, warm_popular
+import metrics
+from metrics import STAGE_SECONDS
+from startup import Startup, load_backend, load_catalog, load_styles, warm_up
+import config
+import clip_model
 
-# ─── FORCE CPU ONLY ────────────────────────────────────────────────────────────
-os.environ["CUDA_VISIBLE_DEVICES"] = ""       # disable CUDA/MPS
-torch.backends.mps.is_available = lambda: False
-torch.backends.mps.is_built     = lambda: False
-torch.set_num_threads(1)           # avoid BLAS contention
+# torch / open_clip / faiss are imported by the startup phases below, so this
+# module imports in well under a second and /healthz answers right away.
+backend = None
+preprocess = None
+batcher = None
+# the live catalog is catalog_registry.current; a request reads it once, so a
+# reload swapping in a new version never changes it mid-request
+catalog_registry = CatalogRegistry()
+style_scorer = None
 
-# ─── LOAD & PREPARE CLIP MODEL ─────────────────────────────────────────────────
-device = torch.device("cpu")
-model.to(device)
-model.eval()
 
-# ─── CONFIG: PATHS TO EACH BRAND’S INDEX + METADATA ────────────────────────────
-BASE_DIR = os.path.dirname(__file__)
+def encode_batch(x):
+    """
+    Encode a (B × 3 × 224 × 224) batch in one forward pass.
+    Returns a (B × D) float32 numpy array of L2-normalized embeddings.
+    """
+    t0 = time.perf_counter()
+    out = backend.encode_images(x).cpu().numpy().astype("float32")
+    metrics.BATCH_SECONDS.observe(time.perf_counter() - t0)
+    metrics.BATCH_SIZE.observe(len(x))
+    return out
+
+
+# ─── QUERY EMBEDDING CACHE: repeated uploads skip decode + inference ─────────
+embedding_cache = None
+if config.EMBED_CACHE_ENABLED:
+    embedding_cache = EmbeddingCache(
+        max_entries=config.EMBED_CACHE_MAX_ENTRIES,
+        max_bytes=int(config.EMBED_CACHE_MAX_MB * 1024 * 1024),
+        # one folder per CLIP model: a cached vector is only valid for the model that made it
+        persist_dir=os.path.join(config.EMBED_CACHE_DIR, clip_model.model_tag().replace("/", "__"))
+        if config.EMBED_CACHE_DIR else None,
+        perceptual=config.EMBED_CACHE_PERCEPTUAL,
+        phash_max_distance=config.EMBED_CACHE_PHASH_DISTANCE,
+    )
+
+
+# ─── TEXT QUERY CACHE: popular queries pinned at startup, the rest LRU ───────
+text_cache = TextQueryCache(max_entries=config.TEXT_CACHE_MAX_ENTRIES)
+# text queries run the text tower on the request thread; one at a time
+_text_lock = threading.Lock()
+
+
+def encode_texts(texts: list):
+    """(n × D) float32 numpy array of normalized CLIP text embeddings."""
+    with _text_lock, STAGE_SECONDS.time("encode_text"):
+        return backend.encode_texts(texts).cpu().numpy().astype("float32")
 
-# ─── Drmers: FAISS index + metas JSON (these live at the root of stylemate-ai/)
-DRMERS_INDEX = os.path.join(BASE_DIR, "product.index")
-DRMERS_METAS = os.path.join(BASE_DIR, "product_metas.json")
 
-# ─── Galore: FAISS index + metas JSON (these live under stylemate-ai/data/)
-GALORE_INDEX = os.path.join(BASE_DIR, "data", "galore.index")
-GALORE_METAS = os.path.join(BASE_DIR, "data", "galore_metas.json")
+# ─── STARTUP PHASES (timed; see startup.py) ───────────────────────────────────
+def _load_model():
+    clip_model.load_model()
 
-# ─── Container to hold both (faiss_index, metas_list) pairs ──────────────────
-brand_indices = []
 
+def _load_backend():
+    global backend, preprocess, batcher
+    from batching import MicroBatcher
+    # eager / int8 / traced, chosen by STYLEMATE_INFERENCE_BACKEND (see inference.py)
+    backend = load_backend()
+    # single-pass resize/crop/normalize (or the stock transform, see image_io.py)
+    preprocess = make_preprocess(backend.preprocess)
+    # ─── MICRO-BATCHER: one encode_image call for many concurrent uploads ─────
+    batcher = MicroBatcher(
+        encode_batch,
+        max_batch_size=config.BATCH_MAX_SIZE,
+        max_wait_ms=config.BATCH_MAX_WAIT_MS,
+    )
 
-# ─── LOAD Drmers INDEX + METADATA ─────────────────────────────────────────────
-if not os.path.exists(DRMERS_INDEX):
-    raise RuntimeError(f"Missing Drmers index at: {DRMERS_INDEX}")
-if not os.path.exists(DRMERS_METAS):
-    raise RuntimeError(f"Missing Drmers metadata file at: {DRMERS_METAS}")
 
-dr_index = faiss.read_index(DRMERS_INDEX)
-with open(DRMERS_METAS, "r", encoding="utf-8") as f:
-    dr_metas = json.load(f)
+def _load_catalog():
+    load_catalog(catalog_registry)
 
-brand_indices.append((dr_index, dr_metas))
 
+def _load_styles():
+    global style_scorer
+    style_scorer = load_styles()
 
-# ─── LOAD Galore INDEX + METADATA ─────────────────────────────────────────────
-if not os.path.exists(GALORE_INDEX):
-    raise RuntimeError(f"Missing Galore index at: {GALORE_INDEX}")
-if not os.path.exists(GALORE_METAS):
-    raise RuntimeError(f"Missing Galore metadata file at: {GALORE_METAS}")
 
-ga_index = faiss.read_index(GALORE_INDEX)
-with open(GALORE_METAS, "r", encoding="utf-8") as f:
-    ga_metas = json.load(f)
+def _warm_up():
+    if config.WARMUP_BATCH_SIZE > 0:
+        warm_up(backend, sorted({1, config.WARMUP_BATCH_SIZE}))
 
-brand_indices.append((ga_index, ga_metas))
+
+def _warm_text():
+    queries = load_popular_queries(config.TEXT_POPULAR_QUERIES)
+    # straight to the backend: startup work stays out of the request stage metrics
+    warm_popular(text_cache, queries, lambda chunk: backend.encode_texts(chunk).cpu().numpy(),
+                 batch_size=config.TEXT_WARM_BATCH_SIZE)
+    print(f"   • {len(queries)} popular text queries pre-encoded")
+
+
+STARTUP_STEPS = [
+    ("model", _load_model),
+    ("backend", _load_backend),
+    ("catalog", _load_catalog),
+    ("styles", _load_styles),
+    ("warmup", _warm_up),
+    ("text", _warm_text),
+]
+
+startup = Startup("flask")
+metrics.register_startup_gauge(startup)
+metrics.register_cache_gauges(embedding_cache, text_cache)
+metrics.register_catalog_gauges(lambda: catalog_registry.current, catalog_registry)
+if config.BACKGROUND_STARTUP:
+    startup.run_in_background(STARTUP_STEPS)
+else:
+    startup.run(STARTUP_STEPS)
 
 
 # ─── FLASK APP SETUP ─────────────────────────────────────────────────────────
 app = Flask(__name__)
+# Oversized request bodies get a 413 before they are read into memory (the
+# per-image limit is enforced on each upload by image_io.open_image); only
+# /recommend/batch raises it to BATCH_MAX_UPLOAD_MB. + room for multipart overhead.
+app.config["MAX_CONTENT_LENGTH"] = int(config.MAX_UPLOAD_MB * 1024 * 1024) + 64 * 1024
 # Allow your React dev server (http://localhost:5173) to hit this endpoint
 CORS(app, origins=["http://localhost:5173"])
 
 
+@app.before_request
+def _start_timer():
+    g.started = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    metrics.REQUESTS.inc(endpoint=endpoint, status=str(response.status_code))
+    if "started" in g:
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - g.started, endpoint=endpoint)
+    return response
+
+
+def _prepare_image(data: bytes):
+    """
+    Cache lookup, then decode + preprocess on a miss.
+    Returns (cached embedding or None, cache key, dHash, model input or None).
+    """
+    key = phash = None
+    if embedding_cache is not None:
+        key = content_key(data)
+        vec = embedding_cache.get(key)
+        if vec is not None:
+            return vec, key, None, None
+
+    with STAGE_SECONDS.time("decode"):
+        img = open_image(data, min_size=input_size(preprocess))
+    if embedding_cache is not None:
+        if embedding_cache.perceptual:
+            vec, phash = embedding_cache.get_perceptual(img)
+            if vec is not None:
+                embedding_cache.put(key, vec, phash)
+                return vec, key, phash, None
+        embedding_cache.record_miss()
+    with STAGE_SECONDS.time("preprocess"):
+        x = preprocess(img)
+    return None, key, phash, x
+
+
 def embed_image_bytes(data: bytes):
     """
     Embed raw image bytes via CLIP. Returns a (1 × D) numpy array (dtype=float32),
     normalized so that inner‐product == cosine‐similarity.
+    Decode (size-limited, reduced-scale for JPEGs, see image_io.py) +
+    preprocess run on the request thread; the forward pass is shared with
+    other in-flight requests through the micro-batcher. Results are memoized
+    in `embedding_cache` by content hash (and optionally by dHash).
     """
-    img = Image.open(io.BytesIO(data)).convert("RGB")
-    x   = preprocess(img).unsqueeze(0).to(device)
-    with torch.no_grad():
-        q = model.encode_image(x)
-        q = q / q.norm(dim=-1, keepdim=True)
-    return q.cpu().numpy().astype("float32")   # shape: (1, D)
+    vec, key, phash, x = _prepare_image(data)
+    if vec is None:
+        with STAGE_SECONDS.time("encode"):   # queue wait + the shared forward pass
+            vec = batcher.encode(x)
+        if embedding_cache is not None:
+            embedding_cache.put(key, vec, phash)
+    return vec[None, :]   # shape: (1, D)
+
+
+def embed_many_image_bytes(blobs: list) -> list:
+    """
+    Embed several uploads of one request: cache hits are answered directly,
+    the misses go through the micro-batcher together (one forward pass for up
+    to STYLEMATE_BATCH_MAX_SIZE of them). Returns one (D,) embedding per
+    upload, or the exception that upload raised.
+    """
+    vecs = [None] * len(blobs)
+    pending = []   # (position, cache key, dHash, model input)
+    for i, data in enumerate(blobs):
+        try:
+            vec, key, phash, x = _prepare_image(data)
+        except Exception as e:
+            vecs[i] = e
+            continue
+        if vec is not None:
+            vecs[i] = vec
+        else:
+            pending.append((i, key, phash, x))
+
+    if pending:
+        with STAGE_SECONDS.time("encode"):
+            encoded = batcher.encode_many([x for _, _, _, x in pending])
+        for (i, key, phash, _), vec in zip(pending, encoded):
+            if embedding_cache is not None:
+                embedding_cache.put(key, vec, phash)
+            vecs[i] = vec
+    return vecs
 
 
 @app.route("/recommend", methods=["POST"])
 def recommend_api():
     """
-    POST /recommend?k=5
+    POST /recommend?k=5&brand=galore,drmers&min_price=50&max_price=150&tag=hoodies&size=M,L&styles=1&expand_variants=1
     - Expect a multipart form‐file under key="file".
-    - Optional query parameter 'k' (default=5) controls how many neighbors each brand returns,
-      then we merge both brands' results and return the top‐k overall.
+    - Optional query parameter 'k' (default=5) controls how many products are returned
+      overall, across every brand in the catalog.
+    - Optional query parameter 'brand' (comma-separated) restricts the search to those brands.
+    - Optional filters, applied inside the vector search (see attributes.py):
+      'min_price' / 'max_price' (inclusive), 'tag' (comma-separated, all required),
+      'size' (comma-separated, at least one in stock).
+    - Optional 'styles=1' returns {"styles": the image's best styles, "products": […]}
+      instead of the bare list, with every product labelled with its "style".
+    - Colourways of one garment share a result ("variant_count"); 'expand_variants=1'
+      adds each one's "variants" list.
     """
+    if not startup.ready.is_set():
+        abort(503, description="Recommendation service is still starting up; retry shortly.")
     if "file" not in request.files:
         abort(400, description="No file part named 'file'. Please upload an image using key='file'.")
 
+    # k (how many results overall), brands, filters, flags
+    try:
+        opts = parse_search_options(request.args)
+    except ValueError as e:
+        abort(400, description=str(e))
+
     file = request.files["file"]
     try:
         raw = file.read()
         q_vec = embed_image_bytes(raw)   # shape = (1, D)
+    except ImageRejected as e:
+        abort(400, description=str(e))
     except Exception as e:
         abort(400, description=f"Invalid image or embedding error: {e}")
 
-    # parse k (how many results PER BRAND to fetch) from ?k=
+    # One search over every brand; results come back already ranked
+    catalog = catalog_registry.current
     try:
-        k = int(request.args.get("k", 5))
-        if k <= 0:
-            raise ValueError()
-    except ValueError:
-        abort(400, description="Query parameter 'k' must be a positive integer.")
-
-    # Collect all matches from each brand
-    all_results = []
-    for faiss_idx, metas in brand_indices:
-        # This search returns two arrays of shape (1, k): distances and indices
-        distances, indices = faiss_idx.search(q_vec, k)
-        for score, idx in zip(distances[0].tolist(), indices[0].tolist()):
-            entry = metas[idx].copy()
-            entry["score"] = float(score)
-            all_results.append(entry)
-
-    # Merge both brands' candidates, sort by descending score, take overall top‐k
-    all_results.sort(key=lambda x: x["score"], reverse=True)
-    topk = all_results[:k]
-
-    return jsonify(topk)
+        with STAGE_SECONDS.time("search"):
+            distances, indices = catalog.search(q_vec, opts.k, brands=opts.brands, filters=opts.filters)
+    except KeyError as e:
+        abort(400, description=str(e.args[0]))
+
+    if opts.styles:
+        if style_scorer is None:
+            abort(400, description="Style labels are not available on this server.")
+        with STAGE_SECONDS.time("serialize"):
+            return jsonify(style_response(style_scorer, catalog, q_vec, distances[0], indices[0],
+                                          top_k=config.STYLE_TOP_K, expand_variants=opts.expand_variants))
+    with STAGE_SECONDS.time("serialize"):
+        return Response(catalog.results_json(distances[0], indices[0], opts.expand_variants),
+                        content_type="application/json")
+
+
+@app.route("/recommend/batch", methods=["POST"])
+def recommend_batch_api():
+    """
+    POST /recommend/batch?k=5&aggregate=1 (+ the brand / filter parameters of /recommend)
+    - Expect several multipart form-files under key="files" (up to STYLEMATE_BATCH_MAX_FILES).
+    - All uploads share one batched forward pass and one multi-row search.
+    - Returns {"results": [{"file", "products"} or {"file", "error"}, …]} in upload
+      order; with aggregate=1 also "aggregate": the best products for the whole set.
+    """
+    # per-view cap (Flask ≥ 3.1); must be set before request.files is parsed
+    request.max_content_length = int(config.BATCH_MAX_UPLOAD_MB * 1024 * 1024) + 64 * 1024
+    if not startup.ready.is_set():
+        abort(503, description="Recommendation service is still starting up; retry shortly.")
+    files = request.files.getlist("files")
+    if not files:
+        abort(400, description="No file parts named 'files'. Upload the images using key='files'.")
+    if len(files) > config.BATCH_MAX_FILES:
+        abort(400, description=f"At most {config.BATCH_MAX_FILES} images per batch request.")
+
+    try:
+        opts = parse_search_options(request.args)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    vecs = embed_many_image_bytes([f.read() for f in files])
+    catalog = catalog_registry.current
+    try:
+        with STAGE_SECONDS.time("search"):
+            # the product lists are joined from pre-serialized fragments inside
+            body = catalog.batch_results_json(
+                [f.filename for f in files], vecs, opts.k, brands=opts.brands, filters=opts.filters,
+                aggregate=opts.aggregate, expand_variants=opts.expand_variants,
+            )
+    except KeyError as e:
+        abort(400, description=str(e.args[0]))
+    return Response(body, content_type="application/json")
+
+
+def embed_text(query: str):
+    """(1 × D) embedding of a text query, from `text_cache` when it has been seen before."""
+    key = normalize_query(query)
+    vec = text_cache.get(key)
+    if vec is None:
+        vec = encode_texts([key])[0]
+        text_cache.put(key, vec)
+    return vec[None, :]
+
+
+@app.route("/search/text", methods=["GET"])
+def search_text_api():
+    """
+    GET /search/text?q=boxy+black+hoodie&k=5 (+ the brand / filter parameters of /recommend)
+    - Encodes 'q' with the CLIP text tower and searches the same product index
+      as image uploads; returns the same ranked product list.
+    """
+    if not startup.ready.is_set():
+        abort(503, description="Recommendation service is still starting up; retry shortly.")
+    query = request.args.get("q", "")
+    if not normalize_query(query):
+        abort(400, description="Query parameter 'q' must be a non-empty search text.")
+    if len(query) > config.TEXT_MAX_QUERY_CHARS:
+        abort(400, description=f"Query parameter 'q' is limited to {config.TEXT_MAX_QUERY_CHARS} characters.")
+
+    try:
+        opts = parse_search_options(request.args)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    q_vec = embed_text(query)
+    catalog = catalog_registry.current
+    try:
+        with STAGE_SECONDS.time("search"):
+            distances, indices = catalog.search(q_vec, opts.k, brands=opts.brands, filters=opts.filters)
+    except KeyError as e:
+        abort(400, description=str(e.args[0]))
+    with STAGE_SECONDS.time("serialize"):
+        return Response(catalog.results_json(distances[0], indices[0], opts.expand_variants),
+                        content_type="application/json")
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz_api():
+    """GET /healthz → liveness: the process is up and serving HTTP."""
+    return jsonify({"status": "alive"})
+
+
+@app.route("/readyz", methods=["GET"])
+def readyz_api():
+    """GET /readyz → readiness: 200 once model + catalog are loaded and warm, 503 before."""
+    status = startup.status()
+    return jsonify(status), 200 if status["status"] == "ready" else 503
+
+
+@app.route("/stats/cache", methods=["GET"])
+def cache_stats_api():
+    """GET /stats/cache → hit/miss counters and size of the query embedding caches."""
+    if embedding_cache is None:
+        return jsonify({"enabled": False, "text": text_cache.stats()})
+    return jsonify(dict(embedding_cache.stats(), enabled=True, text=text_cache.stats()))
+
+
+@app.route("/catalog", methods=["GET"])
+def catalog_api():
+    """GET /catalog → version, size, brands, source and CLIP model of the catalog being served."""
+    return jsonify(catalog_registry.info())
+
+
+@app.route("/catalog/reload", methods=["POST"])
+def catalog_reload_api():
+    """
+    POST /catalog/reload?force=1 → load the catalog again in the background if
+    its files changed (or with force=1), then swap it in; 202 while it runs.
+    """
+    if not startup.ready.is_set():
+        abort(503, description="Recommendation service is still starting up; retry shortly.")
+    force = query_flag(request.args, "force")
+    started = catalog_registry.reload_in_background(force=force)
+    return jsonify(dict(catalog_registry.info(), reloading=started)), 202
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_api():
+    """GET /metrics → Prometheus text format: stage latencies, request counts, batch sizes, caches, catalog."""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
 
 
 if __name__ == "__main__":
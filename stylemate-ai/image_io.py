@@ -0,0 +1,131 @@
+# stylemate-ai/image_io.py
+#
+# Cheap upload → model-input path. The CLIP transform only needs a 224 × 224
+# crop, but `Image.open(...).convert("RGB")` + `preprocess` fully decode a
+# 12 MP phone photo, copy it to RGB, resize it, crop it and normalize it in
+# four separate passes. Here instead:
+#
+#   open_image()      – rejects oversized uploads before decoding, asks the
+#                       JPEG decoder for a 1/2, 1/4 or 1/8 scale image that is
+#                       still ≥ the model size (draft mode) and decodes straight
+#                       into RGB, converting only modes that aren't RGB already
+#   FastPreprocess    – one PIL resize of the centre-crop box (resize + crop in
+#                       a single resample), then uint8 → normalized float tensor
+#                       in place
+#
+# benchmarks/bench_decode.py measures the speed-up and the embedding drift
+# against the stock open_clip `preprocess`.
+
+import io
+import numpy as np
+from PIL import Image
+
+import config
+
+
+class ImageRejected(ValueError):
+    """Upload is too large (bytes or pixels) or not a decodable image."""
+
+
+def check_upload_size(size: int, max_bytes: int = None):
+    """Raise ImageRejected for an upload of `size` bytes over `max_bytes` (default STYLEMATE_MAX_UPLOAD_MB)."""
+    max_bytes = max_bytes or int(config.MAX_UPLOAD_MB * 1024 * 1024)
+    if size > max_bytes:
+        raise ImageRejected(f"Upload is {size / 1e6:.1f} MB; the limit is {max_bytes / 1e6:.1f} MB.")
+
+
+def open_image(data: bytes, min_size: int = 224, max_bytes: int = None, max_pixels: int = None,
+               draft: bool = None) -> Image.Image:
+    """
+    Decode upload bytes to an RGB image. With `draft` (default: STYLEMATE_FAST_DECODE)
+    JPEGs are decoded at a reduced scale whose shorter side is still ≥ `min_size`.
+    Limits default to STYLEMATE_MAX_UPLOAD_MB / STYLEMATE_MAX_IMAGE_PIXELS.
+    """
+    max_pixels = max_pixels or config.MAX_IMAGE_PIXELS
+    check_upload_size(len(data), max_bytes)
+    try:
+        img = Image.open(io.BytesIO(data))   # reads the header only
+    except Exception as e:
+        raise ImageRejected(f"Not a decodable image: {e}") from e
+
+    width, height = img.size
+    if width * height > max_pixels:
+        raise ImageRejected(f"Image is {width}×{height}; the limit is {max_pixels / 1e6:g} megapixels.")
+
+    if draft is None:
+        draft = config.FAST_DECODE
+    if draft and img.format == "JPEG":
+        # largest DCT scale-down that keeps both sides ≥ min_size; YCbCr → RGB in the decoder
+        img.draft("RGB", (min_size, min_size))
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    else:
+        img.load()
+    return img
+
+
+class FastPreprocess:
+    """
+    Drop-in replacement for open_clip's eval transform
+    (Resize(shorter side, bicubic) → CenterCrop → ToTensor → Normalize).
+    """
+
+    def __init__(self, size: int, mean, std, resample=Image.Resampling.BICUBIC):
+        import torch   # deferred: the web apps import this module before torch is needed
+        self.size = size
+        self.resample = resample
+        self.mean = torch.tensor(mean, dtype=torch.float32).view(3, 1, 1) * 255.0
+        self.inv_std = 1.0 / (torch.tensor(std, dtype=torch.float32).view(3, 1, 1) * 255.0)
+
+    @classmethod
+    def from_preprocess(cls, preprocess):
+        """Read size / interpolation / mean / std off a torchvision Compose; None if it has other steps."""
+        size = mean = std = None
+        resample = Image.Resampling.BICUBIC
+        for t in getattr(preprocess, "transforms", []):
+            name = type(t).__name__
+            if name == "Resize":
+                if t.max_size is not None:
+                    return None
+                size = t.size if isinstance(t.size, int) else (t.size[0] if len(t.size) == 1 else None)
+                resample = {"bicubic": Image.Resampling.BICUBIC, "bilinear": Image.Resampling.BILINEAR}.get(
+                    getattr(t.interpolation, "value", ""), None)
+                if size is None or resample is None:
+                    return None
+            elif name == "Normalize":
+                mean, std = t.mean, t.std
+            elif name not in ("CenterCrop", "ToTensor", "function"):
+                return None
+        if size is None or mean is None:
+            return None
+        return cls(size, mean, std, resample)
+
+    def crop_box(self, width: int, height: int) -> tuple:
+        """Centre square of the image, in source pixels (what Resize + CenterCrop keep)."""
+        side = min(width, height)
+        left = (width - side) / 2.0
+        top = (height - side) / 2.0
+        return (left, top, left + side, top + side)
+
+    def __call__(self, img: Image.Image):
+        import torch
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img = img.resize((self.size, self.size), self.resample, box=self.crop_box(*img.size))
+        x = torch.from_numpy(np.array(img)).permute(2, 0, 1).float()   # 224² uint8 → float, once
+        return x.sub_(self.mean).mul_(self.inv_std)
+
+
+def make_preprocess(preprocess):
+    """FastPreprocess equivalent of `preprocess` when STYLEMATE_FAST_DECODE is on and it's recognised."""
+    if not config.FAST_DECODE:
+        return preprocess
+    return FastPreprocess.from_preprocess(preprocess) or preprocess
+
+
+def input_size(preprocess) -> int:
+    size = getattr(preprocess, "size", None)
+    if isinstance(size, int):
+        return size
+    from inference import _input_size
+    return _input_size(preprocess)
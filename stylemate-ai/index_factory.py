@@ -0,0 +1,265 @@
+# stylemate-ai/index_factory.py
+#
+# Configurable faiss index construction for the catalog builders, plus a
+# recall / latency / memory report measured against the exact flat index.
+#
+#   kind      factory string          notes
+#   ───────   ────────────────────    ───────────────────────────────────────
+#   flat      Flat                    exact brute force (the old default)
+#   ivf       IVF{nlist},Flat         inverted lists, tune with `nprobe`
+#   hnsw      HNSW{M},Flat            graph search, tune with `efSearch`
+#   sq8       SQ8                     8-bit scalar quantized, 4× smaller
+#   pq        PQ{m}x{nbits}           product quantized, 16-64× smaller
+#   ivfsq8    IVF{nlist},SQ8          IVF + scalar quantization
+#   ivfpq     IVF{nlist},PQ{m}x{nbits}  IVF + product quantization
+#
+# All indexes use inner product on L2-normalized vectors (= cosine).
+# Parameters are clamped to what the catalog size can actually train, so a
+# 70-product brand still builds with any kind.
+
+import math
+import json
+import time
+import numpy as np
+import faiss
+
+INDEX_KINDS = ("flat", "ivf", "hnsw", "sq8", "pq", "ivfsq8", "ivfpq")
+
+
+def _default_nlist(n: int) -> int:
+    # ~4·√n lists, but k-means wants ≥ 39 training points per centroid
+    return max(1, min(int(4 * math.sqrt(n)), n // 39 or 1))
+
+
+def _pq_params(dim: int, n: int, m: int = None, nbits: int = 8) -> tuple:
+    m = m or 64
+    while dim % m:
+        m -= 1
+    # 2**nbits centroids per sub-quantizer need at least that many training points
+    nbits = max(1, min(nbits, int(math.log2(max(n, 2)))))
+    return m, nbits
+
+
+def factory_string(kind: str, dim: int, n: int, nlist: int = None, hnsw_m: int = 32,
+                   pq_m: int = None, pq_nbits: int = 8) -> str:
+    """faiss.index_factory description for `kind` on `n` vectors of size `dim`."""
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind {kind!r}; choose one of {', '.join(INDEX_KINDS)}")
+    nlist = min(nlist or _default_nlist(n), max(n, 1))
+    m, nbits = _pq_params(dim, n, pq_m, pq_nbits)
+    return {
+        "flat":   "Flat",
+        "ivf":    f"IVF{nlist},Flat",
+        "hnsw":   f"HNSW{hnsw_m},Flat",
+        "sq8":    "SQ8",
+        "pq":     f"PQ{m}x{nbits}",
+        "ivfsq8": f"IVF{nlist},SQ8",
+        "ivfpq":  f"IVF{nlist},PQ{m}x{nbits}",
+    }[kind]
+
+
+def build_index(vectors, kind: str = "flat", ids=None, **params):
+    """
+    Train + fill an index of the given kind. `vectors` must already be
+    L2-normalized float32 (N × D). With `ids` the index is wrapped in an
+    IndexIDMap2 so products can be addressed by stable ID.
+    Extra `params`: nlist, hnsw_m, pq_m, pq_nbits, ef_construction.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, dim = vectors.shape
+    ef_construction = params.pop("ef_construction", None)
+    description = factory_string(kind, dim, n, **params)
+
+    index = faiss.index_factory(dim, description, faiss.METRIC_INNER_PRODUCT)
+    if ef_construction and isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efConstruction = ef_construction
+    if not index.is_trained:
+        index.train(vectors)
+
+    if ids is not None:
+        index = faiss.IndexIDMap2(index)
+        index.add_with_ids(vectors, np.asarray(ids, dtype="int64"))
+    else:
+        index.add(vectors)
+    return index
+
+
+# ─── SHARED (MEMORY-MAPPED) LOADING ───────────────────────────────────────────
+_MMAP_FLAG_SETS = (
+    # flat / SQ / PQ codes and HNSW storage
+    faiss.IO_FLAG_MMAP | faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY,
+    # IVF inverted lists (their reader rejects the flag combination above)
+    faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY,
+)
+
+
+def read_index_shared(path: str):
+    """
+    Read an index with its bulk data memory-mapped read-only, so processes
+    reading the same file share one copy through the page cache. Index types
+    faiss can't map are read normally.
+    """
+    for flags in _MMAP_FLAG_SETS:
+        try:
+            return faiss.read_index(path, flags)
+        except RuntimeError:
+            continue
+    return faiss.read_index(path)
+
+
+# ─── SEARCH-TIME PARAMETERS ───────────────────────────────────────────────────
+def _unwrap(index):
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def supports_search_params(index) -> bool:
+    """Plain PQ indexes reject per-query SearchParameters (and thus ID selectors)."""
+    return not isinstance(_unwrap(index), faiss.IndexPQ)
+
+
+def search_parameters(index, sel=None, nprobe: int = None, ef_search: int = None):
+    """
+    SearchParameters of the right flavour for `index` (IVF / HNSW / generic),
+    carrying an optional ID selector. Returns None if there is nothing to set.
+    Unset nprobe / efSearch fall back to the value baked into the index.
+    """
+    inner = _unwrap(index)
+    ivf = faiss.try_extract_index_ivf(inner)
+    if ivf is not None:
+        if sel is None and not nprobe:
+            return None
+        p = faiss.SearchParametersIVF()
+        p.nprobe = min(nprobe or ivf.nprobe, ivf.nlist)
+    elif isinstance(inner, faiss.IndexHNSW):
+        if sel is None and not ef_search:
+            return None
+        p = faiss.SearchParametersHNSW()
+        p.efSearch = ef_search or inner.hnsw.efSearch
+    else:
+        if sel is None:
+            return None
+        p = faiss.SearchParameters()
+    if sel is not None:
+        p.sel = sel
+    return p
+
+
+def set_search_defaults(index, nprobe: int = None, ef_search: int = None):
+    """Bake nprobe / efSearch into the index itself (used when no per-query params)."""
+    inner = _unwrap(index)
+    ivf = faiss.try_extract_index_ivf(inner)
+    if ivf is not None and nprobe:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    if isinstance(inner, faiss.IndexHNSW) and ef_search:
+        inner.hnsw.efSearch = ef_search
+
+
+def describe(index) -> str:
+    inner = _unwrap(index)
+    ivf = faiss.try_extract_index_ivf(inner)
+    if ivf is not None:
+        return f"{type(inner).__name__}(nlist={ivf.nlist}, nprobe={ivf.nprobe})"
+    if isinstance(inner, faiss.IndexHNSW):
+        return f"{type(inner).__name__}(efSearch={inner.hnsw.efSearch})"
+    return type(inner).__name__
+
+
+# ─── RECALL / LATENCY / MEMORY REPORT ─────────────────────────────────────────
+def index_memory_bytes(index) -> int:
+    """Serialized size — a close proxy for resident size of the codes + structures."""
+    return int(faiss.serialize_index(index).size)
+
+
+def evaluate_index(index, vectors, queries=None, k: int = 10, n_queries: int = 200, seed: int = 0) -> dict:
+    """
+    Measure `index` against an exact flat index over the same `vectors`:
+    recall@k, single-query latency (p50 / p99, ms) and memory.
+    Queries default to a random sample of the catalog vectors themselves.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    if queries is None:
+        rng = np.random.default_rng(seed)
+        picks = rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+        queries = vectors[picks]
+    queries = np.ascontiguousarray(queries, dtype="float32")
+    k = min(k, len(vectors))
+
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    latencies = []
+    found = np.empty_like(truth)
+    for row in range(len(queries)):
+        t0 = time.perf_counter()
+        _, ids = index.search(queries[row:row + 1], k)
+        latencies.append(time.perf_counter() - t0)
+        found[row] = ids[0]
+
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        # map stable IDs back to row positions so they compare with the flat truth
+        id_to_row = {pid: row for row, pid in enumerate(faiss.vector_to_array(index.id_map).tolist())}
+        found = np.vectorize(lambda pid: id_to_row.get(pid, -1))(found)
+
+    hits = sum(len(set(t.tolist()) & set(f.tolist())) for t, f in zip(truth, found))
+    lat_ms = np.asarray(latencies) * 1000.0
+    return {
+        "index": describe(index),
+        "ntotal": int(index.ntotal),
+        "k": k,
+        f"recall@{k}": hits / truth.size,
+        "p50_ms": float(np.percentile(lat_ms, 50)),
+        "p99_ms": float(np.percentile(lat_ms, 99)),
+        "memory_bytes": index_memory_bytes(index),
+        "flat_memory_bytes": index_memory_bytes(exact),
+    }
+
+
+def format_report(rows: list) -> str:
+    """Render evaluate_index() dicts as an aligned text table."""
+    lines = [f"{'index':<38} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8} {'memory':>10} {'vs flat':>8}"]
+    for r in rows:
+        recall = next(v for key, v in r.items() if key.startswith("recall@"))
+        ratio = r["memory_bytes"] / max(r["flat_memory_bytes"], 1)
+        lines.append(
+            f"{r['index']:<38} {recall:>7.3f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} "
+            f"{r['memory_bytes'] / 1024:>8.0f}Ki {ratio:>7.2f}×"
+        )
+    return "\n".join(lines)
+
+
+def build_report(index, vectors, k: int = 10, n_queries: int = 200) -> list:
+    """
+    evaluate_index() rows for `index`, sweeping nprobe (IVF) or efSearch (HNSW)
+    so the report shows the whole recall ↔ latency curve. The index's own
+    search defaults are restored afterwards.
+    """
+    inner = _unwrap(index)
+    ivf = faiss.try_extract_index_ivf(inner)
+    rows = []
+    if ivf is not None:
+        original = ivf.nprobe
+        for nprobe in sorted({p for p in (1, 4, 16, 64, ivf.nlist) if p <= ivf.nlist}):
+            ivf.nprobe = nprobe
+            rows.append(evaluate_index(index, vectors, k=k, n_queries=n_queries))
+        ivf.nprobe = original
+    elif isinstance(inner, faiss.IndexHNSW):
+        original = inner.hnsw.efSearch
+        for ef in (16, 32, 64, 128):
+            inner.hnsw.efSearch = ef
+            rows.append(evaluate_index(index, vectors, k=k, n_queries=n_queries))
+        inner.hnsw.efSearch = original
+    else:
+        rows.append(evaluate_index(index, vectors, k=k, n_queries=n_queries))
+    return rows
+
+
+def write_report(index, vectors, report_path: str, k: int = 10) -> list:
+    """Print the build report and save it as JSON next to the index."""
+    rows = build_report(index, vectors, k=k)
+    print(format_report(rows))
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(rows, f, indent=2)
+    return rows
@@ -0,0 +1,175 @@
+# stylemate-ai/inference.py
+#
+# Pluggable CPU inference backends for the CLIP image encoder. Everything that
+# embeds images (flask_app, the scrape pipeline, build_reference_vectors) goes
+# through `get_backend()`, so a deployment can trade accuracy for speed by
+# setting STYLEMATE_INFERENCE_BACKEND:
+#
+#   eager   – the fp32 PyTorch model exactly as open_clip builds it
+#   int8    – dynamically int8-quantized Linear layers (weights int8, activations
+#             quantized on the fly); ~2× faster matmuls, small embedding drift
+#   traced  – TorchScript-traced + frozen graph of the visual tower; removes
+#             Python overhead, identical numerics. The trace is cached on disk.
+#
+# Each backend exposes the same interface:
+#   backend.preprocess(pil_image)  → 3 × S × S tensor (S = the model's input size)
+#   backend.encode_images(batch)   → (B × D) L2-normalized float32 tensor
+#   backend.encode_texts(strings)  → (B × D) L2-normalized float32 tensor
+#
+# Only the visual tower is quantized / traced; text queries always go through
+# the fp32 text tower of the shared model.
+#
+# Backends are per CLIP model too (STYLEMATE_CLIP_MODEL, see clip_model.py):
+# get_backend("eager", "small") and get_backend("eager", "base") live side by
+# side, and `backend.model_tag` names the model its embeddings belong to.
+
+import os
+import copy
+import time
+import numpy as np
+import torch
+from PIL import Image
+
+import config
+
+
+class EagerBackend:
+    name = "eager"
+
+    def __init__(self, model, preprocess, clip: str = None):
+        import clip_model
+        self.model = model.eval()
+        self.preprocess = preprocess
+        self.clip = clip
+        self.model_tag = clip_model.model_tag(clip)
+        self.visual = self._prepare(model.visual)
+
+    def _prepare(self, visual):
+        return visual
+
+    def encode_images(self, x: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            emb = self.visual(x).float()
+            emb = emb / emb.norm(dim=-1, keepdim=True)
+        return emb
+
+    def encode_texts(self, texts: list) -> torch.Tensor:
+        """Tokenize + encode text queries with the CLIP text tower (same space as the images)."""
+        import clip_model
+        tokens = clip_model.get_tokenizer(self.clip)(list(texts))
+        with torch.no_grad():
+            emb = self.model.encode_text(tokens).float()
+            emb = emb / emb.norm(dim=-1, keepdim=True)
+        return emb
+
+    def embed_image(self, img: Image.Image) -> list:
+        """Convenience: one PIL image → normalized embedding as a Python list."""
+        return self.encode_images(self.preprocess(img.convert("RGB")).unsqueeze(0))[0].tolist()
+
+    def embed_path(self, image_path: str) -> list:
+        with Image.open(image_path) as img:
+            return self.embed_image(img)
+
+
+class Int8Backend(EagerBackend):
+    name = "int8"
+
+    def _prepare(self, visual):
+        # quantize a copy so the fp32 model stays usable (drift checks, text tower)
+        return torch.ao.quantization.quantize_dynamic(
+            copy.deepcopy(visual).eval(), {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+
+class TracedBackend(EagerBackend):
+    name = "traced"
+
+    def __init__(self, model, preprocess, clip: str = None, artifact_path: str = None):
+        self.artifact_path = artifact_path
+        super().__init__(model, preprocess, clip)
+
+    def _prepare(self, visual):
+        path = self.artifact_path
+        if path and os.path.exists(path):
+            return torch.jit.load(path, map_location="cpu").eval()
+
+        size = _input_size(self.preprocess)
+        example = torch.zeros(2, 3, size, size)
+        with torch.no_grad():
+            traced = torch.jit.trace(visual.eval(), example, check_trace=False)
+            traced = torch.jit.freeze(traced)
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            torch.jit.save(traced, path + ".tmp")
+            os.replace(path + ".tmp", path)
+        return traced
+
+
+BACKENDS = {
+    "eager": EagerBackend,
+    "int8": Int8Backend,
+    "traced": TracedBackend,
+}
+
+_backends = {}
+
+
+def _input_size(preprocess) -> int:
+    for t in getattr(preprocess, "transforms", []):
+        size = getattr(t, "size", None)
+        if size:
+            return size[0] if isinstance(size, (tuple, list)) else int(size)
+    return 224
+
+
+def create_backend(name: str, model=None, preprocess=None, clip: str = None):
+    """
+    Build a fresh backend around `model` (defaults to the shared clip_model
+    one for the CLIP model `clip`, default STYLEMATE_CLIP_MODEL).
+    """
+    import clip_model
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {name!r}; choose one of {', '.join(BACKENDS)}")
+    if model is None or preprocess is None:
+        model, preprocess = clip_model.load_model(clip)
+    if name == "traced":
+        # TorchScript archives aren't portable across torch releases → version in the name
+        architecture, pretrained = clip_model.resolve(clip)
+        artifact = os.path.join(config.MODEL_ARTIFACT_DIR,
+                                f"clip_visual_traced_{architecture}_{pretrained}-torch{torch.__version__}.pt")
+        return TracedBackend(model, preprocess, clip, artifact_path=artifact)
+    return BACKENDS[name](model, preprocess, clip)
+
+
+def get_backend(name: str = None, clip: str = None):
+    """Process-wide cached backend (default: STYLEMATE_INFERENCE_BACKEND on STYLEMATE_CLIP_MODEL)."""
+    import clip_model
+    name = name or config.INFERENCE_BACKEND
+    key = (name, clip_model.model_tag(clip))
+    if key not in _backends:
+        _backends[key] = create_backend(name, clip=clip)
+    return _backends[key]
+
+
+# ─── DRIFT + LATENCY CHECKS ───────────────────────────────────────────────────
+def embedding_drift(backend, reference, batch: torch.Tensor) -> dict:
+    """
+    Cosine similarity between `backend` and `reference` (normally eager fp32)
+    embeddings of the same preprocessed batch. 1.0 = identical.
+    """
+    a = backend.encode_images(batch)
+    b = reference.encode_images(batch)
+    cos = (a * b).sum(dim=-1).numpy()
+    return {"min_cosine": float(cos.min()), "mean_cosine": float(cos.mean())}
+
+
+def latency_per_image(backend, batch: torch.Tensor, repeats: int = 5, batch_size: int = 1) -> dict:
+    """Median per-image latency (ms) when encoding `batch` in chunks of `batch_size`."""
+    backend.encode_images(batch[:batch_size])  # warm-up
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for start in range(0, len(batch), batch_size):
+            backend.encode_images(batch[start:start + batch_size])
+        timings.append((time.perf_counter() - t0) / len(batch))
+    return {"batch_size": batch_size, "ms_per_image": float(np.median(timings) * 1000.0)}
@@ -0,0 +1,122 @@
+# stylemate-ai/mapped_metas.py
+#
+# Read-only product metadata that lives in the OS page cache instead of the
+# Python heap, so several server workers on one host share a single physical
+# copy. Two files:
+#
+#   <name>.jsonl          – one compact JSON object per product, in row order
+#   <name>.offsets.npy    – (N + 1) int64 byte offsets of each line
+#
+# `MappedMetas` memory-maps both and decodes a row only when it is accessed,
+# which the server does for the k products it returns. `PackedMetas` is the
+# same layout held on the heap (one bytes blob + the offsets array, instead of
+# a dict per product) for catalogs that aren't memory-mapped.
+#
+# Each line is already the product's serialized JSON, so `fragment(row)`
+# hands it out as bytes and a response can be assembled by concatenation
+# (see Catalog.results_json) without building or re-encoding any dicts.
+#
+#   write_mapped_metas("data/catalog/catalog_metas.jsonl", metas)
+#   metas = MappedMetas("data/catalog/catalog_metas.jsonl")
+#   metas[42]["title"]
+
+import os
+import json
+import mmap
+from collections.abc import Sequence
+import numpy as np
+
+
+def offsets_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".offsets.npy"
+
+
+def mapped_metas_exist(path: str) -> bool:
+    return os.path.exists(path) and os.path.exists(offsets_path(path))
+
+
+def encode_metas(metas) -> tuple:
+    """(JSONL bytes, (N + 1) int64 line offsets) for `metas`."""
+    lines = [json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n" for meta in metas]
+    offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    np.cumsum([len(line) for line in lines], out=offsets[1:])
+    return b"".join(lines), offsets
+
+
+def write_mapped_metas(path: str, metas: list):
+    """Write `metas` as JSONL + offsets; both land atomically via temp files."""
+    if isinstance(metas, PackedMetas):
+        blob, offsets = metas._buf, metas._offsets
+    else:
+        blob, offsets = encode_metas(metas)
+    with open(path + ".tmp", "wb") as f:
+        f.write(blob)
+    with open(offsets_path(path) + ".tmp", "wb") as f:
+        np.save(f, offsets)
+    os.replace(offsets_path(path) + ".tmp", offsets_path(path))
+    os.replace(path + ".tmp", path)
+
+
+class _LineMetas(Sequence):
+    """Rows of a JSONL buffer (`_buf`) addressed by `_offsets`; decoded on access."""
+
+    _buf = b""
+    _offsets = np.zeros(1, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def _span(self, row) -> tuple:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("metas index out of range")
+        return int(self._offsets[row]), int(self._offsets[row + 1]) - 1   # without the newline
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        start, end = self._span(row)
+        return json.loads(self._buf[start:end])
+
+    def fragment(self, row: int) -> bytes:
+        """Row `row` as its serialized (compact, UTF-8) JSON."""
+        start, end = self._span(row)
+        return self._buf[start:end]
+
+
+class MappedMetas(_LineMetas):
+    """List-like, read-only view of a JSONL metas file; rows decode on access."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offsets = np.load(offsets_path(path), mmap_mode="r")
+        with open(path, "rb") as f:
+            # an empty file can't be mapped; it can only hold zero rows anyway
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        if int(self._offsets[-1]) != len(self._buf):
+            raise ValueError(f"{path}: offsets don't match the file size (stale or truncated)")
+
+
+class PackedMetas(_LineMetas):
+    """The JSONL layout on the heap: one bytes object + an offsets array for every product."""
+
+    def __init__(self, buf: bytes, offsets: np.ndarray):
+        if int(offsets[-1]) != len(buf):
+            raise ValueError("offsets don't match the buffer size")
+        self._buf = buf
+        self._offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+
+    @classmethod
+    def from_metas(cls, metas):
+        return cls(*encode_metas(metas))
+
+    @classmethod
+    def load(cls, path: str):
+        """Read a file written by write_mapped_metas onto the heap."""
+        with open(path, "rb") as f:
+            buf = f.read()
+        return cls(buf, np.load(offsets_path(path)))
+
+    def nbytes(self) -> int:
+        return len(self._buf) + self._offsets.nbytes
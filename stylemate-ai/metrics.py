@@ -0,0 +1,203 @@
+# stylemate-ai/metrics.py
+#
+# Minimal in-process metrics with a Prometheus text exposition (version 0.0.4),
+# served on GET /metrics by both servers. No extra dependency: counters and
+# fixed-bucket histograms are a lock + a few adds, so the hot path pays
+# microseconds; gauges that summarize other objects (cache hit rates, index
+# sizes per brand) are callbacks evaluated only when /metrics is scraped.
+#
+#   with STAGE_SECONDS.time("decode"):
+#       img = open_image(data)
+#   REQUESTS.inc(endpoint="/recommend", status="200")
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds: 0.5 ms … 10 s, covering a cached search up to a cold CPU forward pass
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels[n] for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.label_names, key)} {_number(v)}" for key, v in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}   # label values → [per-bucket counts…, +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[n] for n in self.label_names)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[slot] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        """Observe the duration of the `with` block (labels given positionally)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **dict(zip(self.label_names, label_values)))
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, key + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class CallbackGauge:
+    """Gauge whose samples come from `fn() → [(label values tuple, value), …]` at scrape time."""
+
+    def __init__(self, name: str, help: str, fn, labels: tuple = ()):
+        self.name, self.help, self.label_names, self.fn = name, help, tuple(labels), fn
+
+    def render(self) -> list:
+        try:
+            samples = list(self.fn())
+        except Exception:
+            samples = []   # e.g. catalog not loaded yet
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        lines += [f"{self.name}{_labels(self.label_names, key)} {_number(v)}" for key, v in samples]
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, fn, labels: tuple = ()) -> CallbackGauge:
+        """Register (or replace) a callback gauge."""
+        return self._add(CallbackGauge(name, help, fn, labels))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+# ─── SERVER METRICS (shared by flask_app.py and asgi_app.py) ──────────────────
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter(
+    "stylemate_requests_total", "HTTP requests by endpoint and status code.", ("endpoint", "status"))
+REQUEST_SECONDS = REGISTRY.histogram(
+    "stylemate_request_seconds", "End-to-end request latency.", ("endpoint",))
+STAGE_SECONDS = REGISTRY.histogram(
+    "stylemate_stage_seconds",
+    "Time per request stage (decode, preprocess, queue, encode, search, serialize, …).", ("stage",))
+BATCH_SIZE = REGISTRY.histogram(
+    "stylemate_inference_batch_size", "Images per encoder forward pass.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+BATCH_SECONDS = REGISTRY.histogram(
+    "stylemate_inference_batch_seconds", "Duration of one encoder forward pass.")
+
+
+def register_cache_gauges(embedding_cache=None, text_cache=None):
+    """Hit rate / size gauges of the query caches (either may be None)."""
+    def samples():
+        out = []
+        if embedding_cache is not None:
+            stats = embedding_cache.stats()
+            out += [(("image", "entries"), stats["entries"]), (("image", "hit_rate"), stats["hit_rate"]),
+                    (("image", "hits"), stats["hits_exact"] + stats["hits_disk"] + stats["hits_perceptual"]),
+                    (("image", "misses"), stats["misses"])]
+        if text_cache is not None:
+            stats = text_cache.stats()
+            out += [(("text", "entries"), stats["entries"] + stats["pinned"]), (("text", "hit_rate"), stats["hit_rate"]),
+                    (("text", "hits"), stats["hits"]), (("text", "misses"), stats["misses"])]
+        return out
+    REGISTRY.gauge("stylemate_query_cache", "Query embedding cache statistics.", samples, ("cache", "stat"))
+
+
+def register_catalog_gauges(get_catalog, registry=None):
+    """
+    Products per brand in the served catalog; `get_catalog()` returns it (or
+    None while loading). With a CatalogRegistry, also its version and reload errors.
+    """
+    counts = {}
+
+    def samples():
+        catalog = get_catalog()
+        if catalog is None:
+            return []
+        if counts.get("catalog") is not catalog:
+            import numpy as np
+            per_brand = np.bincount(np.asarray(catalog.brand_ids), minlength=len(catalog.brand_names))
+            counts.update(catalog=catalog, rows=[((name,), int(n)) for name, n in zip(catalog.brand_names, per_brand)])
+        return counts["rows"]
+    REGISTRY.gauge("stylemate_catalog_products", "Products in the served catalog, by brand.", samples, ("brand",))
+    if registry is not None:
+        REGISTRY.gauge("stylemate_catalog_version", "Catalog loads so far (1 = the startup load).",
+                       lambda: [((), registry.version)])
+        REGISTRY.gauge("stylemate_catalog_reload_failed", "1 while the last catalog reload failed.",
+                       lambda: [((), 1.0 if registry.last_error else 0.0)])
+
+
+def register_startup_gauge(startup):
+    REGISTRY.gauge("stylemate_ready", "1 once model and catalog are loaded and warm.",
+                   lambda: [((), 1.0 if startup.ready.is_set() else 0.0)])
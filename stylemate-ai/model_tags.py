@@ -0,0 +1,55 @@
+# stylemate-ai/model_tags.py
+#
+# Which CLIP model produced a set of embeddings. Two models embed into
+# different spaces even at the same dimension, so a catalog searched with
+# another model's queries doesn't fail — it returns confident nonsense.
+# Every file holding embeddings therefore records the model's tag
+# ("<architecture>/<pretrained>", see clip_model.model_tag) and every loader
+# checks it against the model the process runs:
+#
+#   vector stores           – "model" in the <stem>.meta.json sidecar
+#   unified catalogs        – "model" in catalog_info.json
+#   brand indexes, style    – <file>.model.json next to the file (faiss
+#   centroids                 indexes and the style JSON have no room for it)
+#
+# Everything written before tags existed was embedded by ViT-B-32 /
+# laion2b_s34b_b79k, so an untagged file reads as that model.
+
+import os
+import json
+
+LEGACY_MODEL = "ViT-B-32/laion2b_s34b_b79k"
+
+
+class ModelMismatchError(ValueError):
+    """Embeddings on disk come from another model than the one asked for."""
+
+
+def check_model(found: str, expected: str, source: str):
+    """Raise ModelMismatchError unless `found` (None = untagged) is `expected`; no-op without `expected`."""
+    found = found or LEGACY_MODEL
+    if expected and found != expected:
+        raise ModelMismatchError(
+            f"{source} was embedded with {found}, not {expected}; re-embed it "
+            f"(scrapers/reembed.py --model …) or point STYLEMATE_CLIP_MODEL at {found}"
+        )
+
+
+def tag_path(path: str) -> str:
+    return path + ".model.json"
+
+
+def write_tag(path: str, model: str, dim: int = None):
+    """Record the model behind `path` in <path>.model.json (written atomically)."""
+    with open(tag_path(path) + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"model": model, "dim": dim}, f)
+    os.replace(tag_path(path) + ".tmp", tag_path(path))
+
+
+def read_tag(path: str) -> str:
+    """The model recorded for `path`; LEGACY_MODEL when it has no tag."""
+    try:
+        with open(tag_path(path), "r", encoding="utf-8") as f:
+            return json.load(f).get("model") or LEGACY_MODEL
+    except FileNotFoundError:
+        return LEGACY_MODEL
@@ -0,0 +1,110 @@
+# stylemate-ai/near_duplicates.py
+#
+# Index-build stage that collapses near-duplicate products (colourways and
+# fits of one garment: "VINTAGE BOXY HOODIE - WASHED BLACK" / "- FADED PINE",
+# "450 GSM HOODIE / BOXY" / "/ CROPPED") into one representative row plus a
+# variant list, so the index holds fewer vectors and a top-k isn't filled
+# with the same garment in five colours.
+#
+# Two products are linked when they belong to the same brand, share a title
+# family (the title before its " - colour" / " / fit" suffix) and their
+# embeddings have cosine ≥ threshold; groups are the connected components.
+# The family check is what keeps similar-looking but different products
+# (two jean cuts at 0.92) apart; it can be switched off to group on vectors alone.
+#
+# The representative is the member closest to the group's mean embedding.
+
+import re
+import numpy as np
+import faiss
+
+_FAMILY_SPLIT = re.compile(r"\s+[-–/|]\s+")
+
+
+def title_family(title: str) -> str:
+    """'VINTAGE BOXY HOODIE - WASHED BLACK' → 'vintage boxy hoodie'."""
+    return _FAMILY_SPLIT.split((title or "").strip(), maxsplit=1)[0].strip().lower()
+
+
+def _components(n: int, pairs: np.ndarray) -> np.ndarray:
+    """Union-find over (i, j) pairs → component label per row."""
+    parent = np.arange(n)
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j in pairs:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    return np.array([find(x) for x in range(n)])
+
+
+def group_near_duplicates(vectors: np.ndarray, metas: list, brand_ids: np.ndarray,
+                          threshold: float, same_family: bool = True) -> list:
+    """
+    Groups of rows (lists, representative first) of normalized `vectors`;
+    singletons included, in order of each group's first row.
+    """
+    blocks = {}
+    for row, meta in enumerate(metas):
+        key = (int(brand_ids[row]), title_family(meta.get("title")) if same_family else "")
+        blocks.setdefault(key, []).append(row)
+
+    groups = []
+    for rows in blocks.values():
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) == 1:
+            groups.append([int(rows[0])])
+            continue
+        block = np.ascontiguousarray(vectors[rows], dtype="float32")
+        index = faiss.IndexFlatIP(block.shape[1])
+        index.add(block)
+        lims, _, neighbours = index.range_search(block, threshold)
+        pairs = [(i, int(j)) for i in range(len(rows)) for j in neighbours[lims[i]:lims[i + 1]] if j != i]
+        labels = _components(len(rows), pairs)
+        for label in np.unique(labels):
+            members = np.flatnonzero(labels == label)
+            mean = block[members].mean(axis=0)
+            rep = members[int(np.argmax(block[members] @ mean))]
+            groups.append([int(rows[rep])] + [int(rows[m]) for m in members if m != rep])
+    groups.sort(key=min)
+    return groups
+
+
+def merged_attributes(metas: list, group: list) -> dict:
+    """
+    Filter attributes of a whole group: tags of any member, a size in stock if
+    it is in any colourway, the representative's price.
+    """
+    tags, sizes = [], {}
+    for row in group:
+        for tag in metas[row].get("tags") or ():
+            if tag not in tags:
+                tags.append(tag)
+        for variant in metas[row].get("sizes") or ():
+            size = variant.get("size")
+            if size:
+                sizes[size] = sizes.get(size, False) or bool(variant.get("in_stock"))
+    return {"price": metas[group[0]].get("price"), "tags": tags,
+            "sizes": [{"size": s, "in_stock": in_stock} for s, in_stock in sizes.items()]}
+
+
+def collapse_report(groups: list, metas: list, bytes_before: int, bytes_after: int) -> dict:
+    """How much the collapse shrank the index, plus the largest groups by title."""
+    sizes = np.asarray([len(g) for g in groups])
+    largest = sorted(groups, key=len, reverse=True)[:10]
+    return {
+        "products": int(sizes.sum()),
+        "rows": len(groups),
+        "collapsed": int(sizes.sum() - len(groups)),
+        "groups_with_variants": int((sizes > 1).sum()),
+        "largest_group": int(sizes.max()) if len(sizes) else 0,
+        "index_bytes_before": bytes_before,
+        "index_bytes_after": bytes_after,
+        "index_size_ratio": round(bytes_after / bytes_before, 4) if bytes_before else None,
+        "largest_groups": [[metas[row].get("title") for row in g] for g in largest if len(g) > 1],
+    }
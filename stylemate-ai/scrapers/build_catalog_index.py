@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# stylemate-ai/scrapers/build_catalog_index.py
+#
+# Merge every brand's vectors (its <brand>_vectors store, or <brand>.index +
+# <brand>_metas.json, as written by pipeline.py) into ONE unified catalog
+# under data/catalog/, so the server answers a query with a single faiss
+# search instead of one per brand.
+#
+# Every brand must have been embedded by the same CLIP model (checked, see
+# model_tags.py); the catalog records it in catalog_info.json.
+#
+#   python scrapers/build_catalog_index.py --brands drmers galore
+#   python scrapers/build_catalog_index.py --model small     # data/models/small → its catalog/
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import json
+import argparse
+import numpy as np
+import faiss
+import config
+import clip_model
+from catalog import Catalog
+from catalog_registry import discover_brands, load_brand_vectors, attach_attributes
+from index_factory import INDEX_KINDS, build_index, write_report
+from near_duplicates import collapse_report
+
+
+def build_catalog(datadir: str, brands: list, outdir: str, kind: str = "flat", collapse_threshold: float = None,
+                  collapse_same_family: bool = True, model: str = None, **index_params) -> Catalog:
+    model = model or clip_model.model_tag()
+    triples = []
+    for brand in brands:
+        vectors, metas = load_brand_vectors(datadir, brand, model=model)
+        metas = attach_attributes(datadir, brand, metas)
+        print(f"   • {brand}: {len(metas)} products")
+        triples.append((brand, vectors, metas))
+
+    catalog = Catalog.from_vectors(triples, kind=kind, collapse_threshold=collapse_threshold,
+                                   collapse_same_family=collapse_same_family, model=model, **index_params)
+    catalog.save(outdir)
+    print(f"✅ Unified catalog: {len(catalog)} rows from {len(brands)} brands ({kind}, {model}) → {outdir}")
+
+    vectors = np.vstack([np.asarray(v, dtype="float32") for _, v, _ in triples])
+    faiss.normalize_L2(vectors)
+    if catalog.groups is not None:
+        # index size with vs. without the collapse (same kind and parameters)
+        metas = [m for _, _, brand_metas in triples for m in brand_metas]
+        uncollapsed = build_index(vectors, kind=kind, **index_params)
+        report = collapse_report(catalog.groups, metas, len(faiss.serialize_index(uncollapsed)),
+                                 len(faiss.serialize_index(catalog.index)))
+        with open(os.path.join(outdir, "catalog.collapse.report.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"🧩 Collapsed {report['products']} products into {report['rows']} rows "
+              f"({report['groups_with_variants']} with variants); index "
+              f"{report['index_bytes_before'] / 1e6:.2f} MB → {report['index_bytes_after'] / 1e6:.2f} MB")
+        vectors = vectors[[g[0] for g in catalog.groups]]
+
+    # Recall@k / latency / memory vs. exact flat search
+    write_report(catalog.index, vectors, os.path.join(outdir, "catalog.index.report.json"))
+    return catalog
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge per-brand indexes into one catalog index.")
+    parser.add_argument(
+        "--datadir", "-d",
+        help="Folder holding <brand>.index + <brand>_metas.json (default: STYLEMATE_DATA_DIR for --model)"
+    )
+    parser.add_argument(
+        "--brands", "-b", nargs="*",
+        help="Brands to include (default: every brand found in --datadir)"
+    )
+    parser.add_argument(
+        "--outdir", "-o",
+        help="Where to write the unified catalog (default: STYLEMATE_CATALOG_DIR, <datadir of --model>/catalog)"
+    )
+    parser.add_argument(
+        "--kind", "-k", choices=INDEX_KINDS, default="flat",
+        help="Faiss index type for the unified catalog (default: flat = exact)"
+    )
+    parser.add_argument(
+        "--collapse", type=float, default=config.COLLAPSE_THRESHOLD,
+        help="Collapse same-brand products of one title family with cosine ≥ this into one row (0 = off)"
+    )
+    parser.add_argument("--collapse-any-title", action="store_true",
+                        help="Group near-duplicates on vectors alone, ignoring title families")
+    parser.add_argument("--nlist", type=int, help="IVF lists (default: ~4·√N)")
+    parser.add_argument("--hnsw-m", type=int, help="HNSW neighbours per node (default: 32)")
+    parser.add_argument("--pq-m", type=int, help="PQ sub-quantizers (default: 64)")
+    parser.add_argument("--model", help="CLIP model tier or '<architecture>/<pretrained>' the brands were "
+                                        "embedded with (default: STYLEMATE_CLIP_MODEL)")
+    args = parser.parse_args()
+    if args.model:
+        config.use_clip_model(args.model)
+    datadir = args.datadir or config.DATA_DIR
+
+    brands = args.brands or discover_brands(datadir)
+    if not brands:
+        print(f"❌ No <brand>_vectors stores or <brand>.index + <brand>_metas.json pairs found in {datadir}")
+        sys.exit(1)
+    index_params = {
+        key: value for key, value in
+        (("nlist", args.nlist), ("hnsw_m", args.hnsw_m), ("pq_m", args.pq_m))
+        if value is not None
+    }
+    build_catalog(datadir, brands, args.outdir or config.CATALOG_DIR, kind=args.kind,
+                  collapse_threshold=args.collapse or None, collapse_same_family=not args.collapse_any_title,
+                  **index_params)
@@ -1,34 +1,50 @@
-import os, json
+import os, sys, json, argparse
 import numpy as np
 import faiss
 
+# make the project root importable (for vector_store.py)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from vector_store import read_vectors, read_sidecar, store_exists
+from model_tags import LEGACY_MODEL, write_tag
+from index_factory import INDEX_KINDS, build_index, write_report
+
 # ─ CONFIG ──────────────────────────────────────────────────────────────────────
+# Binary vector store (product_vectors.npy + product_vectors.meta.json);
+# falls back to a legacy product_vectors.json if that is all there is.
 VECTORS_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__),
-                                            '..', 'product_vectors.json'))
+                                            '..', 'product_vectors'))
+if not store_exists(VECTORS_FILE) and os.path.exists(VECTORS_FILE + '.json'):
+    VECTORS_FILE += '.json'
 INDEX_FILE   = os.path.abspath(os.path.join(os.path.dirname(__file__),
                                             '..', 'product.index'))
 METAS_FILE   = os.path.abspath(os.path.join(os.path.dirname(__file__),
                                             '..', 'product_metas.json'))
 
+parser = argparse.ArgumentParser(description="Build product.index from product_vectors.")
+parser.add_argument('--kind', '-k', choices=INDEX_KINDS, default='flat',
+                    help="Faiss index type (default: flat = exact)")
+args = parser.parse_args()
+
 # ─ LOAD VECTORS & METADATA ──────────────────────────────────────────────────────
-with open(VECTORS_FILE, 'r', encoding='utf-8') as f:
-    items = json.load(f)
+vectors, metas = read_vectors(VECTORS_FILE)
 
-# extract numpy arrays
-vectors = np.array([it['vector'] for it in items], dtype='float32')
-metas   = [it['meta'] for it in items]
+# writable float32 copy in RAM (the store may be a read-only float16 memmap)
+vectors = np.array(vectors, dtype='float32')
 
 # normalize for inner-product (cosine) search
 faiss.normalize_L2(vectors)
 
 # ─ BUILD & SAVE INDEX ───────────────────────────────────────────────────────────
-dim   = vectors.shape[1]
-index = faiss.IndexFlatIP(dim)      # use Inner Product => cosine if normalized
-index.add(vectors)                  # add all vectors
+index = build_index(vectors, kind=args.kind)   # Inner Product => cosine since normalized
 
-# persist
+# persist, carrying over the model tag of the vectors (see model_tags.py)
 faiss.write_index(index, INDEX_FILE)
+model = read_sidecar(VECTORS_FILE).get('model') if store_exists(VECTORS_FILE) else None
+write_tag(INDEX_FILE, model or LEGACY_MODEL, index.d)
 with open(METAS_FILE, 'w', encoding='utf-8') as f:
     json.dump(metas, f, indent=2, ensure_ascii=False)
 
-print(f"✅ Indexed {len(metas)} products → {INDEX_FILE}")
+print(f"✅ Indexed {len(metas)} products ({args.kind}) → {INDEX_FILE}")
+
+# recall@k / latency / memory vs. exact flat search
+write_report(index, vectors, INDEX_FILE + '.report.json')
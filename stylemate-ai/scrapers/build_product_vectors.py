@@ -12,42 +12,37 @@ if root_dir not in sys.path:
 # ───────────────────────────────────────────────────────────────────────────────
 import json
 import argparse
-import requests
-from io import BytesIO
-from PIL import Image
 import torch
-from clip_model import model, preprocess   # ← now this works
+import clip_model   # ← now this works; the model itself loads on first use (STYLEMATE_CLIP_MODEL / --model)
+import config
+from inference import get_backend, BACKENDS
+from scrapers.embedder import PipelinedEmbedder
+from scrapers.image_cache import default_cache
+from vector_store import write_vector_store, store_paths
 
 # ───────────────────────────────────────────────────────────────────────────────
 # HELPERS
 # ───────────────────────────────────────────────────────────────────────────────
 
-def fetch_image(url: str) -> Image.Image:
-    """Download an image from a URL and return a PIL Image (RGB)."""
-    resp = requests.get(url, timeout=10)
-    resp.raise_for_status()
-    return Image.open(BytesIO(resp.content)).convert("RGB")
-
-def embed_image(img: Image.Image) -> list:
-    """
-    Run the global CLIP model on a PIL image and return a normalized vector.
-    Assumes that `clip_model.model` and `clip_model.preprocess` are already imported.
-    """
-    x = preprocess(img).unsqueeze(0)  # add batch dimension
-    with torch.no_grad():
-        emb = model.encode_image(x)
-        emb = emb / emb.norm(dim=-1, keepdim=True)
-    return emb.squeeze().tolist()
+def encode_batch(x: torch.Tensor) -> torch.Tensor:
+    """Encode a (B × 3 × 224 × 224) batch in one forward pass → (B × D) normalized."""
+    return get_backend().encode_images(x)
 
 # ───────────────────────────────────────────────────────────────────────────────
 # MAIN
 # ───────────────────────────────────────────────────────────────────────────────
 
-def build_product_vectors(input_path: str, output_path: str):
+def build_product_vectors(input_path: str, output_path: str, workers: int = 8, batch_size: int = 32,
+                          dtype: str = "float32", offline: bool = False):
     """
     1. Loads your scraped JSON (list of { title, price, url, image_url, … } entries).
-    2. Downloads each `image_url`, runs it through CLIP, and gathers the resulting vector.
-    3. Writes out a new JSON array of { meta: {title,price,url}, vector: [...] } to `output_path`.
+    2. Downloads each `image_url` (`workers` at a time), runs them through CLIP in
+       batches of `batch_size`, and gathers the resulting vectors.
+    3. Writes a binary vector store at `output_path` (a stem: <stem>.npy holds the
+       N × D matrix, <stem>.meta.json the {title,price,url,tags,sizes} metas).
+
+    Images go through the image cache (STYLEMATE_IMAGE_CACHE_DIR): cached ones
+    aren't downloaded again, and with `offline=True` only cached ones are used.
     """
     if not os.path.isfile(input_path):
         print(f"❌ Products file not found: {input_path}")
@@ -60,34 +55,51 @@ def build_product_vectors(input_path: str, output_path: str):
     product_vectors = []
     print(f"🔍 Embedding {len(products)} products from: {input_path}\n")
 
+    to_embed = []
     for idx, prod in enumerate(products, start=1):
-        image_url = prod.get("image_url", "")
         meta = {
             "title": prod.get("title"),
             "price": prod.get("price"),
             "url": prod.get("url"),
+            "tags": prod.get("tags") or [],
+            "sizes": prod.get("sizes") or [],
         }
-
-        if not image_url:
+        if not prod.get("image_url", ""):
             print(f"⚠️  [{idx}] Skipping (no image_url): {meta['title']}")
             continue
+        to_embed.append((prod["image_url"], meta))
+
+    def log_result(res):
+        meta = to_embed[res.index][1]
+        if res.error:
+            print(f"❌  Failed to embed {meta['title']}: {res.error}")
 
-        try:
-            img = fetch_image(image_url)
-            vec = embed_image(img)
+    image_cache = default_cache()
+    if offline and image_cache is None:
+        print("❌ --offline needs the image cache (STYLEMATE_IMAGE_CACHE_DIR is empty)")
+        return
+    embedder = PipelinedEmbedder(encode_batch, get_backend().preprocess, workers=workers, batch_size=batch_size,
+                                 image_cache=image_cache, offline=offline)
+    results = embedder.run([url for url, _ in to_embed], on_result=log_result)
+
+    for (_, meta), res in zip(to_embed, results):
+        if res.vector is not None:
             product_vectors.append({
                 "meta": meta,
-                "vector": vec
+                "vector": res.vector
             })
-            print(f"✅  [{idx}] Embedded: {meta['title']}")
-        except Exception as e:
-            print(f"❌  [{idx}] Failed to embed {meta['title']}: {e}")
 
     # Write out the embeddings
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    print(f"\n💾 Saving {len(product_vectors)} vectors to: {output_path}")
-    with open(output_path, "w", encoding="utf-8") as out_f:
-        json.dump(product_vectors, out_f, indent=2, ensure_ascii=False)
+    npy_path, meta_path = store_paths(output_path)
+    os.makedirs(os.path.dirname(os.path.abspath(npy_path)), exist_ok=True)
+    print(f"\n💾 Saving {len(product_vectors)} vectors to: {npy_path} (+ {os.path.basename(meta_path)})")
+    write_vector_store(
+        output_path,
+        [pv["vector"] for pv in product_vectors],
+        [pv["meta"] for pv in product_vectors],
+        dtype=dtype,
+        model=clip_model.model_tag(),
+    )
 
     print("🎉 Done!\n")
 
@@ -110,11 +122,49 @@ if __name__ == "__main__":
         "-o",
         required=True,
         help=(
-            "Where to write the JSON of embedded products. "
-            "This script will produce an array of { 'meta': {title,price,url}, 'vector': … }."
+            "Where to write the embedded products, as a vector store stem (e.g. data/galore_vectors). "
+            "This script will produce <stem>.npy (the vectors) and <stem>.meta.json ({title,price,url,tags,sizes} metas)."
         )
     )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=8,
+        help="Concurrent image downloads (default: 8)."
+    )
+    parser.add_argument(
+        "--batch-size",
+        "-b",
+        type=int,
+        default=32,
+        help="Images per CLIP forward pass (default: 32)."
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=("float32", "float16"),
+        default="float32",
+        help="On-disk dtype of the vectors (default: float32)."
+    )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(BACKENDS),
+        help="CLIP inference backend (default: STYLEMATE_INFERENCE_BACKEND or eager)."
+    )
+    parser.add_argument(
+        "--model",
+        help="CLIP model tier (small / base / large) or '<architecture>/<pretrained>' (default: STYLEMATE_CLIP_MODEL)."
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Embed from the image cache only; images that were never downloaded are skipped."
+    )
     args = parser.parse_args()
+    if args.backend:
+        config.INFERENCE_BACKEND = args.backend
+    if args.model:
+        config.use_clip_model(args.model)
 
     # Force CLIP to CPU (in case GPU/MPS is enabled)
     os.environ["CUDA_VISIBLE_DEVICES"] = ""  # disable CUDA GPUs
@@ -123,9 +173,13 @@ if __name__ == "__main__":
 
     # Put the CLIP model on CPU
     device = torch.device("cpu")
-    model.to(device).eval()
+    clip_model.model.to(device).eval()
 
     build_product_vectors(
         input_path=args.input,
-        output_path=args.output
+        output_path=args.output,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        dtype=args.dtype,
+        offline=args.offline
     )
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# stylemate-ai/scrapers/convert_vectors.py
+#
+# Convert legacy [{meta, vector}, …] JSON vector files into the binary
+# vector store format (see vector_store.py).
+#
+#   python scrapers/convert_vectors.py data/drmers_product_vectors.json data/galore_product_vectors.json
+#   → data/drmers_vectors.npy + data/drmers_vectors.meta.json, …
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import argparse
+from model_tags import LEGACY_MODEL
+from vector_store import read_legacy_json, write_vector_store, store_paths, SUPPORTED_DTYPES
+
+
+def default_output(json_path: str) -> str:
+    """data/galore_product_vectors.json → data/galore_vectors"""
+    stem = json_path[: -len(".json")] if json_path.endswith(".json") else json_path
+    if stem.endswith("_product_vectors"):
+        return stem[: -len("_product_vectors")] + "_vectors"
+    return stem + "_vectors" if not stem.endswith("_vectors") else stem
+
+
+def convert(json_path: str, output: str = None, dtype: str = "float32") -> str:
+    output = output or default_output(json_path)
+    vectors, metas = read_legacy_json(json_path)
+    # the JSON files predate model selection: all ViT-B-32 / laion2b_s34b_b79k
+    write_vector_store(output, vectors, metas, dtype=dtype, model=LEGACY_MODEL)
+
+    npy_path, meta_path = store_paths(output)
+    before = os.path.getsize(json_path)
+    after = os.path.getsize(npy_path) + os.path.getsize(meta_path)
+    print(f"✅ {json_path} → {npy_path} ({len(metas)} × {vectors.shape[1]} {dtype}): "
+          f"{before / 1024:.0f} KiB → {after / 1024:.0f} KiB")
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert *_product_vectors.json files to binary vector stores.")
+    parser.add_argument("inputs", nargs="+", help="Legacy JSON vector files")
+    parser.add_argument(
+        "--output", "-o",
+        help="Output stem (only valid with a single input; default: <brand>_vectors next to the input)"
+    )
+    parser.add_argument("--dtype", choices=SUPPORTED_DTYPES, default="float32")
+    args = parser.parse_args()
+
+    if args.output and len(args.inputs) > 1:
+        parser.error("--output can only be used with a single input file")
+    for path in args.inputs:
+        convert(path, args.output, args.dtype)
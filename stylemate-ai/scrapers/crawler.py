@@ -0,0 +1,240 @@
+# stylemate-ai/scrapers/crawler.py
+#
+# Shared crawling engine for the brand scrapers.
+#
+# • One pooled keep-alive `requests` session (retries with backoff on 429/5xx,
+#   a timeout on every request) shared by a thread pool.
+# • At most `max_per_host` requests in flight per host, however many URLs of
+#   that host are queued, so a big crawl never hammers one shop.
+# • Conditional GETs: every response's ETag / Last-Modified is kept in a
+#   `ConditionalCache` (on disk, so it works across runs) and sent back as
+#   If-None-Match / If-Modified-Since. A 304 reuses the cached body — and the
+#   cached result of parsing it, so an unchanged page is neither downloaded
+#   nor parsed again.
+# • Pagination: `crawl_pages` follows each listing page's next link.
+#
+#   with Crawler(cache_dir="data/http_cache") as crawler:
+#       products = crawler.crawl_pages(collection_url, parse_listing)
+#       details = crawler.map([p["url"] + ".js" for p in products], parse_product_js)
+
+import os
+import json
+import hashlib
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = "stylemate-crawler/1.0 (+https://github.com/Malik1234567891011/stylemate)"
+
+# status: HTTP status (304 when revalidated) · text: body (from the cache on 304)
+# not_modified: served from the cache after a 304 · error: str or None
+Page = namedtuple("Page", ["url", "status", "text", "not_modified", "error"])
+
+
+def make_session(pool_size: int = 8, retries: int = 2) -> requests.Session:
+    """A keep-alive session whose connection pool matches the worker count."""
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class ConditionalCache:
+    """
+    url → {"etag", "last_modified", "text", "parsed": {parser name: result}}.
+    On disk (one JSON file per URL, written atomically) when `folder` is
+    given, in memory otherwise.
+    """
+
+    def __init__(self, folder: str = None):
+        self.folder = folder
+        self._memory = {}
+        self._lock = threading.Lock()
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.folder, key[:2], f"{key}.json")
+
+    def get(self, url: str):
+        if not self.folder:
+            with self._lock:
+                return self._memory.get(url)
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None   # missing / partial file → treat as a miss
+
+    def put(self, url: str, entry: dict):
+        if not self.folder:
+            with self._lock:
+                self._memory[url] = entry
+            return
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+def parser_name(parse) -> str:
+    """Default key for a parser's cached results."""
+    return f"{getattr(parse, '__module__', '')}.{getattr(parse, '__qualname__', repr(parse))}"
+
+
+class Crawler:
+    def __init__(self, max_per_host: int = 4, max_workers: int = 16, timeout: float = 10.0, retries: int = 2,
+                 cache_dir: str = None, user_agent: str = USER_AGENT):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.session = make_session(pool_size=max_workers, retries=retries)
+        self.session.headers["User-Agent"] = user_agent
+        self.cache = ConditionalCache(cache_dir)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crawler")
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "downloaded": 0, "not_modified": 0, "parsed": 0, "errors": 0, "bytes": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        self.session.close()
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._hosts[host]
+
+    # ─── FETCHING ─────────────────────────────────────────────────────────────
+    def fetch(self, url: str) -> Page:
+        """GET `url`, revalidating against the cache. Never raises: failures come back as Page.error."""
+        cached = self.cache.get(url)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            with self._host_slot(url):
+                resp = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            self._count(requests=1, errors=1)
+            return Page(url, None, None, False, f"{type(e).__name__}: {e}")
+
+        if resp.status_code == 304 and cached:
+            self._count(requests=1, not_modified=1)
+            return Page(url, 304, cached["text"], True, None)
+        if resp.status_code >= 400:
+            self._count(requests=1, errors=1)
+            return Page(url, resp.status_code, None, False, f"HTTP {resp.status_code}")
+
+        self._count(requests=1, downloaded=1, bytes=len(resp.content))
+        etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+        if etag or last_modified:
+            self.cache.put(url, {"etag": etag, "last_modified": last_modified, "text": resp.text, "parsed": {}})
+        return Page(url, resp.status_code, resp.text, False, None)
+
+    def fetch_parsed(self, url: str, parse, name: str = None):
+        """
+        (parse(text, url), Page). On a 304 the result stored for this parser
+        is returned without parsing; results must be JSON-serializable.
+        Raises RuntimeError when the page can't be fetched.
+        """
+        name = name or parser_name(parse)
+        page = self.fetch(url)
+        if page.error:
+            raise RuntimeError(f"{url}: {page.error}")
+        if page.not_modified:
+            cached = self.cache.get(url) or {}
+            if name in cached.get("parsed", {}):
+                return cached["parsed"][name], page
+
+        result = parse(page.text, url)
+        self._count(parsed=1)
+        entry = self.cache.get(url)
+        if entry is not None:
+            entry.setdefault("parsed", {})[name] = result
+            self.cache.put(url, entry)
+        return result, page
+
+    def map(self, urls: list, parse, name: str = None) -> list:
+        """fetch_parsed every URL concurrently; one result (or the exception raised) per URL, in order."""
+        name = name or parser_name(parse)
+
+        def one(url):
+            try:
+                return self.fetch_parsed(url, parse, name)[0]
+            except Exception as e:
+                return e
+
+        return list(self._pool.map(one, urls))
+
+    def crawl_pages(self, start_url: str, parse, name: str = None, max_pages: int = 100) -> list:
+        """
+        Follow a paginated listing. `parse(text, url)` returns (items, next page
+        URL or None); the items of every page are returned concatenated.
+        """
+        items, url, seen = [], start_url, set()
+        while url and url not in seen and len(seen) < max_pages:
+            seen.add(url)
+            (page_items, next_url), _ = self.fetch_parsed(url, parse, name)
+            items.extend(page_items)
+            url = urljoin(url, next_url) if next_url else None
+        return items
+
+
+# ─── SHOPIFY HELPERS (both brands run Shopify storefronts) ────────────────────
+def next_page_url(soup, url: str):
+    """Absolute URL of the listing's next page (<link rel="next"> / <a rel="next">), or None."""
+    link = soup.select_one('link[rel="next"], a[rel="next"]')
+    return urljoin(url, link["href"]) if link and link.get("href") else None
+
+
+def product_json_url(product_url: str) -> str:
+    """Shopify serves every product page as JSON at <product url>.js."""
+    return product_url.split("?", 1)[0].rstrip("/") + ".js"
+
+
+def parse_product_js(text: str, url: str) -> dict:
+    """Tags and per-size stock from a Shopify <product>.js document."""
+    product = json.loads(text)
+    options = [o.get("name", "") if isinstance(o, dict) else str(o) for o in product.get("options") or []]
+    size_option = next((i for i, name in enumerate(options) if name.lower() == "size"), None)
+    sizes, seen = [], set()
+    for variant in product.get("variants") or []:
+        size = variant.get(f"option{size_option + 1}") if size_option is not None else variant.get("title")
+        if size and size not in seen:
+            seen.add(size)
+            sizes.append({"size": size, "in_stock": bool(variant.get("available"))})
+        elif size:
+            # another colour of the same size: in stock if any of them is
+            entry = next(s for s in sizes if s["size"] == size)
+            entry["in_stock"] = entry["in_stock"] or bool(variant.get("available"))
+    tags = product.get("tags") or []
+    if isinstance(tags, str):
+        tags = [t.strip() for t in tags.split(",") if t.strip()]
+    return {"tags": tags, "sizes": sizes}
@@ -1,9 +1,14 @@
-import requests
+# Imported as scrapers.drmers_scraper (pipeline.py); to run it on its own, from stylemate-ai/:
+#   python -m scrapers.drmers_scraper
+
 from bs4 import BeautifulSoup
 import json
 import logging
 from urllib.parse import urljoin, unquote
 
+import config
+from scrapers.crawler import Crawler, next_page_url, product_json_url, parse_product_js
+
 # ───────────────────────────────────────────────────────────────────────────────
 # CONFIGURATION
 # ───────────────────────────────────────────────────────────────────────────────
@@ -24,14 +29,13 @@ logger = logging.getLogger(__name__)
 # ───────────────────────────────────────────────────────────────────────────────
 # UTILITIES
 # ───────────────────────────────────────────────────────────────────────────────
-def get_soup(url: str) -> BeautifulSoup:
-    """Fetch URL and return BeautifulSoup parser."""
-    resp = requests.get(url)
-    resp.raise_for_status()
-    return BeautifulSoup(resp.text, "html.parser")
+def make_crawler() -> Crawler:
+    """A crawler configured from config.py (pooled, per-host bounded, conditional GETs)."""
+    return Crawler(max_per_host=config.CRAWL_MAX_PER_HOST, max_workers=config.CRAWL_MAX_WORKERS,
+                   timeout=config.CRAWL_TIMEOUT_S, cache_dir=config.CRAWL_CACHE_DIR or None)
 
 
-def pick_image_url(card: BeautifulSoup) -> str:
+def pick_image_url(card: BeautifulSoup, base_url: str = BASE_URL) -> str:
     """Select the highest-res image from primary, secondary, or noscript tags."""
     # primary image
     img = card.select_one("img.grid-product__image")
@@ -42,7 +46,7 @@ def pick_image_url(card: BeautifulSoup) -> str:
             return last if last.startswith('http') else f'https:{last}'
         src = img.get('src')
         if src:
-            return src if src.startswith('http') else urljoin(BASE_URL, src)
+            return src if src.startswith('http') else urljoin(base_url, src)
     # secondary image
     img2 = card.select_one(".grid-product__secondary-image img")
     if img2:
@@ -52,21 +56,21 @@ def pick_image_url(card: BeautifulSoup) -> str:
             return last if last.startswith('http') else f'https:{last}'
         src = img2.get('src')
         if src:
-            return src if src.startswith('http') else urljoin(BASE_URL, src)
+            return src if src.startswith('http') else urljoin(base_url, src)
     # noscript fallback
     nos = card.select_one('noscript img')
     if nos and nos.get('src'):
         src = nos['src']
-        return src if src.startswith('http') else urljoin(BASE_URL, src)
+        return src if src.startswith('http') else urljoin(base_url, src)
     return ""
 
 
 def parse_product_data(card: BeautifulSoup) -> tuple:
-    """Extract tags and variant sizes from embedded JSON."""
+    """Extract tags and variant sizes from embedded JSON; None when the card has none."""
     # match banana-container by presence of data-product-data attribute
     bc = card.select_one(".banana-container[data-product-data]")
     if not bc:
-        return [], []
+        return None
     try:
         raw = unquote(bc['data-product-data'])
         obj = json.loads(raw)
@@ -83,9 +87,13 @@ def parse_product_data(card: BeautifulSoup) -> tuple:
 # ───────────────────────────────────────────────────────────────────────────────
 # MAIN SCRAPER
 # ───────────────────────────────────────────────────────────────────────────────
-def scrape_drmers() -> list:
-    """Scrape all products from the collection page."""
-    soup = get_soup(COLLECTION_URL)
+def parse_collection(html: str, page_url: str) -> tuple:
+    """
+    Parse one page of the collection → (products, next page URL or None).
+    Products whose card carries no embedded product data get "tags": None
+    and are completed from their product page by scrape().
+    """
+    soup = BeautifulSoup(html, "html.parser")
     products = []
     seen_urls = set()
 
@@ -99,7 +107,7 @@ def scrape_drmers() -> list:
             title = title_el.get_text(strip=True) if title_el else None
             price = price_el.get_text(strip=True) if price_el else None
             rel   = link_el['href'] if link_el and link_el.has_attr('href') else None
-            url   = urljoin(BASE_URL, rel) if rel else None
+            url   = urljoin(page_url, rel) if rel else None
 
             if not (title and price and url):
                 logger.debug(f"Skipping incomplete: title={title}, price={price}, url={url}")
@@ -109,11 +117,11 @@ def scrape_drmers() -> list:
                 continue
             seen_urls.add(url)
 
-            image_url = pick_image_url(card)
+            image_url = pick_image_url(card, page_url)
             if not image_url:
                 logger.warning(f"No image for: {title}")
 
-            tags, sizes = parse_product_data(card)
+            tags, sizes = parse_product_data(card) or (None, [])
 
             products.append({
                 'title': title,
@@ -127,10 +135,47 @@ def scrape_drmers() -> list:
         except Exception as e:
             logger.error(f"Error parsing card: {e}")
 
-    return products
+    return products, next_page_url(soup, page_url)
+
+
+def scrape(crawler: Crawler = None, collection_url: str = COLLECTION_URL) -> list:
+    """
+    Scrape all products from every page of the collection. Tags and sizes
+    come from the cards' embedded JSON; product pages (<product>.js) are
+    fetched, concurrently, only for cards without it.
+    """
+    own = crawler is None
+    crawler = crawler or make_crawler()
+    try:
+        products = crawler.crawl_pages(collection_url, parse_collection, max_pages=config.CRAWL_MAX_PAGES)
+        unique = {}
+        for product in products:
+            unique.setdefault(product['url'], product)
+        products = list(unique.values())
+
+        missing = [p for p in products if p['tags'] is None]
+        details = crawler.map([product_json_url(p['url']) for p in missing], parse_product_js)
+        for product, detail in zip(missing, details):
+            if isinstance(detail, Exception):
+                logger.warning(f"No product details for {product['title']}: {detail}")
+                product['tags'] = []
+                continue
+            product['tags'], product['sizes'] = detail['tags'], detail['sizes']
+
+        stats = crawler.stats
+        logger.info(f"{stats['requests']} requests: {stats['downloaded']} downloaded, "
+                    f"{stats['not_modified']} not modified, {stats['errors']} errors")
+        return products
+    finally:
+        if own:
+            crawler.close()
+
+
+# kept for callers of the old name
+scrape_drmers = scrape
 
 if __name__ == '__main__':
-    data = scrape_drmers()
+    data = scrape()
     logger.info(f"Scraped {len(data)} products.")
 
     print(json.dumps(data, indent=2, ensure_ascii=False))
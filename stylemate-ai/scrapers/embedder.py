@@ -0,0 +1,210 @@
+# stylemate-ai/scrapers/embedder.py
+#
+# Pipelined image embedder for the scrape → embed → index pipeline.
+#
+#   downloader threads ──(bounded queue)──▶ batching loop ──▶ encode_fn(batch)
+#
+# • A bounded pool of downloader threads shares one pooled keep-alive HTTP
+#   session, fetches each image, decodes it and runs `preprocess`.
+# • The hand-off queue is bounded, so downloaders block (backpressure) when the
+#   model falls behind instead of piling decoded images up in memory.
+# • The consumer stacks up to `batch_size` tensors per `encode_fn` call.
+# • Every item succeeds or fails on its own: a bad URL or broken image is
+#   recorded against that item and the rest of the run carries on.
+# • With an `image_cache` (scrapers/image_cache.py) every downloaded image is
+#   kept on disk, and a cached one is only revalidated (conditional GET, 304 =
+#   no body) so an image replaced behind the same URL is picked up;
+#   `offline=True` reads the cache only, and the threads just decode + preprocess.
+
+import time
+import queue
+import threading
+from io import BytesIO
+from collections import namedtuple
+
+import requests
+import torch
+from PIL import Image
+
+from scrapers.crawler import make_session
+
+# index: position in the input list · vector: list[float] or None · error: str or None
+EmbedResult = namedtuple("EmbedResult", ["index", "vector", "error"])
+
+_DONE = object()
+
+
+class PipelinedEmbedder:
+    def __init__(
+        self,
+        encode_fn,
+        preprocess,
+        workers: int = 8,
+        batch_size: int = 32,
+        queue_size: int = 64,
+        timeout: float = 10.0,
+        session: requests.Session = None,
+        progress_every: float = 2.0,
+        image_cache=None,
+        offline: bool = False,
+    ):
+        """
+        `encode_fn` takes a (B × 3 × H × W) tensor and returns (B × D) normalized
+        embeddings; `preprocess` is the CLIP transform (PIL image → tensor).
+        """
+        if offline and image_cache is None:
+            raise ValueError("offline=True needs an image_cache to read from")
+        self.encode_fn = encode_fn
+        self.preprocess = preprocess
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.session = session or make_session(pool_size=workers)
+        self.progress_every = progress_every
+        self.image_cache = image_cache
+        self.offline = offline
+
+    # ─── DOWNLOAD STAGE ───────────────────────────────────────────────────────
+    def fetch(self, url: str) -> Image.Image:
+        if self.offline:
+            return self.image_cache.open_image(url)
+        if self.image_cache is not None:
+            data = self.image_cache.fetch(url, self.session, self.timeout, revalidate=True)
+            return Image.open(BytesIO(data)).convert("RGB")
+        resp = self.session.get(url, timeout=self.timeout)
+        resp.raise_for_status()
+        return Image.open(BytesIO(resp.content)).convert("RGB")
+
+    def load(self, source) -> Image.Image:
+        """Turn one input item into a PIL image. Override for non-HTTP sources."""
+        return self.fetch(source)
+
+    def _download_worker(self, work: queue.Queue, ready: queue.Queue):
+        while True:
+            item = work.get()
+            if item is _DONE:
+                ready.put(_DONE)
+                return
+            idx, source = item
+            try:
+                x = self.preprocess(self.load(source))
+                ready.put((idx, x, None))     # blocks when the model lags → backpressure
+            except Exception as e:
+                ready.put((idx, None, f"{type(e).__name__}: {e}"))
+
+    # ─── MAIN LOOP ────────────────────────────────────────────────────────────
+    def run(self, sources: list, on_result=None) -> list:
+        """
+        Embed every source (an image URL by default). Returns a list of
+        EmbedResult in input order. `on_result(result)` is called as each item
+        finishes, e.g. for per-item logging.
+        """
+        total = len(sources)
+        results = [None] * total
+        if total == 0:
+            return results
+
+        work = queue.Queue()
+        ready = queue.Queue(maxsize=self.queue_size)
+        for item in enumerate(sources):
+            work.put(item)
+        n_workers = max(1, min(self.workers, total))
+        for _ in range(n_workers):
+            work.put(_DONE)
+
+        threads = [
+            threading.Thread(target=self._download_worker, args=(work, ready), daemon=True)
+            for _ in range(n_workers)
+        ]
+        for t in threads:
+            t.start()
+
+        progress = _Progress(total, self.progress_every)
+        pending = []   # (idx, tensor) waiting for a full batch
+        finished_workers = 0
+
+        def finish(result):
+            results[result.index] = result
+            progress.update(result.error is None)
+            if on_result:
+                on_result(result)
+
+        def flush():
+            if not pending:
+                return
+            try:
+                out = self.encode_fn(torch.stack([x for _, x in pending]))
+                for row, (idx, _) in enumerate(pending):
+                    finish(EmbedResult(idx, _to_list(out[row]), None))
+            except Exception:
+                # a failed batch is retried one image at a time so that a
+                # single bad tensor can't take its batch-mates down with it
+                for idx, x in pending:
+                    try:
+                        out = self.encode_fn(x.unsqueeze(0))
+                        finish(EmbedResult(idx, _to_list(out[0]), None))
+                    except Exception as e_one:
+                        finish(EmbedResult(idx, None, f"{type(e_one).__name__}: {e_one}"))
+            pending.clear()
+
+        while finished_workers < n_workers:
+            try:
+                item = ready.get(timeout=0.05 if pending else None)
+            except queue.Empty:
+                # downloads are slower than the model: don't hold a partial batch
+                flush()
+                continue
+            if item is _DONE:
+                finished_workers += 1
+                continue
+            idx, x, error = item
+            if error is not None:
+                finish(EmbedResult(idx, None, error))
+                continue
+            pending.append((idx, x))
+            if len(pending) >= self.batch_size:
+                flush()
+        flush()
+
+        for t in threads:
+            t.join()
+        progress.report(final=True)
+        return results
+
+
+def _to_list(row) -> list:
+    if isinstance(row, torch.Tensor):
+        return row.tolist()
+    return [float(v) for v in row]
+
+
+class _Progress:
+    """Prints done/total, failures and images/sec at most every `every` seconds."""
+
+    def __init__(self, total: int, every: float):
+        self.total = total
+        self.every = every
+        self.ok = 0
+        self.failed = 0
+        self.start = time.perf_counter()
+        self.last = self.start
+
+    def update(self, ok: bool):
+        if ok:
+            self.ok += 1
+        else:
+            self.failed += 1
+        now = time.perf_counter()
+        if self.every and now - self.last >= self.every:
+            self.last = now
+            self.report()
+
+    def report(self, final: bool = False):
+        done = self.ok + self.failed
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        label = "✅ Embedded" if final else "⏳ Progress"
+        print(
+            f"   {label}: {done}/{self.total} "
+            f"({self.ok} ok, {self.failed} failed) · {done / elapsed:.1f} img/s · {elapsed:.1f}s"
+        )
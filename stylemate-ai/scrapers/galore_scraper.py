@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
 # galore_scraper.py
 
-import requests
+# Imported as scrapers.galore_scraper (pipeline.py); to run it on its own, from stylemate-ai/:
+#   python -m scrapers.galore_scraper
+
 from bs4 import BeautifulSoup
 import json
 import logging
 from urllib.parse import urljoin
 
+import config
+from scrapers.crawler import Crawler, next_page_url, product_json_url, parse_product_js
+
 # ───────────────────────────────────────────────────────────────────────────────
 # CONFIGURATION
 # ───────────────────────────────────────────────────────────────────────────────
@@ -27,14 +32,10 @@ logger = logging.getLogger(__name__)
 # ───────────────────────────────────────────────────────────────────────────────
 # UTILITIES
 # ───────────────────────────────────────────────────────────────────────────────
-def get_soup(url: str) -> BeautifulSoup:
-    """
-    Fetch a URL over HTTP(S) and return a BeautifulSoup object
-    with the HTML parsed.
-    """
-    resp = requests.get(url)
-    resp.raise_for_status()
-    return BeautifulSoup(resp.text, "html.parser")
+def make_crawler() -> Crawler:
+    """A crawler configured from config.py (pooled, per-host bounded, conditional GETs)."""
+    return Crawler(max_per_host=config.CRAWL_MAX_PER_HOST, max_workers=config.CRAWL_MAX_WORKERS,
+                   timeout=config.CRAWL_TIMEOUT_S, cache_dir=config.CRAWL_CACHE_DIR or None)
 
 
 def extract_price(card_content: BeautifulSoup) -> str:
@@ -56,7 +57,7 @@ def extract_price(card_content: BeautifulSoup) -> str:
     return None
 
 
-def extract_image_url(card_div: BeautifulSoup) -> str:
+def extract_image_url(card_div: BeautifulSoup, base_url: str = BASE_URL) -> str:
     """
     Given the parent <div class="card"> (which wraps each product card),
     find the first <img> and return its src (resolve to absolute if needed).
@@ -75,7 +76,7 @@ def extract_image_url(card_div: BeautifulSoup) -> str:
         if last_piece.startswith("http"):
             return last_piece
         else:
-            return urljoin(BASE_URL, last_piece)
+            return urljoin(base_url, last_piece)
 
     # Fallback to plain "src":
     src = img_tag.get("src") or ""
@@ -83,25 +84,25 @@ def extract_image_url(card_div: BeautifulSoup) -> str:
         return ""
     if src.startswith("http"):
         return src
-    return urljoin(BASE_URL, src)
+    return urljoin(base_url, src)
 
 # ───────────────────────────────────────────────────────────────────────────────
 # MAIN SCRAPER
 # ───────────────────────────────────────────────────────────────────────────────
-def scrape() -> list:
+def parse_collection(html: str, page_url: str) -> tuple:
     """
-    Scrape all products from the Galore YYZ “Shop All” collection page.
-    Returns a list of dicts, each containing:
+    Parse one page of the “Shop All” collection.
+    Returns (products, next page URL or None); each product is a dict
       {
         "title":  str,
         "price":  str or None,
         "url":    str,
         "image_url": str,
-        "tags":   [],          # (no tags on Galore’s front page)
-        "sizes":  []           # (no sizes on Galore’s front page)
+        "tags":   [],          # filled in from the product page by scrape()
+        "sizes":  []
       }
     """
-    soup = get_soup(COLLECTION_URL)
+    soup = BeautifulSoup(html, "html.parser")
     products = []
     seen_urls = set()
 
@@ -126,7 +127,7 @@ def scrape() -> list:
                 logger.debug(f"Skipping {title!r} because href is missing.")
                 continue
 
-            product_url = urljoin(BASE_URL, rel_url)
+            product_url = urljoin(page_url, rel_url)
             if product_url in seen_urls:
                 continue
             seen_urls.add(product_url)
@@ -135,12 +136,10 @@ def scrape() -> list:
             price_text = extract_price(card_content)
 
             # ─── Extract image URL ──────────────────────────────────────────
-            image_url = extract_image_url(card_div)
+            image_url = extract_image_url(card_div, page_url)
             if not image_url:
                 logger.warning(f"No image found for product: {title}")
 
-            # Tags and sizes are not exposed in Galore’s “Shop All” page,
-            # so we simply leave them empty arrays.
             products.append({
                 "title": title,
                 "price": price_text,
@@ -152,7 +151,39 @@ def scrape() -> list:
         except Exception as e:
             logger.error(f"Error parsing a Galore card: {e}")
 
-    return products
+    return products, next_page_url(soup, page_url)
+
+
+def scrape(crawler: Crawler = None, collection_url: str = COLLECTION_URL) -> list:
+    """
+    Scrape every page of the Galore YYZ “Shop All” collection, then fetch the
+    product pages (<product>.js, concurrently) for tags and sizes, which the
+    collection cards don't show. Unchanged pages are revalidated with a 304
+    and not parsed again. Returns the product dicts of parse_collection().
+    """
+    own = crawler is None
+    crawler = crawler or make_crawler()
+    try:
+        products = crawler.crawl_pages(collection_url, parse_collection, max_pages=config.CRAWL_MAX_PAGES)
+        unique = {}
+        for product in products:   # the same product can show up on two pages while the shop changes
+            unique.setdefault(product["url"], product)
+        products = list(unique.values())
+
+        details = crawler.map([product_json_url(p["url"]) for p in products], parse_product_js)
+        for product, detail in zip(products, details):
+            if isinstance(detail, Exception):
+                logger.warning(f"No product details for {product['title']}: {detail}")
+                continue
+            product["tags"], product["sizes"] = detail["tags"], detail["sizes"]
+
+        stats = crawler.stats
+        logger.info(f"{stats['requests']} requests: {stats['downloaded']} downloaded, "
+                    f"{stats['not_modified']} not modified, {stats['errors']} errors")
+        return products
+    finally:
+        if own:
+            crawler.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+# stylemate-ai/scrapers/image_cache.py
+#
+# Persistent, content-addressed cache of product images, filled while the
+# pipeline downloads them for embedding, so a new CLIP model or preprocessing
+# can be re-embedded from disk (scrapers/reembed.py) without touching the shops.
+#
+#   <folder>/blobs/<sha256[:2]>/<sha256>           the image bytes, stored once
+#                                                  per distinct content
+#   <folder>/urls/<sha1(url)[:2]>/<sha1(url)>.json {"url", "sha256", "size",
+#                                                  "content_type", "etag", "last_modified"}
+#
+# Keyed twice: a URL maps to the hash of the bytes it served, and bytes are
+# stored under that hash, so the same photo behind two URLs (colourways
+# sharing a shot, a CDN URL with a new ?v= query) takes its space once, and a
+# URL whose image changed just points at a new blob. Every file is written to
+# a temp name and renamed into place, so a crashed run never leaves a
+# truncated image behind; a blob whose hash no longer matches reads as a miss.
+#
+#   cache = ImageCache("data/image_cache")
+#   data = cache.fetch(url, session)    # from disk if cached, else downloaded + stored
+#   img = cache.open_image(url)         # disk only; KeyError when not cached
+
+import os
+import json
+import hashlib
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image
+
+import config
+from scrapers.crawler import make_session
+
+
+def default_cache():
+    """The cache configured by STYLEMATE_IMAGE_CACHE_DIR, or None when it is switched off."""
+    return ImageCache(config.IMAGE_CACHE_DIR) if config.IMAGE_CACHE_DIR else None
+
+
+class ImageCache:
+    def __init__(self, folder: str, verify: bool = True):
+        """`verify` re-hashes every blob read, so a corrupted file is a miss rather than a bad embedding."""
+        self.folder = folder
+        self.verify = verify
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "downloaded": 0, "not_modified": 0, "bytes": 0, "corrupt": 0}
+        os.makedirs(folder, exist_ok=True)
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+
+    def _entry_path(self, url: str) -> str:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.folder, "urls", key[:2], f"{key}.json")
+
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.folder, "blobs", sha256[:2], sha256)
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    # ─── LOOKUP ───────────────────────────────────────────────────────────────
+    def entry(self, url: str):
+        """The URL's index entry, or None."""
+        try:
+            with open(self._entry_path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, url: str):
+        """The cached bytes for `url`, or None. Never touches the network."""
+        entry = self.entry(url)
+        data = None
+        if entry is not None:
+            try:
+                with open(self._blob_path(entry["sha256"]), "rb") as f:
+                    data = f.read()
+            except OSError:
+                data = None
+            if data is not None and self.verify and hashlib.sha256(data).hexdigest() != entry["sha256"]:
+                self._count(corrupt=1)
+                data = None
+        self._count(**({"hits": 1} if data is not None else {"misses": 1}))
+        return data
+
+    def __contains__(self, url: str) -> bool:
+        entry = self.entry(url)
+        return entry is not None and os.path.exists(self._blob_path(entry["sha256"]))
+
+    def open_image(self, url: str) -> Image.Image:
+        """Decode the cached image for `url` (RGB). Raises KeyError when it isn't cached."""
+        data = self.get(url)
+        if data is None:
+            raise KeyError(f"not in image cache: {url}")
+        return Image.open(BytesIO(data)).convert("RGB")
+
+    # ─── FILLING ──────────────────────────────────────────────────────────────
+    def put(self, url: str, data: bytes, headers=None) -> str:
+        """Store `data` as the image behind `url`; returns its sha256."""
+        sha256 = hashlib.sha256(data).hexdigest()
+        blob = self._blob_path(sha256)
+        if not os.path.exists(blob):
+            self._write_atomic(blob, data)
+        headers = headers or {}
+        entry = {"url": url, "sha256": sha256, "size": len(data), "content_type": headers.get("Content-Type"),
+                 "etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+        self._write_atomic(self._entry_path(url), json.dumps(entry).encode("utf-8"))
+        return sha256
+
+    def fetch(self, url: str, session: requests.Session = None, timeout: float = 10.0,
+              revalidate: bool = False) -> bytes:
+        """
+        The bytes behind `url`: from the cache when present (no request at all,
+        or a conditional GET with `revalidate`), otherwise downloaded (with
+        `session`, or a plain requests.get) and stored. Raises
+        requests.HTTPError like resp.raise_for_status().
+        """
+        data = self.get(url)
+        if data is not None and not revalidate:
+            return data
+
+        headers = {}
+        entry = self.entry(url) if data is not None else None
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        resp = (session or requests).get(url, headers=headers, timeout=timeout)
+        if resp.status_code == 304 and data is not None:
+            self._count(not_modified=1)
+            return data
+        resp.raise_for_status()
+        self.put(url, resp.content, resp.headers)
+        self._count(downloaded=1, bytes=len(resp.content))
+        return resp.content
+
+    def prefetch(self, urls: list, session: requests.Session = None, workers: int = 8,
+                 timeout: float = 10.0) -> dict:
+        """Download every URL not cached yet, `workers` at a time. Returns {url: error} for the failures."""
+        missing = [url for url in dict.fromkeys(urls) if url and url not in self]
+        errors = {}
+        if missing and session is None:
+            session = make_session(pool_size=workers)
+
+        def one(url):
+            try:
+                self.fetch(url, session, timeout)
+            except Exception as e:
+                errors[url] = f"{type(e).__name__}: {e}"
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="image-prefetch") as pool:
+                list(pool.map(one, missing))
+        return errors
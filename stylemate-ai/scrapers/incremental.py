@@ -0,0 +1,82 @@
+# stylemate-ai/scrapers/incremental.py
+#
+# Helpers for incremental catalog refreshes: diff a fresh scrape against the
+# previous <brand>_products.json, then patch the existing ID-mapped faiss index
+# in place instead of re-embedding and rebuilding everything.
+#
+# Every product gets a stable 63-bit ID derived from its URL, so the same
+# product keeps the same faiss ID across runs.
+
+import hashlib
+from collections import namedtuple
+import numpy as np
+import faiss
+
+# Each field is a list of product dicts (from the scrape); `unchanged` ones can
+# reuse their previous vector, `added` + `changed` need embedding, `removed`
+# ones must be deleted from the index.
+CatalogDiff = namedtuple("CatalogDiff", ["added", "changed", "removed", "unchanged"])
+
+
+def product_id(url: str) -> int:
+    """Stable non-negative int64 faiss ID for a product URL."""
+    digest = hashlib.sha1(url.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") & 0x7FFF_FFFF_FFFF_FFFF
+
+
+def diff_products(previous: list, current: list) -> CatalogDiff:
+    """Compare two scrapes by product URL; a different image_url counts as changed."""
+    old_by_url = {p["url"]: p for p in previous if p.get("url")}
+    new_urls = set()
+    added, changed, unchanged = [], [], []
+
+    for prod in current:
+        url = prod.get("url")
+        if not url:
+            continue
+        new_urls.add(url)
+        old = old_by_url.get(url)
+        if old is None:
+            added.append(prod)
+        elif old.get("image_url", "") != prod.get("image_url", ""):
+            changed.append(prod)
+        else:
+            unchanged.append(prod)
+
+    removed = [p for url, p in old_by_url.items() if url not in new_urls]
+    return CatalogDiff(added, changed, removed, unchanged)
+
+
+def is_id_mapped(index) -> bool:
+    return isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2))
+
+
+def index_ids(index) -> np.ndarray:
+    """IDs of an ID-mapped index, in storage order."""
+    return faiss.vector_to_array(index.id_map)
+
+
+def inner_index(index):
+    """The storage index under an ID map (positions line up with `index_ids`)."""
+    return faiss.downcast_index(index.index) if is_id_mapped(index) else index
+
+
+def patch_index(index, remove_ids, add_vectors: np.ndarray, add_ids) -> int:
+    """
+    Delete `remove_ids` and add `add_vectors` under `add_ids`, in place.
+    Returns how many vectors were actually removed.
+
+    Only ID-mapped flat-code indexes (Flat / SQ / PQ) can be patched: they
+    compact storage on removal, which keeps the ID map in sync. IVF and HNSW
+    indexes raise RuntimeError and must be rebuilt from the vector store.
+    """
+    if not is_id_mapped(index) or not isinstance(inner_index(index), faiss.IndexFlatCodes):
+        raise RuntimeError(f"{type(inner_index(index)).__name__} can't be patched in place")
+    removed = 0
+    if len(remove_ids):
+        removed = index.remove_ids(np.asarray(remove_ids, dtype="int64"))
+    if len(add_ids):
+        vectors = np.ascontiguousarray(add_vectors, dtype="float32")
+        faiss.normalize_L2(vectors)
+        index.add_with_ids(vectors, np.asarray(add_ids, dtype="int64"))
+    return removed
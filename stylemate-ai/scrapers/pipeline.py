@@ -11,14 +11,12 @@ torch.backends.mps.is_built     = lambda: False
 
 # ───────────────────────────────────────────────────────────────────────────────
 import sys
+import time
 import importlib
 import argparse
 import json
 import numpy as np
 import faiss
-import requests
-from io import BytesIO
-from PIL import Image
 
 # ─── MAKE SURE PROJECT ROOT IS ON sys.path ────────────────────────────────────
 # so that `import clip_model` (and others in root) works from here.
@@ -28,46 +26,91 @@ if root_dir not in sys.path:
 
 # ─── IMPORT CLIP MODEL TO EMBED IMAGES ────────────────────────────────────────
 import clip_model  # your clip_model.py lives at project root; it defines `model` and `preprocess`
+import config
+from inference import get_backend, BACKENDS
+from scrapers.embedder import PipelinedEmbedder
+from scrapers.image_cache import default_cache
+from vector_store import write_vector_store, read_vector_store, read_sidecar, store_paths, store_exists
+from scrapers.incremental import diff_products, product_id, is_id_mapped, index_ids, patch_index
+from index_factory import build_index, write_report, INDEX_KINDS
+from model_tags import LEGACY_MODEL, read_tag, write_tag
 
-# ── UTILITY: fetch an image from its URL → PIL.Image ──────────────────────────
-def fetch_image(url: str) -> Image.Image:
-    resp = requests.get(url, timeout=10)
-    resp.raise_for_status()
-    return Image.open(BytesIO(resp.content)).convert("RGB")
-
-# ── UTILITY: given a PIL image, return a normalized embed as a Python list ──
-def embed_image(img: Image.Image) -> list:
-    x = clip_model.preprocess(img).unsqueeze(0)  # 1×3×224×224
-    with torch.no_grad():
-        emb = clip_model.model.encode_image(x)    # 1×D
-        emb = emb / emb.norm(dim=-1, keepdim=True)
-    return emb.squeeze().tolist()
+# ── UTILITY: encode a whole (B×3×224×224) batch in one forward pass ──────────
+def encode_batch(x: torch.Tensor) -> torch.Tensor:
+    return get_backend().encode_images(x)         # B×D, normalized
 
 # ── UTILITY: build & write a Faiss index (inner product on L2‐normalized vectors) ─
-def build_faiss_index_from_vectors(vectors_list: list, metas_list: list, index_path: str, metas_path: str):
-    # Convert to numpy float32
+def build_faiss_index_from_vectors(vectors_list, metas_list: list, index_path: str, metas_path: str,
+                                   ids: list = None, kind: str = "flat", report: bool = True,
+                                   model: str = None, **index_params):
+    # Convert to numpy float32 (accepts a list of lists or an (N × D) array / memmap)
     vectors_np = np.array(vectors_list, dtype="float32")
     # Normalize for cosine search
     faiss.normalize_L2(vectors_np)
-    # Create a flat Inner‐Product index
-    dim = vectors_np.shape[1]
-    index = faiss.IndexFlatIP(dim)
-    index.add(vectors_np)
-    # Write the index to disk
+    # Create an Inner‐Product index of the requested kind (see index_factory.py);
+    # with `ids` it is wrapped in an ID map so later incremental runs can
+    # remove / add single products by stable ID
+    index = build_index(vectors_np, kind=kind, ids=ids, **index_params)
+    # Write the index to disk, tagged with the CLIP model behind the vectors (<index>.model.json)
     faiss.write_index(index, index_path)
+    if model:
+        write_tag(index_path, model, index.d)
     # Write metadata JSON
     with open(metas_path, "w", encoding="utf-8") as mf:
         json.dump(metas_list, mf, indent=2, ensure_ascii=False)
-    print(f"✅ Indexed {len(metas_list)} entries → {index_path}")
+    print(f"✅ Indexed {len(metas_list)} entries ({kind}) → {index_path}")
+    # Recall@k / latency / memory vs. exact flat search → <index>.report.json
+    if report:
+        write_report(index, vectors_np, index_path + ".report.json")
+
+# ── UTILITY: patch an existing ID-mapped index instead of rebuilding it ───────
+def patch_faiss_index(index, vectors_list, metas_list: list, ids: list, keep_ids: set,
+                      index_path: str, metas_path: str):
+    """
+    Bring `index` in line with (vectors_list, metas_list, ids): every live ID not
+    in `keep_ids` is removed, every ID not already kept is added. Metas are
+    written in the index's storage order so row i of the index ↔ metas[i].
+    """
+    live = set(index_ids(index).tolist())
+    keep = live & keep_ids
+    to_remove = sorted(live - keep)
+    add_rows = [row for row, pid in enumerate(ids) if pid not in keep]
+    add_vectors = np.array([vectors_list[row] for row in add_rows], dtype="float32").reshape(-1, index.d)
+    patch_index(index, to_remove, add_vectors, [ids[row] for row in add_rows])
+
+    faiss.write_index(index, index_path)
+    meta_by_id = dict(zip(ids, metas_list))
+    ordered = [meta_by_id[pid] for pid in index_ids(index).tolist()]
+    with open(metas_path, "w", encoding="utf-8") as mf:
+        json.dump(ordered, mf, indent=2, ensure_ascii=False)
+    print(f"✅ Patched index: -{len(to_remove)} removed, +{len(add_rows)} added, "
+          f"{index.ntotal} entries → {index_path}")
 
 # ── MAIN PIPELINE FUNCTION ────────────────────────────────────────────────────
-def run_full_pipeline(scraper_module: str, output_folder: str):
+def run_full_pipeline(scraper_module: str, output_folder: str, workers: int = 8, batch_size: int = 32,
+                      vector_dtype: str = "float32", incremental: bool = False,
+                      index_kind: str = "flat", index_params: dict = None):
     """
     1) Dynamically import `scrapers/{scraper_module}.py` and call `scrape()`.
     2) Write scraped products → <brand>_products.json
-    3) Embed each product image → <brand>_product_vectors.json
-    4) Build a Faiss index + write <brand>.index + <brand>_metas.json
+    3) Embed each product image → <brand>_vectors.npy + <brand>_vectors.meta.json
+       (`workers` concurrent downloads feeding batches of `batch_size`)
+    4) Build a Faiss index of `index_kind` (+ `index_params`, see index_factory.py)
+       + write <brand>.index + <brand>_metas.json + <brand>.index.report.json
+
+    With `incremental=True` the new scrape is diffed against the previous
+    <brand>_products.json by product URL + image URL: only new or changed
+    products are embedded, vanished ones are dropped, and the existing
+    ID-mapped index is patched in place rather than rebuilt.
+
+    Every product image ends up in the image cache (STYLEMATE_IMAGE_CACHE_DIR):
+    embedded images are kept as they're downloaded, and reused products whose
+    image isn't cached yet are fetched into it, so scrapers/reembed.py can
+    rebuild everything offline.
     """
+    started = time.perf_counter()
+    model = clip_model.model_tag()   # STYLEMATE_CLIP_MODEL / --model; recorded with every output
+
     # 1) Import the scraper module
     try:
         scraper = importlib.import_module(f"scrapers.{scraper_module}")
@@ -83,57 +126,132 @@ def run_full_pipeline(scraper_module: str, output_folder: str):
     products = scraper.scrape()
     brand_name = scraper_module.replace("_scraper", "")  # e.g. "galore_scraper" → "galore"
 
-    # 2) Write scraped products to JSON
     os.makedirs(output_folder, exist_ok=True)
     products_path = os.path.join(output_folder, f"{brand_name}_products.json")
+    vectors_stem  = os.path.join(output_folder, f"{brand_name}_vectors")
+    index_path    = os.path.join(output_folder, f"{brand_name}.index")
+    metas_path    = os.path.join(output_folder, f"{brand_name}_metas.json")
+
+    # 2a) Incremental: diff against the previous scrape before overwriting it
+    diff = None
+    reuse = {}   # product url → vector carried over from the previous vector store
+    if incremental:
+        previous_model = None
+        if store_exists(vectors_stem):
+            previous_model = read_sidecar(vectors_stem).get("model") or LEGACY_MODEL
+        if previous_model not in (None, model):
+            # another model's vectors can't be mixed with this one's
+            print(f"   • Incremental: previous vectors are from {previous_model}, not {model} → full build")
+        elif os.path.exists(products_path) and store_exists(vectors_stem):
+            with open(products_path, "r", encoding="utf-8") as pf:
+                previous = json.load(pf)
+            diff = diff_products(previous, products)
+            old_vectors, old_metas = read_vector_store(vectors_stem)
+            old_rows = {m.get("url"): row for row, m in enumerate(old_metas)}
+            for prod in diff.unchanged:
+                row = old_rows.get(prod["url"])
+                if row is not None:
+                    reuse[prod["url"]] = np.array(old_vectors[row], dtype="float32")
+            del old_vectors
+            print(f"   • Incremental: {len(diff.added)} new, {len(diff.changed)} changed, "
+                  f"{len(diff.removed)} removed, {len(reuse)} reused")
+        else:
+            print("   • Incremental: no previous scrape + vector store found → full build")
+
+    # 2b) Write scraped products to JSON
     print(f"   • Writing scraped data ({len(products)} items) → {products_path}")
     with open(products_path, "w", encoding="utf-8") as pf:
         json.dump(products, pf, indent=2, ensure_ascii=False)
 
-    # 3) Embed images and collect (meta, vector)
-    embeddings = []
-    metas = []
-    print(f"\n🔍 Embedding {len(products)} images …")
+    # 3) Embed images that have no reusable vector
+    to_embed = []
+    for idx, prod in enumerate(products, start=1):
+        title = prod.get("title", "<no-title>")
+        if not prod.get("image_url", ""):
+            print(f"⚠️  [{idx}] No image_url for {title!r}; skipping.")
+            continue
+        if prod.get("url") not in reuse:
+            to_embed.append(prod)
+
+    print(f"\n🔍 Embedding {len(to_embed)} images …")
     # Ensure model is on CPU
     device = torch.device("cpu")
     clip_model.model.to(device).eval()
 
-    for idx, prod in enumerate(products, start=1):
-        title = prod.get("title", "<no-title>")
-        image_url = prod.get("image_url", "")
-        meta = { "title": title, "price": prod.get("price"), "url": prod.get("url") }
+    def log_result(res):
+        title = to_embed[res.index].get("title", "<no-title>")
+        if res.error:
+            print(f"   ❌  Failed to embed {title!r}: {res.error}")
 
-        if not image_url:
-            print(f"⚠️  [{idx}] No image_url for {title!r}; skipping.")
+    image_cache = default_cache()
+    if image_cache is None:
+        print("   • Image cache off (STYLEMATE_IMAGE_CACHE_DIR=\"\"); images won't be kept for re-embedding")
+    fresh = {}
+    if to_embed:
+        embedder = PipelinedEmbedder(
+            encode_batch, get_backend().preprocess, workers=workers, batch_size=batch_size,
+            image_cache=image_cache,
+        )
+        results = embedder.run([p["image_url"] for p in to_embed], on_result=log_result)
+        fresh = {prod.get("url"): res.vector for prod, res in zip(to_embed, results) if res.vector is not None}
+
+    # 3a) Reused vectors skip the download; still keep their images for offline re-embedding
+    if image_cache is not None and reuse:
+        reused_images = [p["image_url"] for p in products if p.get("url") in reuse and p.get("image_url")]
+        failed = image_cache.prefetch(reused_images, workers=workers)
+        print(f"   • Image cache: {image_cache.stats['downloaded']} images stored this run, "
+              f"{len(failed)} reused images could not be cached → {image_cache.folder}")
+
+    # Collect (id, meta, vector) in scrape order
+    embeddings, metas, ids = [], [], []
+    for prod in products:
+        url = prod.get("url")
+        vec = reuse.get(url)
+        if vec is None:
+            vec = fresh.get(url)
+        if vec is None:
             continue
+        pid = product_id(url)
+        embeddings.append(vec)
+        ids.append(pid)
+        metas.append({
+            "id": pid, "title": prod.get("title", "<no-title>"), "price": prod.get("price"), "url": url,
+            # filter attributes (see attributes.py); refreshed from every scrape
+            "tags": prod.get("tags") or [], "sizes": prod.get("sizes") or [],
+        })
 
-        try:
-            img = fetch_image(image_url)
-            vec = embed_image(img)
-            embeddings.append(vec)
-            metas.append(meta)
-            print(f"   ✅  [{idx}] Embedded: {title!r}")
-        except Exception as e:
-            print(f"   ❌  [{idx}] Failed to embed {title!r}: {e}")
-
-    # 3b) Write out product_vectors.json
-    vectors_path = os.path.join(output_folder, f"{brand_name}_product_vectors.json")
+    # 3b) Write out the binary vector store (<brand>_vectors.npy + sidecar)
+    vectors_path, _ = store_paths(vectors_stem)
     print(f"\n💾 Saving {len(embeddings)} vectors → {vectors_path}")
-    out_list = []
-    for i in range(len(embeddings)):
-        out_list.append({ "meta": metas[i], "vector": embeddings[i] })
-    with open(vectors_path, "w", encoding="utf-8") as vf:
-        json.dump(out_list, vf, indent=2, ensure_ascii=False)
-
-    # 4) Build & save Faiss index + metas
-    index_path = os.path.join(output_folder, f"{brand_name}.index")
-    metas_path = os.path.join(output_folder, f"{brand_name}_metas.json")
-    print(f"\n🔨 Building Faiss index for {brand_name} …")
-    build_faiss_index_from_vectors(embeddings, metas, index_path, metas_path)
-
-    print("\n🎉 Pipeline complete!\n")
+    write_vector_store(vectors_stem, embeddings, metas, dtype=vector_dtype, model=model)
+
+    # 4) Patch the existing ID-mapped index, or build & save a fresh one
+    index = None
+    if diff is not None and os.path.exists(index_path):
+        index = faiss.read_index(index_path)
+        if not is_id_mapped(index):
+            print("   • Existing index has no stable IDs → rebuilding it once")
+            index = None
+        elif read_tag(index_path) != model:
+            print(f"   • Existing index is from {read_tag(index_path)} → rebuilding it")
+            index = None
+    if index is not None:
+        print(f"\n🩹 Patching Faiss index for {brand_name} …")
+        keep_ids = {product_id(url) for url in reuse}
+        try:
+            patch_faiss_index(index, embeddings, metas, ids, keep_ids, index_path, metas_path)
+        except RuntimeError as e:
+            # IVF / HNSW indexes can't delete in place; rebuild from the vectors we hold
+            print(f"   • {e} → rebuilding")
+            index = None
+    if index is None:
+        print(f"\n🔨 Building Faiss index for {brand_name} …")
+        build_faiss_index_from_vectors(embeddings, metas, index_path, metas_path, ids=ids,
+                                       kind=index_kind, model=model, **(index_params or {}))
+
+    print(f"\n🎉 Pipeline complete in {time.perf_counter() - started:.1f}s ({model})!\n")
     print(f"  ↳ Scraped JSON →     {products_path}")
-    print(f"  ↳ Vector JSON →      {vectors_path}")
+    print(f"  ↳ Vector store →     {vectors_path}")
     print(f"  ↳ Faiss index →      {index_path}")
     print(f"  ↳ Metadata JSON →    {metas_path}\n")
 
@@ -149,8 +267,51 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--outdir", "-o",
-        default=os.path.abspath(os.path.join(root_dir, "data")),
-        help="Output directory for JSON + index files (default: <project>/data)"
+        help="Output directory for JSON + index files (default: STYLEMATE_DATA_DIR, <project>/data "
+             "for the base model, <project>/data/models/<model> for the others)"
+    )
+    parser.add_argument(
+        "--workers", "-w", type=int, default=8,
+        help="Concurrent image downloads (default: 8)"
+    )
+    parser.add_argument(
+        "--batch-size", "-b", type=int, default=32,
+        help="Images per CLIP forward pass (default: 32)"
+    )
+    parser.add_argument(
+        "--dtype", choices=("float32", "float16"), default="float32",
+        help="On-disk dtype of the vector store (default: float32)"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Only embed new/changed products and patch the existing index in place"
+    )
+    parser.add_argument(
+        "--index-kind", choices=INDEX_KINDS, default="flat",
+        help="Faiss index type to build (default: flat = exact)"
+    )
+    parser.add_argument("--nlist", type=int, help="IVF lists (default: ~4·√N)")
+    parser.add_argument("--hnsw-m", type=int, help="HNSW neighbours per node (default: 32)")
+    parser.add_argument("--pq-m", type=int, help="PQ sub-quantizers (default: 64)")
+    parser.add_argument(
+        "--backend", choices=sorted(BACKENDS),
+        help="CLIP inference backend (default: STYLEMATE_INFERENCE_BACKEND or eager)"
+    )
+    parser.add_argument(
+        "--model",
+        help="CLIP model tier (small / base / large) or '<architecture>/<pretrained>' "
+             "(default: STYLEMATE_CLIP_MODEL)"
     )
     args = parser.parse_args()
-    run_full_pipeline(args.scraper, args.outdir)
+    if args.backend:
+        config.INFERENCE_BACKEND = args.backend
+    if args.model:
+        config.use_clip_model(args.model)
+    index_params = {
+        key: value for key, value in
+        (("nlist", args.nlist), ("hnsw_m", args.hnsw_m), ("pq_m", args.pq_m))
+        if value is not None
+    }
+    run_full_pipeline(args.scraper, args.outdir or config.DATA_DIR, workers=args.workers,
+                      batch_size=args.batch_size, vector_dtype=args.dtype, incremental=args.incremental,
+                      index_kind=args.index_kind, index_params=index_params)
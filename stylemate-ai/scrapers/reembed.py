@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# stylemate-ai/scrapers/reembed.py
+#
+# Rebuild every brand's vectors and Faiss index — and the unified catalog —
+# from the image cache alone (scrapers/image_cache.py, filled by pipeline.py),
+# without a single request to the shops. Run it after changing the CLIP model,
+# the inference backend or the preprocessing.
+#
+# Reads <brand>_products.json for what to embed; writes <brand>_vectors
+# (+ sidecar), <brand>.index, <brand>_metas.json exactly as pipeline.py does,
+# tagged with the model. With --model the outputs go to that model's data
+# dir (data/models/<model>/), so a new tier is built next to the live one
+# from the scrapes and images the base tier already has.
+# The embedder's worker threads only read + decode + preprocess here, so they
+# default to one per core. A brand with images missing from the cache is left
+# untouched unless --allow-missing, so a re-embed never silently shrinks the
+# catalog; the running server hot-reloads the new files.
+#
+#   python scrapers/reembed.py
+#   python scrapers/reembed.py --brands galore --index-kind hnsw --catalog
+#   python scrapers/reembed.py --model small --catalog
+
+import os
+import sys
+
+# ─── Make sure the project root (stylemate-ai/) is on sys.path ────────────────
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import json
+import time
+import shutil
+import argparse
+
+import config
+import clip_model
+from catalog import Catalog
+from index_factory import INDEX_KINDS
+from inference import get_backend, BACKENDS
+from vector_store import write_vector_store, store_paths
+from scrapers.embedder import PipelinedEmbedder
+from scrapers.image_cache import ImageCache
+from scrapers.incremental import product_id
+from scrapers.pipeline import encode_batch, build_faiss_index_from_vectors
+
+
+def products_brands(datadir: str) -> list:
+    """Every brand with a <brand>_products.json (the scrape re-embedding starts from)."""
+    if not os.path.isdir(datadir):
+        return []
+    return sorted(f[: -len("_products.json")] for f in os.listdir(datadir) if f.endswith("_products.json"))
+
+
+def reembed_brand(datadir: str, brand: str, image_cache: ImageCache, workers: int, batch_size: int,
+                  dtype: str = "float32", index_kind: str = "flat", allow_missing: bool = False,
+                  products_dir: str = None, **index_params) -> dict:
+    """
+    Re-embed one brand from cached images with the configured CLIP model,
+    reading its scrape from `products_dir` (default `datadir`) and writing to
+    `datadir`. Returns {"products", "embedded", "missing", "failed", "seconds"}.
+    """
+    started = time.perf_counter()
+    model = clip_model.model_tag()
+    products_path = os.path.join(products_dir or datadir, f"{brand}_products.json")
+    with open(products_path, "r", encoding="utf-8") as f:
+        products = [p for p in json.load(f) if p.get("url") and p.get("image_url")]
+
+    missing = [p for p in products if p["image_url"] not in image_cache]
+    report = {"products": len(products), "embedded": 0, "missing": len(missing), "failed": 0}
+    if missing:
+        print(f"   ⚠️  {len(missing)}/{len(products)} {brand} images aren't cached, e.g. {missing[0]['image_url']}")
+        if not allow_missing:
+            print(f"   ❌ Leaving {brand} as it is (run pipeline.py once to fill the cache, or --allow-missing)")
+            report["skipped"] = True
+            return report
+        products = [p for p in products if p["image_url"] in image_cache]
+
+    def log_result(res):
+        if res.error:
+            print(f"   ❌  Failed to embed {products[res.index].get('title')!r}: {res.error}")
+
+    embedder = PipelinedEmbedder(encode_batch, get_backend().preprocess, workers=workers, batch_size=batch_size,
+                                 image_cache=image_cache, offline=True)
+    results = embedder.run([p["image_url"] for p in products], on_result=log_result)
+
+    embeddings, metas, ids = [], [], []
+    for prod, res in zip(products, results):
+        if res.vector is None:
+            report["failed"] += 1
+            continue
+        pid = product_id(prod["url"])
+        embeddings.append(res.vector)
+        ids.append(pid)
+        metas.append({
+            "id": pid, "title": prod.get("title", "<no-title>"), "price": prod.get("price"), "url": prod["url"],
+            "tags": prod.get("tags") or [], "sizes": prod.get("sizes") or [],
+        })
+    if not embeddings:
+        print(f"   ❌ Nothing embedded for {brand}; leaving its files as they are")
+        report["skipped"] = True
+        return report
+
+    os.makedirs(datadir, exist_ok=True)
+    if os.path.abspath(products_path) != os.path.abspath(os.path.join(datadir, f"{brand}_products.json")):
+        # the scrape goes along: attach_attributes() and incremental runs read it from here
+        shutil.copyfile(products_path, os.path.join(datadir, f"{brand}_products.json"))
+    vectors_stem = os.path.join(datadir, f"{brand}_vectors")
+    write_vector_store(vectors_stem, embeddings, metas, dtype=dtype, model=model)
+    print(f"   💾 {len(embeddings)} vectors ({model}) → {store_paths(vectors_stem)[0]}")
+    build_faiss_index_from_vectors(embeddings, metas, os.path.join(datadir, f"{brand}.index"),
+                                   os.path.join(datadir, f"{brand}_metas.json"), ids=ids, kind=index_kind,
+                                   model=model, **index_params)
+    report["embedded"] = len(embeddings)
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-embed every brand from the image cache (no network).")
+    parser.add_argument(
+        "--datadir", "-d",
+        help="Where vectors and indexes are written (default: STYLEMATE_DATA_DIR for --model)"
+    )
+    parser.add_argument(
+        "--products-dir",
+        help="Folder holding the <brand>_products.json scrapes (default: --datadir if it has any, else <project>/data)"
+    )
+    parser.add_argument("--brands", "-b", nargs="*", help="Brands to re-embed (default: every <brand>_products.json)")
+    parser.add_argument(
+        "--cache-dir", default=config.IMAGE_CACHE_DIR,
+        help="Image cache to read from (default: STYLEMATE_IMAGE_CACHE_DIR)"
+    )
+    parser.add_argument(
+        "--workers", "-w", type=int, default=os.cpu_count() or 4,
+        help="Decode + preprocess threads (default: one per core)"
+    )
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per CLIP forward pass (default: 32)")
+    parser.add_argument("--dtype", choices=("float32", "float16"), default="float32",
+                        help="On-disk dtype of the vector store (default: float32)")
+    parser.add_argument("--index-kind", choices=INDEX_KINDS, default="flat",
+                        help="Faiss index type to build per brand (default: flat = exact)")
+    parser.add_argument("--nlist", type=int, help="IVF lists (default: ~4·√N)")
+    parser.add_argument("--hnsw-m", type=int, help="HNSW neighbours per node (default: 32)")
+    parser.add_argument("--pq-m", type=int, help="PQ sub-quantizers (default: 64)")
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="Re-embed a brand even if some of its images aren't cached (those products are dropped)")
+    parser.add_argument(
+        "--catalog", action="store_true",
+        help="Rebuild the unified catalog afterwards (done anyway when STYLEMATE_CATALOG_DIR already holds one)"
+    )
+    parser.add_argument(
+        "--backend", choices=sorted(BACKENDS),
+        help="CLIP inference backend (default: STYLEMATE_INFERENCE_BACKEND or eager)"
+    )
+    parser.add_argument(
+        "--model",
+        help="CLIP model tier (small / base / large) or '<architecture>/<pretrained>' (default: STYLEMATE_CLIP_MODEL)"
+    )
+    args = parser.parse_args()
+    if args.backend:
+        config.INFERENCE_BACKEND = args.backend
+    if args.model:
+        config.use_clip_model(args.model)
+    datadir = args.datadir or config.DATA_DIR
+    products_dir = args.products_dir or (datadir if products_brands(datadir) else config.model_data_dir("base"))
+    if not args.cache_dir or not os.path.isdir(args.cache_dir):
+        print(f"❌ No image cache at {args.cache_dir!r}; run pipeline.py with STYLEMATE_IMAGE_CACHE_DIR set first")
+        sys.exit(1)
+
+    brands = args.brands or products_brands(products_dir)
+    if not brands:
+        print(f"❌ No <brand>_products.json found in {products_dir}")
+        sys.exit(1)
+    index_params = {
+        key: value for key, value in
+        (("nlist", args.nlist), ("hnsw_m", args.hnsw_m), ("pq_m", args.pq_m))
+        if value is not None
+    }
+
+    image_cache = ImageCache(args.cache_dir)
+    started = time.perf_counter()
+    reports = {}
+    for brand in brands:
+        print(f"\n🔁 Re-embedding {brand} with {clip_model.model_tag()} from {args.cache_dir} …")
+        reports[brand] = reembed_brand(datadir, brand, image_cache, args.workers, args.batch_size,
+                                       dtype=args.dtype, index_kind=args.index_kind,
+                                       allow_missing=args.allow_missing, products_dir=products_dir,
+                                       **index_params)
+
+    if args.catalog or Catalog.exists(config.CATALOG_DIR):
+        from scrapers.build_catalog_index import build_catalog
+        from catalog_registry import discover_brands
+        print(f"\n🔨 Rebuilding the unified catalog → {config.CATALOG_DIR}")
+        build_catalog(datadir, discover_brands(datadir), config.CATALOG_DIR,
+                      kind=config.CATALOG_INDEX_KIND, collapse_threshold=config.COLLAPSE_THRESHOLD or None,
+                      collapse_same_family=config.COLLAPSE_SAME_FAMILY)
+
+    print(f"\n🎉 Re-embedded in {time.perf_counter() - started:.1f}s, "
+          f"{image_cache.stats['hits']} images from the cache, "
+          f"{image_cache.stats['downloaded']} downloaded")
+    print(f"{'brand':<12} {'products':>9} {'embedded':>9} {'missing':>8} {'failed':>7}")
+    for brand, r in reports.items():
+        print(f"{brand:<12} {r['products']:>9} {r['embedded']:>9} {r['missing']:>8} {r['failed']:>7}"
+              + ("  (skipped)" if r.get("skipped") else ""))
+    if any(r.get("skipped") for r in reports.values()):
+        sys.exit(1)
@@ -0,0 +1,125 @@
+# stylemate-ai/startup.py
+#
+# Server startup, split into timed phases so slow cold starts show where the
+# time goes:
+#
+#   model     – CLIP model (STYLEMATE_CLIP_MODEL tier) from the serialized local
+#               artifact (see clip_model.py)
+#   backend   – eager / int8 / traced inference backend (see inference.py)
+#   catalog   – prebuilt unified catalog, or a startup merge of the brand indexes;
+#               reloaded in the background when they change (catalog_registry.py)
+#   styles    – per-style centroid matrix for style labels (see styles.py)
+#   warmup    – dummy batches through the encoder so the first request is fast
+#
+# Heavy modules (torch, open_clip, faiss) are only imported inside the phases,
+# so importing the web app itself stays cheap and it can answer liveness probes
+# while `Startup.run()` works in a background thread.
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+import config
+
+BASE_DIR = config.BASE_DIR
+
+def load_catalog(registry):
+    """Load the catalog `registry` (see catalog_registry.py) describes and start watching for rebuilds."""
+    registry.load()
+    registry.watch(config.CATALOG_RELOAD_INTERVAL_S)
+    return registry.current
+
+
+def load_styles():
+    """StyleScorer over STYLEMATE_STYLE_VECTORS, or None when style scoring is off / not built."""
+    import clip_model
+    from styles import StyleScorer
+    if not config.STYLE_VECTORS:
+        print("⚠️ Style scoring off (STYLEMATE_STYLE_VECTORS=\"\"); style labels disabled")
+        return None
+    if not os.path.exists(config.STYLE_VECTORS):
+        print(f"⚠️ No style vectors at {config.STYLE_VECTORS!r}; style labels disabled")
+        return None
+    # centroids of another model would label every query confidently and wrongly
+    return StyleScorer.load(config.STYLE_VECTORS, model=clip_model.model_tag())
+
+
+def load_backend():
+    """CPU-only torch + the configured inference backend."""
+    import torch
+    os.environ["CUDA_VISIBLE_DEVICES"] = ""       # disable CUDA/MPS
+    torch.backends.mps.is_available = lambda: False
+    torch.backends.mps.is_built     = lambda: False
+    # Only the micro-batcher thread runs inference, so it may use every core
+    torch.set_num_threads(config.TORCH_NUM_THREADS)
+
+    from inference import get_backend
+    return get_backend()
+
+
+def warm_up(backend, batch_sizes=(1,)):
+    """Run zero images through the encoder once per batch size (allocators, kernels, JIT)."""
+    import torch
+    from inference import _input_size
+    size = _input_size(backend.preprocess)
+    for batch_size in batch_sizes:
+        backend.encode_images(torch.zeros(batch_size, 3, size, size))
+
+
+class Startup:
+    """
+    Runs the startup phases once and records how long each took.
+    `ready` is set when everything succeeded; `error` holds the failure otherwise.
+    """
+
+    def __init__(self, name: str = "server"):
+        self.name = name
+        self.timings = {}
+        self.ready = threading.Event()
+        self.error = None
+        self.phase_name = None
+        self._started = time.perf_counter()
+        self._thread = None
+
+    @contextmanager
+    def phase(self, name: str):
+        self.phase_name = name
+        t0 = time.perf_counter()
+        yield
+        self.timings[name] = round(time.perf_counter() - t0, 3)
+        print(f"⏱️  [{self.name}] {name}: {self.timings[name]:.2f}s")
+
+    def run(self, steps):
+        """Run `steps`, an iterable of (phase name, callable), in order."""
+        try:
+            for name, step in steps:
+                with self.phase(name):
+                    step()
+        except Exception as e:
+            self.error = f"{self.phase_name}: {e!r}"
+            print(f"❌ [{self.name}] startup failed in {self.error}")
+            return
+        self.phase_name = None
+        self.timings["total"] = round(time.perf_counter() - self._started, 3)
+        print(f"✅ [{self.name}] ready in {self.timings['total']:.2f}s")
+        self.ready.set()
+
+    def run_in_background(self, steps):
+        self._thread = threading.Thread(target=self.run, args=(steps,), name=f"{self.name}-startup", daemon=True)
+        self._thread.start()
+
+    def status(self) -> dict:
+        """JSON-ready readiness report."""
+        if self.ready.is_set():
+            state = "ready"
+        elif self.error:
+            state = "failed"
+        else:
+            state = "starting"
+        report = {"status": state, "timings": self.timings}
+        if self.phase_name and not self.error:
+            report["phase"] = self.phase_name
+        if self.error:
+            report["error"] = self.error
+        return report
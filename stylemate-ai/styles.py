@@ -0,0 +1,85 @@
+# stylemate-ai/styles.py
+#
+# Style classification against the per-style centroids written by
+# build_reference_vectors.py (reference_vectors.json: style → vector).
+#
+# The centroids are loaded once into a pre-normalized (S × D) float32 matrix,
+# so scoring any number of normalized query embeddings against every style is
+# one matrix multiply: (n × D) @ (D × S) → (n × S) cosine similarities.
+# utils.cosine_similarity is the per-pair equivalent.
+#
+# The centroids only mean something for the CLIP model that embedded them;
+# build_reference_vectors.py tags the file (<path>.model.json, see
+# model_tags.py) and load(model=…) checks it.
+
+import json
+import numpy as np
+
+from model_tags import check_model, read_tag
+
+
+class StyleScorer:
+    def __init__(self, names: list, centroids: np.ndarray):
+        centroids = np.array(centroids, dtype=np.float32)
+        if centroids.ndim != 2 or len(names) != len(centroids):
+            raise ValueError(f"Need one centroid row per style: {len(names)} names, shape {centroids.shape}")
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        self.names = list(names)
+        # transposed once up front: score() is a plain q @ matrix
+        self.matrix = np.ascontiguousarray((centroids / np.maximum(norms, 1e-12)).T)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[0]
+
+    @classmethod
+    def load(cls, path: str, model: str = None):
+        """
+        Read build_reference_vectors.py output (JSON object: style name → vector).
+        With `model`, raises model_tags.ModelMismatchError for another model's centroids.
+        """
+        check_model(read_tag(path), model, path)
+        with open(path, "r", encoding="utf-8") as f:
+            vectors = json.load(f)
+        names = sorted(vectors)
+        return cls(names, [vectors[name] for name in names])
+
+    def score(self, q: np.ndarray) -> np.ndarray:
+        """(n × S) cosine similarity of normalized embeddings `q` (n × D, or D) to every style."""
+        q = np.asarray(q, dtype=np.float32)
+        return np.atleast_2d(q) @ self.matrix
+
+    def top(self, q: np.ndarray, k: int = 3) -> list:
+        """Per query row, the `k` best styles as [{"style", "score"}, …], best first."""
+        scores = self.score(q)
+        k = min(k, len(self))
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        return [
+            [{"style": self.names[j], "score": s} for j, s in zip(row, scores[i, row].tolist())]
+            for i, row in enumerate(order)
+        ]
+
+    def labels(self, q: np.ndarray) -> list:
+        """Best style name per query row."""
+        return [self.names[j] for j in self.score(q).argmax(axis=1)]
+
+
+def style_response(scorer: StyleScorer, catalog, q: np.ndarray, scores: np.ndarray, ids: np.ndarray,
+                   top_k: int = 3, expand_variants: bool = False) -> dict:
+    """
+    Response body for /recommend?styles=1: the query's `top_k` styles plus the
+    ranked products, each labelled with its own best style. The query and the
+    products' stored vectors are scored together in one multiply.
+    """
+    products = catalog.results(scores, ids, expand_variants)
+    rows = np.atleast_2d(q).astype(np.float32)
+    vectors = catalog.vectors(ids[ids >= 0])
+    if vectors is not None:
+        rows = np.vstack([rows, vectors])
+    ranked = scorer.top(rows, top_k)
+    for product, styles in zip(products, ranked[1:]):
+        product["style"] = styles[0]["style"]
+    return {"styles": ranked[0], "products": products}
@@ -0,0 +1,105 @@
+# stylemate-ai/text_search.py
+#
+# Text → product search ("boxy black hoodie"): the query is encoded by the
+# CLIP text tower (backend.encode_texts, see inference.py) into the same
+# embedding space as the product images, then searched in the catalog exactly
+# like an uploaded photo.
+#
+# Encoding is the only expensive part, and query text repeats a lot, so:
+#   • queries are normalized (case / whitespace) and memoized in an LRU cache
+#   • a list of popular queries is batch-encoded at startup and pinned, so the
+#     common searches never touch the model at request time
+
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: lower-cased, whitespace collapsed."""
+    return " ".join((text or "").lower().split())
+
+
+def load_popular_queries(path: str) -> list:
+    """One query per line ('#' comments and blanks skipped), deduplicated; [] if the file is missing."""
+    if not path or not os.path.exists(path):
+        return []
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            query = normalize_query(line.split("#", 1)[0])
+            if query:
+                queries.append(query)
+    return list(dict.fromkeys(queries))
+
+
+class TextQueryCache:
+    """
+    Normalized query → (D,) float32 embedding. Pinned entries (the popular
+    queries) are never evicted; the rest are evicted LRU past `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 20_000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._pinned = {}
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._pinned) + len(self._entries)
+
+    def get(self, query: str):
+        with self._lock:
+            vec = self._pinned.get(query)
+            if vec is None:
+                vec = self._entries.get(query)
+                if vec is not None:
+                    self._entries.move_to_end(query)
+            if vec is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return vec
+
+    def put(self, query: str, vec):
+        vec = np.array(vec, dtype=np.float32).reshape(-1)
+        with self._lock:
+            if query in self._pinned:
+                return
+            self._entries[query] = vec
+            self._entries.move_to_end(query)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pin(self, queries: list, vecs):
+        """Store pre-encoded popular queries permanently."""
+        vecs = np.asarray(vecs, dtype=np.float32)
+        with self._lock:
+            for query, vec in zip(queries, vecs):
+                self._pinned[query] = np.array(vec)
+                self._entries.pop(query, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "pinned": len(self._pinned),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+def warm_popular(cache: TextQueryCache, queries: list, encode_fn, batch_size: int = 64) -> int:
+    """
+    Batch-encode `queries` with `encode_fn` (list[str] → (n × D) array) and pin
+    them in `cache`. Returns how many were encoded.
+    """
+    for start in range(0, len(queries), batch_size):
+        chunk = queries[start:start + batch_size]
+        cache.pin(chunk, encode_fn(chunk))
+    return len(queries)
@@ -0,0 +1,130 @@
+# stylemate-ai/vector_store.py
+#
+# Binary on-disk format for product embeddings, replacing the pretty-printed
+# *_product_vectors.json files.
+#
+# A store is two files sharing one stem:
+#   <stem>.npy        – (N × D) float32 or float16 matrix in NumPy's .npy format,
+#                       so it can be memory-mapped straight off disk
+#   <stem>.meta.json  – sidecar with format info, the CLIP model that produced
+#                       the vectors (see model_tags.py) + the N product metas,
+#                       row i of the matrix belongs to metas[i]
+#
+#   write_vector_store("data/galore_vectors", vectors, metas)
+#   vectors, metas = read_vector_store("data/galore_vectors")   # mmap'd
+#   read_vector_store(stem, model=clip_model.model_tag())     # + refuse other models' vectors
+
+import os
+import json
+import numpy as np
+
+from model_tags import check_model
+
+FORMAT_NAME    = "stylemate-vectors"
+FORMAT_VERSION = 1
+SUPPORTED_DTYPES = ("float32", "float16")
+
+
+def store_stem(path: str) -> str:
+    """Accept a stem or either file of a store and return the bare stem."""
+    for suffix in (".meta.json", ".npy", ".json"):
+        if path.endswith(suffix):
+            return path[: -len(suffix)]
+    return path
+
+
+def store_paths(path: str) -> tuple:
+    stem = store_stem(path)
+    return stem + ".npy", stem + ".meta.json"
+
+
+def store_exists(path: str) -> bool:
+    return all(os.path.exists(p) for p in store_paths(path))
+
+
+def write_vector_store(path: str, vectors, metas: list, dtype: str = "float32", extra: dict = None,
+                       model: str = None):
+    """
+    Write an (N × D) matrix + N metas, tagged with the `model` that embedded
+    them. Both files are written to temp names and renamed into place, so
+    readers never see a half-written store.
+    """
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"dtype must be one of {SUPPORTED_DTYPES}, got {dtype!r}")
+    matrix = np.ascontiguousarray(vectors, dtype=dtype)
+    if matrix.ndim != 2:
+        raise ValueError(f"vectors must be 2-D (N × D), got shape {matrix.shape}")
+    if matrix.shape[0] != len(metas):
+        raise ValueError(f"{matrix.shape[0]} vectors but {len(metas)} metas")
+
+    npy_path, meta_path = store_paths(path)
+    os.makedirs(os.path.dirname(os.path.abspath(npy_path)), exist_ok=True)
+
+    sidecar = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "count": int(matrix.shape[0]),
+        "dim": int(matrix.shape[1]),
+        "dtype": dtype,
+    }
+    if model:
+        sidecar["model"] = model
+    sidecar.update(extra or {})
+    sidecar["metas"] = metas
+
+    with open(npy_path + ".tmp", "wb") as f:
+        np.save(f, matrix)
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(sidecar, f, ensure_ascii=False)
+    os.replace(npy_path + ".tmp", npy_path)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def read_sidecar(path: str) -> dict:
+    _, meta_path = store_paths(path)
+    with open(meta_path, "r", encoding="utf-8") as f:
+        sidecar = json.load(f)
+    if sidecar.get("format") != FORMAT_NAME:
+        raise ValueError(f"{meta_path} is not a {FORMAT_NAME} sidecar")
+    if sidecar.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"{meta_path} has format version {sidecar['version']}, newer than supported {FORMAT_VERSION}")
+    return sidecar
+
+
+def read_vector_store(path: str, mmap: bool = True, model: str = None):
+    """
+    Return (vectors, metas). With `mmap=True` the matrix is a read-only
+    np.memmap in its stored dtype; use `as_float32` before handing it to faiss.
+    With `model`, raises model_tags.ModelMismatchError when the store was
+    embedded by another model.
+    """
+    npy_path, meta_path = store_paths(path)
+    sidecar = read_sidecar(path)
+    check_model(sidecar.get("model"), model, meta_path)
+    vectors = np.load(npy_path, mmap_mode="r" if mmap else None)
+    if vectors.shape != (sidecar["count"], sidecar["dim"]):
+        raise ValueError(
+            f"{npy_path} has shape {vectors.shape}, sidecar says ({sidecar['count']}, {sidecar['dim']})"
+        )
+    return vectors, sidecar["metas"]
+
+
+def as_float32(vectors) -> np.ndarray:
+    """Contiguous float32 copy/view suitable for faiss (no copy if already float32 in RAM)."""
+    return np.ascontiguousarray(vectors, dtype="float32")
+
+
+def read_legacy_json(path: str):
+    """Read an old [{meta, vector}, …] *_product_vectors.json → (float32 matrix, metas)."""
+    with open(path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    vectors = np.array([it["vector"] for it in items], dtype="float32")
+    metas = [it["meta"] for it in items]
+    return vectors, metas
+
+
+def read_vectors(path: str, mmap: bool = True):
+    """Read either a binary store or a legacy JSON vectors file."""
+    if path.endswith(".json") and not path.endswith(".meta.json") and os.path.exists(path):
+        return read_legacy_json(path)
+    return read_vector_store(path, mmap=mmap)